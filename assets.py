@@ -0,0 +1,98 @@
+import hashlib
+import io
+import os
+import time
+
+import pygame
+
+# 缩放后资源的磁盘缓存目录
+CACHE_DIR = '.asset_cache'
+
+
+class AssetManager:
+    """资源管理器：加载图片、缩放一次并转换为显示像素格式
+
+    缩放结果以原始像素数据缓存在磁盘上，键为源文件哈希和目标尺寸，
+    之后启动直接读取预缩放数据，跳过 PNG 解码和缩放。
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.load_times = {}
+        self._surfaces = {}
+
+    def _cache_path(self, path, digest, size, fmt):
+        name = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self.cache_dir, '%s_%s_%dx%d.%s' % (name, digest, size[0], size[1], fmt.lower()))
+
+    def load_pixels(self, path, size=None, alpha=False):
+        """读取（或从磁盘缓存取出）缩放后的像素数据，不涉及显示格式，可在后台线程调用
+
+        返回 (surface, 来源)，来源为 'cache' 或 'source'。
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha1(data).hexdigest()[:16]
+        fmt = 'RGBA' if alpha else 'RGB'
+
+        if size is not None:
+            cache_path = self._cache_path(path, digest, size, fmt)
+            if os.path.exists(cache_path):
+                with open(cache_path, 'rb') as f:
+                    raw = f.read()
+                if len(raw) == size[0] * size[1] * len(fmt):
+                    return pygame.image.frombuffer(raw, size, fmt), 'cache'
+
+        surface = pygame.image.load(io.BytesIO(data), path)
+        if size is None:
+            return surface, 'source'
+
+        surface = pygame.transform.scale(surface, size)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # 先写临时文件再替换，避免中断时留下不完整的缓存
+            tmp_path = cache_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(pygame.image.tobytes(surface, fmt))
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            # 缓存写不进去只影响下次启动速度
+            pass
+        return surface, 'source'
+
+    def finish(self, key, surface, alpha):
+        """转换为显示像素格式（需在已 set_mode 的主线程调用）"""
+        surface = surface.convert_alpha() if alpha else surface.convert()
+        self._surfaces[key] = surface
+        return surface
+
+    def load(self, path, size=None, alpha=False):
+        """加载、缩放并转换资源，同一参数只处理一次"""
+        key = (path, size, alpha)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            return surface
+
+        start = time.perf_counter()
+        surface, source = self.load_pixels(path, size, alpha)
+        surface = self.finish(key, surface, alpha)
+        self.load_times[path] = {'ms': (time.perf_counter() - start) * 1000, 'source': source}
+        return surface
+
+    def preload(self, requests):
+        """在后台线程读取一批资源 [(path, size, alpha)] 的像素数据
+
+        返回 [(key, surface, alpha)]，由主线程逐个交给 finish 转换格式。
+        """
+        pending = []
+        for path, size, alpha in requests:
+            start = time.perf_counter()
+            surface, source = self.load_pixels(path, size, alpha)
+            self.load_times[path] = {'ms': (time.perf_counter() - start) * 1000, 'source': source}
+            pending.append(((path, size, alpha), surface, alpha))
+        return pending
+
+    def report(self):
+        """各资源加载耗时"""
+        return ['%s: %.1f ms (%s)' % (path, info['ms'], info['source'])
+                for path, info in self.load_times.items()]
@@ -0,0 +1,346 @@
+"""特效烘焙：把与目标无关的固定时长特效预先渲染成帧图集，播放时每帧只需一次 blit
+
+只有位置相关、与目标无关的特效（治疗、护盾、大招）可以烘焙；普通攻击和火焰攻击
+依赖目标位置，始终使用实时模拟。
+
+EffectBaker.types() 给出可作为 Simulation 的 types 参数的映射：已烘焙的特效施法时创建 BakedEffect，
+其余仍是实时特效。BakedEffect 只保存特效名、变体序号和播放到的帧，不引用图集，
+可以快照、回放和交给流水线模式；图集在 bake() 时登记到本模块，绘制时按名称查找。
+"""
+import hashlib
+import inspect
+import os
+import pickle
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+
+from resolution import scale_of, scaled_size
+
+# 烘焙结果的磁盘缓存目录
+CACHE_DIR = '.bake_cache'
+
+# 烘焙格式版本，修改烘焙流程时递增以作废旧缓存
+BAKE_VERSION = 2
+
+# 每种特效的离屏画布尺寸（特效位于画布中心），超出画布的粒子会被裁掉
+CANVAS_SIZES = {
+    'heal': (240, 280),
+    'shield': (240, 240),
+    'ultimate': (320, 320),
+}
+
+# 每种特效需要烘焙的参数组合
+BAKE_PARAMS = {
+    'heal': [{}],
+    'shield': [{}],
+    'ultimate': [{'is_player1': True}, {'is_player1': False}],
+}
+
+
+def _effect_class(kind):
+    import skills
+    return {
+        'heal': skills.HealEffect,
+        'shield': skills.ShieldEffect,
+        'ultimate': skills.UltimateEffect,
+    }[kind]
+
+
+def _shared_modules():
+    import combat
+    import compositor
+    import effect_rng
+    import emitters
+    import fonts
+    import particle_render
+    import particles
+    import resolution
+    import shape_cache
+    import sprite_cache
+    import tween
+    return [combat, compositor, effect_rng, emitters, fonts, particle_render, particles, resolution, shape_cache,
+            sprite_cache, tween]
+
+
+# 已载入的图集：(特效名, 参数) -> [FrameAtlas]，按变体序号排列
+_atlases = {}
+
+
+def _params_key(params):
+    return tuple(sorted(params.items()))
+
+
+def _caster(kind, x, params):
+    """施法者：大招由参数指定，治疗、护盾按施法位置判断"""
+    from skills import player_at
+    if 'is_player1' in params:
+        return 0 if params['is_player1'] else 1
+    return player_at(x)
+
+
+def bake_hash(kind, params, seed):
+    """特效源码、参数与烘焙设置的哈希，任一变化都会使缓存失效"""
+    import emitters
+    import skills
+    digest = hashlib.sha1()
+    # 绘制类及其模拟基类
+    for cls in _effect_class(kind).__mro__[:-1]:
+        digest.update(inspect.getsource(cls).encode('utf-8'))
+    # 粒子、形状、字体等共享绘制代码也会影响画面
+    for module in _shared_modules():
+        digest.update(inspect.getsource(module).encode('utf-8'))
+    digest.update(inspect.getsource(skills.DetailLevel).encode('utf-8'))
+    # 发射器定义在数据文件里，源码覆盖不到
+    with open(emitters.EMITTER_FILE, 'rb') as f:
+        digest.update(f.read())
+    digest.update(repr((BAKE_VERSION, kind, _params_key(params), seed, CANVAS_SIZES[kind])).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _bake_job(kind, params, seed):
+    """在工作进程中离屏模拟并渲染一个特效变体
+
+    返回 [(offset_x, offset_y, width, height, zlib 压缩的 RGBA 数据, 人物动画提示)]，偏移相对特效中心；
+    提示中的玩家换成相对施法者的 0（施法者）/1（对方），播放时再换回实际玩家。
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    if not pygame.font.get_init():
+        pygame.font.init()
+    from effect_rng import EffectRNG
+
+    width, height = CANVAS_SIZES[kind]
+    cx, cy = width // 2, height // 2
+    canvas = pygame.Surface((width, height), pygame.SRCALPHA)
+    effect = _effect_class(kind)(cx, cy, rng=EffectRNG(seed), **params)
+    caster = _caster(kind, cx, params)
+
+    frames = []
+    while True:
+        effect.update()
+        if effect.is_done():
+            break
+        canvas.fill((0, 0, 0, 0))
+        effect.draw(canvas)
+        rect = canvas.get_bounding_rect()
+        data = pygame.image.tobytes(canvas.subsurface(rect), 'RGBA') if rect.width and rect.height else b''
+        cues = tuple((0 if player == caster else 1, state, age, sustain)
+                     for player, state, age, sustain in effect.cues())
+        frames.append((rect.x - cx, rect.y - cy, rect.width, rect.height, zlib.compress(data, 1), cues))
+    return frames
+
+
+class FrameAtlas:
+    """一个特效变体的全部帧，打包在一张图集上"""
+
+    def __init__(self, frames, atlas_width=2048):
+        # 简单的行式装箱：按行从左到右摆放，放不下就换行
+        placements = []
+        x = y = row_height = 0
+        for offset_x, offset_y, w, h, _, _ in frames:
+            if x + w > atlas_width:
+                x, y, row_height = 0, y + row_height, 0
+            placements.append((x, y))
+            x += w
+            row_height = max(row_height, h)
+
+        self.surface = pygame.Surface((atlas_width, max(1, y + row_height)), pygame.SRCALPHA)
+        self.frames = []
+        # 每帧的人物动画提示，玩家为相对施法者的 0/1
+        self.cues = []
+        for (ax, ay), (offset_x, offset_y, w, h, data, cues) in zip(placements, frames):
+            if w and h:
+                image = pygame.image.frombuffer(zlib.decompress(data), (w, h), 'RGBA')
+                self.surface.blit(image, (ax, ay))
+            self.frames.append(((offset_x, offset_y), pygame.Rect(ax, ay, w, h)))
+            self.cues.append(cues)
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+        # 动态分辨率下按比例缩放后的帧，第一次用到时生成：{(比例, 帧号): Surface}
+        self._scaled = {}
+
+    def scaled_frame(self, index, scale):
+        key = (scale, index)
+        image = self._scaled.get(key)
+        if image is None:
+            rect = self.frames[index][1]
+            image = self._scaled[key] = pygame.transform.smoothscale(self.surface.subsurface(rect),
+                                                                     scaled_size(rect.size, scale))
+        return image
+
+    def __len__(self):
+        return len(self.frames)
+
+
+class BakedEffect:
+    """烘焙特效的播放器，与实时特效接口一致，每帧一次 blit
+
+    状态只有特效名、参数、变体序号、位置、施法者和帧号，图集按 (kind, params) 在已登记的图集中查找；
+    不使用补间（timeline 为 None，tweens 为空）。
+    """
+
+    def __init__(self, kind, params, variant, x, y, length, caster=0):
+        self.kind = kind
+        self.params = params
+        self.variant = variant
+        self.x = x
+        self.y = y
+        # 帧数单独保存，无头推进（回放校验、快照恢复）不需要图集
+        self.length = length
+        self.caster = caster
+        self.frame = -1
+        self.detail = None
+        self.timeline = None
+        self.owns_timeline = False
+        self.tweens = ()
+
+    @property
+    def atlas(self):
+        return _atlases[self.kind, self.params][self.variant]
+
+    def update(self):
+        self.frame += 1
+
+    def is_done(self):
+        return self.frame >= self.length
+
+    def particle_count(self):
+        return 0
+
+    def _current(self):
+        if 0 <= self.frame < self.length:
+            return self.atlas.frames[self.frame]
+        return None
+
+    def bounds(self):
+        current = self._current()
+        if current is None or not current[1].width:
+            return None
+        (offset_x, offset_y), rect = current
+        return pygame.Rect(int(self.x) + offset_x, int(self.y) + offset_y, rect.width, rect.height)
+
+    def draw(self, surface):
+        current = self._current()
+        if current is None or not current[1].width:
+            return
+        (offset_x, offset_y), rect = current
+        x, y = int(self.x) + offset_x, int(self.y) + offset_y
+        atlas = self.atlas
+        scale = scale_of(surface)
+        if scale != 1:
+            surface.blit(atlas.scaled_frame(self.frame, scale), (int(x * scale), int(y * scale)))
+            return
+        surface.blit(atlas.surface, (x, y), rect)
+
+    def cues(self):
+        """与实时特效相同的人物动画提示，烘焙时逐帧记录"""
+        if not 0 <= self.frame < self.length:
+            return []
+        caster = self.caster
+        return [(caster if player == 0 else 1 - caster, state, age, sustain)
+                for player, state, age, sustain in self.atlas.cues[self.frame]]
+
+
+class BakedType:
+    """Simulation.types 中已烘焙特效的条目：按实时特效类的参数调用，创建 BakedEffect
+
+    live 为对应的实时特效类，未烘焙时退回使用，回放按类型换类时也以它为准。
+    """
+
+    def __init__(self, baker, kind, live):
+        self.baker = baker
+        self.kind = kind
+        self.live = live
+
+    def __call__(self, x, y, rng=None, timeline=None, **params):
+        return self.baker.create(self.kind, x, y, rng=rng, timeline=timeline, live=self.live, **params)
+
+
+class EffectBaker:
+    """管理烘焙结果：磁盘缓存、多进程并行烘焙以及按随机变体创建播放器"""
+
+    def __init__(self, variants=2, cache_dir=CACHE_DIR, base_seed=1000):
+        self.variants = variants
+        self.cache_dir = cache_dir
+        self.base_seed = base_seed
+        self.atlases = {}
+
+    def _jobs(self, kinds):
+        for kind in kinds:
+            for params in BAKE_PARAMS[kind]:
+                for variant in range(self.variants):
+                    yield kind, params, self.base_seed + variant
+
+    def _cache_path(self, kind, params, seed):
+        return os.path.join(self.cache_dir, '%s_%s.bake' % (kind, bake_hash(kind, params, seed)))
+
+    def _load_cached(self, path):
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _store(self, path, frames):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(frames, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def bake(self, kinds=None, workers=None):
+        """烘焙（或从缓存载入）指定特效，未命中缓存的变体在进程池中并行烘焙"""
+        kinds = list(kinds or CANVAS_SIZES)
+        results = {}
+        pending = []
+        for kind, params, seed in self._jobs(kinds):
+            path = self._cache_path(kind, params, seed)
+            frames = self._load_cached(path)
+            if frames is None:
+                pending.append((kind, params, seed, path))
+            else:
+                results[kind, _params_key(params), seed] = frames
+
+        if pending:
+            if workers == 1 or len(pending) == 1:
+                baked = [_bake_job(kind, params, seed) for kind, params, seed, _ in pending]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [pool.submit(_bake_job, kind, params, seed) for kind, params, seed, _ in pending]
+                    baked = [future.result() for future in futures]
+            for (kind, params, seed, path), frames in zip(pending, baked):
+                self._store(path, frames)
+                results[kind, _params_key(params), seed] = frames
+
+        atlases = {}
+        for (kind, params_key, seed), frames in sorted(results.items()):
+            atlases.setdefault((kind, params_key), []).append(FrameAtlas(frames))
+        self.atlases.update(atlases)
+        _atlases.update(atlases)
+        return len(pending)
+
+    def is_baked(self, kind, **params):
+        return (kind, _params_key(params)) in self.atlases
+
+    def create(self, kind, x, y, rng=None, timeline=None, live=None, **params):
+        """创建烘焙播放器（用 rng 随机选取一个变体）；未烘焙的特效退回实时特效 live（默认为可绘制的特效类）"""
+        key = kind, _params_key(params)
+        variants = self.atlases.get(key)
+        if not variants:
+            live = live or _effect_class(kind)
+            return live(x, y, rng=rng, timeline=timeline, **params)
+        index = int(rng.random() * len(variants)) if rng is not None else 0
+        return BakedEffect(kind, key[1], index, x, y, len(variants[index]), _caster(kind, x, params))
+
+    def types(self, types):
+        """把 types（特效名 -> 类）中可烘焙的特效换成 BakedType，作为 Simulation 的 types 参数"""
+        baked = dict(types)
+        for kind in CANVAS_SIZES:
+            if kind in baked:
+                baked[kind] = BakedType(self, kind, types[kind])
+        return baked
@@ -0,0 +1,244 @@
+"""技能特效无窗口基准测试
+
+用法：
+    python benchmark.py --count 10 --seed 0 --output baseline.json
+    python benchmark.py --count 10 --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+# 必须在导入 pygame 之前设置，使用无窗口的 dummy 驱动
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+# 避免 pygame 欢迎信息混入标准输出的 JSON
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+import numpy as np
+
+import skills
+from effect_rng import seed_match
+from particle_render import ParticleBatch
+from profiler import SurfaceCounter
+from shape_cache import shapes
+from simulation import DetailLevel
+from sprite_cache import particle_sprites
+from tween import Timeline
+
+WIDTH, HEIGHT = 800, 600
+
+EFFECT_TYPES = ['normal', 'heal', 'flame', 'shield', 'ultimate']
+
+# 参与回归比较的指标：(分组, 字段)
+COMPARED_METRICS = [
+    ('update_ms', 'p50'), ('update_ms', 'p95'), ('update_ms', 'p99'),
+    ('draw_ms', 'p50'), ('draw_ms', 'p95'), ('draw_ms', 'p99'),
+    ('surface_allocs', 'per_frame'),
+]
+
+
+def spawn_effect(kind, rng, timeline=None):
+    """在随机位置创建一个特效实例；传入 timeline 时特效的补间放在这条共享时间轴上"""
+    x, y = rng.uniform(100, WIDTH - 100), rng.uniform(100, HEIGHT - 100)
+    tx, ty = rng.uniform(100, WIDTH - 100), rng.uniform(100, HEIGHT - 100)
+    is_player1 = rng.random() < 0.5
+    if kind == 'normal':
+        return skills.NormalAttackEffect(x, y, tx, ty, is_player1, timeline=timeline)
+    if kind == 'heal':
+        return skills.HealEffect(x, y, timeline=timeline)
+    if kind == 'flame':
+        return skills.FlameAttackEffect(x, y, tx, ty, timeline=timeline)
+    if kind == 'shield':
+        return skills.ShieldEffect(x, y, timeline=timeline)
+    if kind == 'ultimate':
+        return skills.UltimateEffect(x, y, is_player1, timeline=timeline)
+    raise ValueError('未知特效类型: %s' % kind)
+
+
+def summarize(samples):
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.size == 0:
+        samples = np.zeros(1)
+    return {
+        'mean': float(samples.mean()),
+        'p50': float(np.percentile(samples, 50)),
+        'p95': float(np.percentile(samples, 95)),
+        'p99': float(np.percentile(samples, 99)),
+        'max': float(samples.max()),
+    }
+
+
+def run_scenario(kinds, count, seed, surface, max_frames, backend='sprites', particle_scale=1.0):
+    """同时运行 count 个（每种）特效直到全部结束，分别计时 update 和 draw
+
+    backend 为 'sprites' 时逐个 blit 粒子贴图，'add'/'alpha' 时用 ParticleBatch 批量光栅化；
+    particle_scale 放大一次性爆发的粒子数，用于测试粒子数量大幅增加时的绘制耗时。
+    """
+    seed_match(seed)
+    rng = random.Random(seed)
+    particle_sprites.clear()
+    particle_sprites.reset_stats()
+    shapes.clear()
+    shapes.reset_stats()
+
+    # 与 Simulation 一样，所有特效共享一条时间轴，每帧统一求值一次
+    timeline = Timeline()
+    effects = [spawn_effect(kind, rng, timeline) for kind in kinds for _ in range(count)]
+    if particle_scale != 1.0:
+        detail = DetailLevel(particle_scale)
+        for effect in effects:
+            effect.detail = detail
+    batch = ParticleBatch(backend) if backend != 'sprites' else None
+    update_ms, draw_ms, particles, allocs = [], [], [], []
+
+    with SurfaceCounter() as counter:
+        frames = 0
+        while effects and frames < max_frames:
+            surface.fill((0, 0, 0))
+
+            start = time.perf_counter()
+            timeline.step()
+            for effect in effects:
+                effect.update()
+            update_ms.append((time.perf_counter() - start) * 1000)
+
+            allocs_before = counter.count
+            start = time.perf_counter()
+            if batch is not None:
+                batch.begin(surface)
+            for effect in effects:
+                effect.draw(surface)
+            if batch is not None:
+                batch.flush()
+            draw_ms.append((time.perf_counter() - start) * 1000)
+            allocs.append(counter.count - allocs_before)
+
+            particles.append(sum(effect.particle_count() for effect in effects))
+            remaining = []
+            for effect in effects:
+                if effect.is_done():
+                    timeline.release(*effect.tweens)
+                else:
+                    remaining.append(effect)
+            effects = remaining
+            frames += 1
+
+    return {
+        'effects': count * len(kinds),
+        'frames': frames,
+        'update_ms': summarize(update_ms),
+        'draw_ms': summarize(draw_ms),
+        'particles': {'mean': float(np.mean(particles)) if particles else 0.0,
+                      'max': int(max(particles, default=0))},
+        'surface_allocs': {'total': int(sum(allocs)),
+                           'per_frame': float(np.mean(allocs)) if allocs else 0.0},
+        'sprite_cache': particle_sprites.stats(),
+        'shape_cache': shapes.stats(),
+    }
+
+
+def best_of(kinds, count, seed, surface, max_frames, repeat, backend='sprites', particle_scale=1.0):
+    """同一种子重复运行，计时取各次的最小值以压低机器噪声"""
+    best = run_scenario(kinds, count, seed, surface, max_frames, backend, particle_scale)
+    for _ in range(repeat - 1):
+        result = run_scenario(kinds, count, seed, surface, max_frames, backend, particle_scale)
+        for group in ('update_ms', 'draw_ms'):
+            for field, value in result[group].items():
+                best[group][field] = min(best[group][field], value)
+    return best
+
+
+def run(count, seed, kinds, max_frames, repeat=1, backend='sprites', particle_scale=1.0):
+    pygame.display.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+
+    options = (repeat, backend, particle_scale)
+    scenarios = {kind: best_of([kind], count, seed, surface, max_frames, *options) for kind in kinds}
+    if len(kinds) > 1:
+        scenarios['mixed'] = best_of(kinds, count, seed, surface, max_frames, *options)
+
+    return {
+        'meta': {
+            'seed': seed,
+            'count': count,
+            'repeat': repeat,
+            'backend': backend,
+            'particle_scale': particle_scale,
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'numpy': np.__version__,
+            'video_driver': os.environ.get('SDL_VIDEODRIVER'),
+        },
+        'scenarios': scenarios,
+    }
+
+
+def compare(results, baseline, threshold):
+    """与基线对比，返回回归列表（超过基线 threshold 比例视为回归）"""
+    regressions = []
+    for name, current in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            continue
+        for group, field in COMPARED_METRICS:
+            old = base.get(group, {}).get(field)
+            new = current[group][field]
+            if old is None:
+                continue
+            # 极小的基线值按绝对差判断，避免噪声被放大成百分比回归
+            if new > old * (1 + threshold) and new - old > 0.01:
+                regressions.append({
+                    'scenario': name,
+                    'metric': '%s.%s' % (group, field),
+                    'baseline': old,
+                    'current': new,
+                    'change': (new - old) / old if old else float('inf'),
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='技能特效无窗口基准测试')
+    parser.add_argument('--count', type=int, default=10, help='每种特效同时存在的实例数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--effects', nargs='+', choices=EFFECT_TYPES, default=EFFECT_TYPES)
+    parser.add_argument('--max-frames', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，计时取最小值')
+    parser.add_argument('--backend', choices=['sprites', 'add', 'alpha'], default='sprites',
+                        help='粒子绘制方式：逐个 blit 贴图，或批量光栅化（加色/透明度混合）')
+    parser.add_argument('--particle-scale', type=float, default=1.0, help='一次性爆发粒子数的倍数')
+    parser.add_argument('--output', help='结果 JSON 输出路径（默认输出到标准输出）')
+    parser.add_argument('--compare', metavar='BASELINE', help='与基线 JSON 对比并标记回归')
+    parser.add_argument('--threshold', type=float, default=0.25, help='回归阈值（比例）')
+    args = parser.parse_args(argv)
+
+    results = run(args.count, args.seed, args.effects, args.max_frames, args.repeat,
+                  args.backend, args.particle_scale)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        results['regressions'] = compare(results, baseline, args.threshold)
+        for item in results['regressions']:
+            print('回归: %(scenario)s %(metric)s %(baseline).3f -> %(current).3f' % item, file=sys.stderr)
+        if results['regressions']:
+            exit_code = 1
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""人物动画：待机、施法、受击、治疗四种状态，所有帧及其变体在载入时一次生成
+
+每个状态是一段动画（若干帧，每帧持续若干模拟步），帧由 FRAME_SPECS 描述：
+相对原图的缩放、按朝向的前后位移、上下位移和着色。受击帧带闪白/泛红，治疗帧泛绿；
+每帧另有一份护盾着色的变体，人物镜像（mirror）也在生成时完成。
+生成结果已转换为显示格式并记下绘制位置，每帧只需查表后 blit 一次，帧循环中不调用 pygame.transform。
+
+动画状态不单独保存，而是每帧由场上特效给出的提示（skills.py 各特效的 cues()）和模拟帧号推出：
+提示为 (玩家, 状态, 开始后经过的步数, 是否停在高潮帧)。因此回放跳转、快照恢复和流水线模式下
+人物动作总与特效同步，同样的对局得到同样的画面。
+"""
+import pygame
+
+# 状态 -> 每帧持续的模拟步数；待机循环播放，其余状态播放一遍后回到待机
+FRAME_STEPS = {'idle': 12, 'cast': 4, 'hit': 3, 'heal': 6}
+
+# 提示要求停住时（如大招蓄力）停在的高潮帧
+PEAK_FRAME = 1
+
+# 同一玩家同时有多个提示时的优先级（越靠前越优先）
+PRIORITY = ('hit', 'heal', 'cast')
+
+# 每帧：(缩放 x, 缩放 y, 前移像素, 上移像素, 加色 (r, g, b), 乘色 (r, g, b) 或 None)
+FRAME_SPECS = {
+    # 呼吸：纵向轻微压缩，脚底不动
+    'idle': [
+        (1.0, 1.0, 0, 0, None, None),
+        (1.0, 0.99, 0, 0, None, None),
+        (1.0, 0.98, 0, 0, None, None),
+        (1.0, 0.99, 0, 0, None, None),
+    ],
+    # 前倾蓄势、放大发力、前冲、收势
+    'cast': [
+        (1.02, 1.02, 4, 0, None, None),
+        (1.06, 1.06, 8, 2, (30, 30, 20), None),
+        (1.04, 1.04, 12, 0, (15, 15, 10), None),
+        (1.01, 1.01, 4, 0, None, None),
+    ],
+    # 受击：后退并闪白，随后泛红渐退
+    'hit': [
+        (1.0, 1.0, -10, 0, (150, 150, 150), None),
+        (1.0, 1.0, -8, 0, None, (255, 120, 120)),
+        (1.0, 1.0, -5, 0, (70, 70, 70), None),
+        (1.0, 1.0, -2, 0, None, (255, 200, 200)),
+    ],
+    # 治疗：泛绿并轻微上浮
+    'heal': [
+        (1.0, 1.0, 0, 1, (0, 40, 10), None),
+        (1.0, 1.0, 0, 2, (0, 80, 20), None),
+        (1.0, 1.0, 0, 2, (0, 60, 15), None),
+        (1.0, 1.0, 0, 1, (0, 30, 8), None),
+    ],
+}
+
+# 护盾着色：偏蓝并略微提亮
+SHIELD_MULTIPLY = (170, 210, 255)
+SHIELD_ADD = (0, 20, 45)
+
+
+def _tinted(surface, add=None, multiply=None):
+    """保留透明度的着色：乘色后加色，只改变 RGB 通道"""
+    if add is None and multiply is None:
+        return surface
+    surface = surface.copy()
+    if multiply is not None:
+        surface.fill((*multiply, 255), special_flags=pygame.BLEND_RGBA_MULT)
+    if add is not None:
+        surface.fill((*add, 0), special_flags=pygame.BLEND_RGBA_ADD)
+    return surface
+
+
+class CharacterSprite:
+    """一名玩家的全部动画帧
+
+    image 为显示格式的原图，rect 为原图的摆放位置（动画帧按脚底中点对齐）；
+    facing 为 1 时面朝右，-1 面朝左，决定施法前冲和受击后退的方向；mirror 为 True 时水平翻转原图。
+    """
+
+    def __init__(self, image, rect, player, facing=1, mirror=False, specs=FRAME_SPECS):
+        self.player = player
+        self.facing = facing
+        self.base_rect = rect.copy()
+        if mirror:
+            image = pygame.transform.flip(image, True, False)
+        # (状态, 帧序号, 是否有护盾) -> (surface, 绘制位置)
+        self.variants = {}
+        self.frame_counts = {}
+        for state, frames in specs.items():
+            self.frame_counts[state] = len(frames)
+            for index, spec in enumerate(frames):
+                frame, position = self._render_frame(image, spec)
+                self.variants[state, index, False] = frame.convert_alpha(), position
+                shielded = _tinted(frame, SHIELD_ADD, SHIELD_MULTIPLY)
+                self.variants[state, index, True] = shielded.convert_alpha(), position
+        self.state = 'idle'
+        self.frame = 0
+        self.shielded = False
+
+    def _render_frame(self, image, spec):
+        scale_x, scale_y, forward, rise, add, multiply = spec
+        width, height = image.get_size()
+        size = max(1, int(round(width * scale_x))), max(1, int(round(height * scale_y)))
+        frame = image if size == (width, height) else pygame.transform.smoothscale(image, size)
+        frame = _tinted(frame, add, multiply)
+        rect = frame.get_rect(midbottom=(self.base_rect.centerx + forward * self.facing,
+                                         self.base_rect.bottom - rise))
+        return frame, rect
+
+    def surfaces(self):
+        """所有变体贴图（供动态分辨率预先生成缩放版本）"""
+        return [surface for surface, _ in self.variants.values()]
+
+    def pose(self, cues, frame):
+        """按本帧的提示选出状态和帧序号；cues 为 [(状态, 经过的步数, 是否停在高潮帧)]，frame 为模拟帧号"""
+        self.shielded = False
+        best = None
+        for state, age, sustain in cues:
+            if state == 'shield':
+                self.shielded = True
+                continue
+            index = age // FRAME_STEPS[state]
+            if sustain:
+                index = min(index, PEAK_FRAME)
+            elif index >= self.frame_counts[state]:
+                # 动画已播放完
+                continue
+            rank = PRIORITY.index(state)
+            if best is None or (rank, age) < best[0]:
+                best = (rank, age), state, index
+        if best is None:
+            self.state = 'idle'
+            self.frame = frame // FRAME_STEPS['idle'] % self.frame_counts['idle']
+        else:
+            _, self.state, self.frame = best
+
+    def sprite(self):
+        """本帧要绘制的 (surface, rect)"""
+        return self.variants[self.state, self.frame, self.shielded]
+
+
+class Characters:
+    """场上的所有人物：每帧从特效收集提示，更新各自的动画帧
+
+    特效通过 cues() 给出提示；没有 cues() 的特效（如外部加入的自定义特效）不影响人物动作。
+    """
+
+    def __init__(self, sprites):
+        self.sprites = sprites
+
+    def update(self, effects, frame):
+        cues = {sprite.player: [] for sprite in self.sprites}
+        for effect in effects:
+            effect_cues = getattr(effect, 'cues', None)
+            if effect_cues is None:
+                continue
+            for player, state, age, sustain in effect_cues():
+                if player in cues:
+                    cues[player].append((state, age, sustain))
+        for sprite in self.sprites:
+            sprite.pose(cues[sprite.player], frame)
+
+    def layers(self):
+        """[(surface, rect)]，与渲染器的静态层参数格式相同"""
+        return [sprite.sprite() for sprite in self.sprites]
+
+    def surfaces(self):
+        return [surface for sprite in self.sprites for surface in sprite.surfaces()]
@@ -0,0 +1,324 @@
+"""战斗规则与批量蒙特卡洛对战模拟
+
+技能数值以数据形式定义（SKILLS），特效中显示的数值也从这里读取。
+Battle 把 N 局对战的状态存成以对局编号为最后一维的数组，每个战斗刻对所有对局
+同时结算；N=1 时即为单局战斗引擎。
+
+规则：
+- 伤害先由护盾吸收，剩余部分扣生命值；护盾可叠加，上限 MAX_SHIELD。
+- 治疗不超过生命上限。
+- 减益：被火焰命中的一方在 DEBUFF_SECONDS 秒内造成的伤害减少 debuff 点。
+- 技能释放后经过 delay 秒（特效飞行/蓄力时间）才生效，期间进入冷却；
+  任何技能释放后都有 GLOBAL_COOLDOWN 秒的公共冷却。
+- 一方生命值降到 0 即负；双方同时倒下或超时为平局。
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+
+class Skill:
+    """技能数据：数值、冷却和生效延迟（秒）"""
+
+    def __init__(self, name, damage=0, heal=0, shield=0, debuff=0, cooldown=1.0, delay=0.1):
+        self.name = name
+        self.damage = damage
+        self.heal = heal
+        self.shield = shield
+        self.debuff = debuff
+        self.cooldown = cooldown
+        self.delay = delay
+
+
+# 延迟与特效时长一致：普通攻击约 7 帧命中，火球约 10 帧，大招蓄力 1 秒后爆发
+SKILLS = {
+    'normal': Skill('normal', damage=10, cooldown=0.5, delay=0.12),
+    'heal': Skill('heal', heal=15, cooldown=4.0, delay=0.3),
+    'flame': Skill('flame', damage=40, debuff=8, cooldown=3.0, delay=0.17),
+    'shield': Skill('shield', shield=20, cooldown=5.0, delay=0.1),
+    'ultimate': Skill('ultimate', damage=90, heal=20, cooldown=12.0, delay=1.0),
+}
+SKILL_NAMES = list(SKILLS)
+
+MAX_HP = 250
+MAX_SHIELD = 40
+DEBUFF_SECONDS = 3.0
+GLOBAL_COOLDOWN = 0.5
+
+
+class Battle:
+    """N 局两人对战的向量化状态
+
+    数组形状：hp、shield、debuff 为 (2, N)，cooldown、pending 为 (2, 技能数, N)。
+    pending 为技能生效前剩余的战斗刻，-1 表示没有在途的技能。
+    """
+
+    def __init__(self, n, tick_rate=10, max_seconds=90, skills=None):
+        self.n = n
+        self.tick_rate = tick_rate
+        self.skills = [SKILLS[name] for name in (skills or SKILL_NAMES)]
+        count = len(self.skills)
+
+        def ticks(seconds):
+            return max(1, int(round(seconds * tick_rate)))
+
+        self.cooldown_ticks = np.array([ticks(skill.cooldown) for skill in self.skills], dtype=np.int16)
+        self.delay_ticks = np.array([ticks(skill.delay) for skill in self.skills], dtype=np.int16)
+        self.gcd_ticks = ticks(GLOBAL_COOLDOWN)
+        self.debuff_ticks = ticks(DEBUFF_SECONDS)
+        self.max_ticks = ticks(max_seconds)
+        self.damage_values = np.array([skill.damage for skill in self.skills], dtype=np.float32)
+        self.heal_values = np.array([skill.heal for skill in self.skills], dtype=np.float32)
+        self.shield_values = np.array([skill.shield for skill in self.skills], dtype=np.float32)
+        self.damage_skills = [s for s, skill in enumerate(self.skills) if skill.damage]
+        self.debuff_skills = [s for s, skill in enumerate(self.skills) if skill.debuff]
+
+        self.hp = np.full((2, n), MAX_HP, dtype=np.float32)
+        self.shield = np.zeros((2, n), dtype=np.float32)
+        self.debuff = np.zeros((2, n), dtype=np.int16)
+        self.debuff_amount = np.zeros((2, n), dtype=np.float32)
+        self.gcd = np.zeros((2, n), dtype=np.int16)
+        self.cooldown = np.zeros((2, count, n), dtype=np.int16)
+        self.pending = np.full((2, count, n), -1, dtype=np.int16)
+        self.running = np.ones(n, dtype=bool)
+        # -1 进行中，0/1 为获胜方，2 为平局
+        self.winner = np.full(n, -1, dtype=np.int8)
+        self.length = np.zeros(n, dtype=np.int32)
+        self.tick = 0
+        self.casts = np.zeros((2, count), dtype=np.int64)
+        self._available = [None, None]
+
+    def index(self, name):
+        return [skill.name for skill in self.skills].index(name)
+
+    def available(self, player):
+        """(技能数, N) 布尔数组：该玩家本刻可以释放的技能（同一刻内缓存）"""
+        available = self._available[player]
+        if available is None:
+            ready = (self.cooldown[player] == 0) & (self.pending[player] < 0)
+            available = self._available[player] = ready & (self.gcd[player] == 0) & self.running
+        return available
+
+    def cast(self, player, choice):
+        """choice 为 (N,) 技能下标，-1 表示不释放；不可用的选择会被忽略"""
+        choice = np.asarray(choice)
+        matches = np.flatnonzero(choice >= 0)
+        if matches.size == 0:
+            return
+        skills = choice[matches]
+        ok = self.available(player)[skills, matches]
+        matches, skills = matches[ok], skills[ok]
+        self.pending[player, skills, matches] = self.delay_ticks[skills]
+        self.cooldown[player, skills, matches] = self.cooldown_ticks[skills]
+        self.gcd[player, matches] = self.gcd_ticks
+        self.casts[player] += np.bincount(skills, minlength=len(self.skills))
+        self._available[player] = None
+
+    def step(self):
+        """推进一个战斗刻：计时器递减，结算到期技能，判定胜负"""
+        self._available = [None, None]
+        running = self.running
+        self.cooldown -= self.cooldown > 0
+        self.gcd -= self.gcd > 0
+        self.debuff -= self.debuff > 0
+        self.pending -= self.pending > 0
+
+        # 本刻生效的技能 (2, 技能数, N)，结算后清除
+        due = (self.pending == 0) & running
+        self.pending[due] = -1
+        due = due.astype(np.float32)
+
+        # 治疗、加盾与伤害都按技能数据加权求和；伤害受施法者减益影响
+        heal = np.einsum('s,psn->pn', self.heal_values, due)
+        shield = np.einsum('s,psn->pn', self.shield_values, due)
+        penalty = np.where(self.debuff > 0, self.debuff_amount, 0)
+        dealt = np.zeros((2, self.n), dtype=np.float32)
+        for s in self.damage_skills:
+            dealt += due[:, s] * np.maximum(self.damage_values[s] - penalty, 0)
+        incoming = dealt[::-1]
+
+        # 双方同时结算：先治疗和加盾，再由护盾吸收伤害
+        np.minimum(self.hp + heal, MAX_HP, out=self.hp)
+        np.minimum(self.shield + shield, MAX_SHIELD, out=self.shield)
+        absorbed = np.minimum(self.shield, incoming)
+        self.shield -= absorbed
+        self.hp -= incoming - absorbed
+        for s in self.debuff_skills:
+            # 对方释放的减益技能命中自己
+            hit = due[::-1, s] > 0
+            self.debuff[hit] = self.debuff_ticks
+            self.debuff_amount[hit] = self.skills[s].debuff
+
+        self.tick += 1
+        dead = self.hp <= 0
+        timeout = self.tick >= self.max_ticks
+        finished = running & (dead[0] | dead[1] | timeout)
+        if finished.any():
+            winner = np.where(dead[0] & dead[1], 2, np.where(dead[1], 0, np.where(dead[0], 1, 2)))
+            self.winner[finished] = winner[finished]
+            self.length[finished] = self.tick
+            self.running &= ~finished
+
+    def seconds(self):
+        return self.length / self.tick_rate
+
+
+def _priority(battle, player, rules):
+    """按优先级选择技能：rules 为 [(技能名, 条件数组或 True)]，靠前的优先"""
+    available = battle.available(player)
+    choice = np.full(battle.n, -1, dtype=np.int16)
+    for name, condition in reversed(rules):
+        s = battle.index(name)
+        choice = np.where(available[s] & condition, s, choice)
+    return choice
+
+
+def random_strategy(battle, player, rng):
+    """在可用技能中随机选择"""
+    available = battle.available(player)
+    # 在可用技能里均匀抽第 pick 个：逐个技能累计可用数，累计数等于 pick 时选中
+    pick = (rng.random(battle.n, dtype=np.float32) * available.sum(axis=0)).astype(np.int16)
+    choice = np.full(battle.n, -1, dtype=np.int16)
+    seen = np.zeros(battle.n, dtype=np.int16)
+    for s in range(len(available)):
+        choice[available[s] & (seen == pick)] = s
+        seen += available[s]
+    return choice
+
+
+def aggressive_strategy(battle, player, rng):
+    """只进攻：大招 > 火焰 > 普通攻击"""
+    return _priority(battle, player, [('ultimate', True), ('flame', True), ('normal', True)])
+
+
+def defensive_strategy(battle, player, rng):
+    """先保证护盾和生命值，再进攻"""
+    return _priority(battle, player, [
+        ('shield', battle.shield[player] <= 0),
+        ('heal', battle.hp[player] < MAX_HP * 0.6),
+        ('ultimate', True), ('flame', True), ('normal', True),
+    ])
+
+
+def reactive_strategy(battle, player, rng):
+    """对手大招在途时开盾，残血时治疗，其余时间按伤害优先进攻"""
+    enemy = 1 - player
+    ultimate_incoming = battle.pending[enemy, battle.index('ultimate')] >= 0
+    return _priority(battle, player, [
+        ('shield', ultimate_incoming),
+        ('heal', battle.hp[player] < MAX_HP * 0.4),
+        ('ultimate', True), ('flame', True), ('normal', True),
+    ])
+
+
+STRATEGIES = {
+    'random': random_strategy,
+    'aggressive': aggressive_strategy,
+    'defensive': defensive_strategy,
+    'reactive': reactive_strategy,
+}
+
+
+def _play(n, strategies, rng, tick_rate, max_seconds, reaction, mistakes):
+    """并行打完 n 局，返回结束状态"""
+    battle = Battle(n, tick_rate, max_seconds)
+    while battle.running.any():
+        # 双方同时决策，避免先手优势
+        choices = []
+        for player in (0, 1):
+            choice = strategies[player](battle, player, rng)
+            if mistakes:
+                choice = np.where(rng.random(n, dtype=np.float32) < mistakes,
+                                  random_strategy(battle, player, rng), choice)
+            if reaction < 1:
+                choice = np.where(rng.random(n, dtype=np.float32) < reaction, choice, -1)
+            choices.append(choice)
+        for player in (0, 1):
+            battle.cast(player, choices[player])
+        battle.step()
+    return battle
+
+
+def simulate(n, strategy1, strategy2, seed=0, tick_rate=10, max_seconds=90, reaction=0.5, mistakes=0.1,
+             chunk=50000):
+    """并行模拟 n 局，返回胜率、对局时长分布和技能使用次数
+
+    模拟玩家操作的不确定性：每个战斗刻只有 reaction 的概率做出操作（反应时间），
+    操作时有 mistakes 的概率随机释放一个可用技能而不是按策略选择。
+    对局按 chunk 分批推进，限制大批量模拟时的内存占用。
+    """
+    rng = np.random.Generator(np.random.PCG64(seed))
+    strategies = (STRATEGIES[strategy1], STRATEGIES[strategy2])
+    winners, lengths = [], []
+    casts = np.zeros((2, len(SKILL_NAMES)), dtype=np.int64)
+    for start in range(0, n, chunk):
+        battle = _play(min(chunk, n - start), strategies, rng, tick_rate, max_seconds, reaction, mistakes)
+        winners.append(battle.winner)
+        lengths.append(battle.seconds())
+        casts += battle.casts
+
+    seconds = np.concatenate(lengths)
+    counts = np.bincount(np.concatenate(winners), minlength=3)
+    edges = np.arange(0, max_seconds + 5, 5)
+    hist, _ = np.histogram(seconds, bins=edges)
+    return {
+        'matches': n,
+        'strategies': [strategy1, strategy2],
+        'win_rate': [float(counts[0] / n), float(counts[1] / n)],
+        'draw_rate': float(counts[2] / n),
+        'length_s': {
+            'mean': float(seconds.mean()),
+            'p10': float(np.percentile(seconds, 10)),
+            'p50': float(np.percentile(seconds, 50)),
+            'p90': float(np.percentile(seconds, 90)),
+            'max': float(seconds.max()),
+        },
+        'length_histogram': {'%d-%ds' % (lo, hi): int(count)
+                             for lo, hi, count in zip(edges[:-1], edges[1:], hist)},
+        'casts_per_match': [{name: float(casts[player, s] / n) for s, name in enumerate(SKILL_NAMES)}
+                            for player in (0, 1)],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量模拟两人对战，统计胜率和对局时长')
+    parser.add_argument('--matches', type=int, default=200000, help='对局数')
+    parser.add_argument('--p1', default='reactive', choices=sorted(STRATEGIES), help='玩家 1 策略')
+    parser.add_argument('--p2', default='aggressive', choices=sorted(STRATEGIES), help='玩家 2 策略')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--tick-rate', type=int, default=10, help='每秒战斗刻数')
+    parser.add_argument('--max-seconds', type=float, default=90, help='超时判平局的时长')
+    parser.add_argument('--reaction', type=float, default=0.5, help='每个战斗刻做出操作的概率')
+    parser.add_argument('--mistakes', type=float, default=0.1, help='操作时随机选技能的概率')
+    parser.add_argument('--matrix', action='store_true', help='所有策略两两对战，输出胜率矩阵')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出完整结果')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.matrix:
+        names = sorted(STRATEGIES)
+        results = [simulate(args.matches, a, b, args.seed, args.tick_rate, args.max_seconds,
+                            args.reaction, args.mistakes)
+                   for a in names for b in names]
+    else:
+        results = [simulate(args.matches, args.p1, args.p2, args.seed, args.tick_rate, args.max_seconds,
+                            args.reaction, args.mistakes)]
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in results:
+        p1, p2 = result['strategies']
+        length = result['length_s']
+        print('%-10s vs %-10s  胜率 %5.1f%% / %5.1f%%  平局 %4.1f%%  时长 平均 %.1fs p50 %.1fs p90 %.1fs' % (
+            p1, p2, result['win_rate'][0] * 100, result['win_rate'][1] * 100, result['draw_rate'] * 100,
+            length['mean'], length['p50'], length['p90']))
+    total = sum(result['matches'] for result in results)
+    print('共 %d 局，用时 %.2f s（%.0f 局/秒）' % (total, elapsed, total / elapsed))
+
+
+if __name__ == '__main__':
+    main()
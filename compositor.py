@@ -0,0 +1,40 @@
+import pygame
+
+from resolution import RenderTarget, scale_of, scaled_rect
+
+
+class Overlay:
+    """共享的全屏 SRCALPHA 叠加层
+
+    特效把半透明线条等图元直接画进这一层，再按特效的包围盒一次性贴回目标画面，
+    取代每条线一个临时 Surface 的做法。叠加层只在目标尺寸变化时重新分配，
+    并沿用目标的缩放比例（见 resolution.RenderTarget）：rect 和画进叠加层的图元都用世界坐标。
+    """
+
+    def __init__(self):
+        self.layer = None
+        self.rect = None
+        self.composites = 0
+
+    def begin(self, surface, rect=None):
+        """取得叠加层并清空本次要用的区域，rect 为空时使用整层"""
+        size = surface.get_size()
+        if self.layer is None or self.layer.get_size() != size:
+            self.layer = RenderTarget(size, flags=pygame.SRCALPHA)
+        self.layer.scale = scale_of(surface)
+        bounds = self.layer.get_rect()
+        self.rect = bounds if rect is None else scaled_rect(surface, rect).clip(bounds)
+        self.layer.fill((0, 0, 0, 0), self.rect)
+        return self.layer
+
+    def composite(self, surface):
+        """把本次使用的区域一次性贴回目标画面"""
+        if self.rect is None or not self.rect.width or not self.rect.height:
+            return
+        surface.blit(self.layer, self.rect.topleft, self.rect)
+        self.composites += 1
+        self.rect = None
+
+
+# 全局共享的叠加层
+overlay = Overlay()
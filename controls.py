@@ -0,0 +1,205 @@
+"""玩家输入：键盘和手柄按键映射到双方的五个技能，按帧缓冲并测量输入到画面的延迟
+
+事件在每帧开头取出后记下到达时间（time.perf_counter）和渲染帧号，先放进输入缓冲，
+本帧事件处理完后统一派发：技能可以释放时立即施法，仍在冷却中的输入保留 queue_ms 毫秒，
+期间冷却结束就补发（提前按下不会丢），超时则丢弃。冷却按 combat.SKILLS 的技能冷却和
+GLOBAL_COOLDOWN 公共冷却计算，以模拟步为单位，与帧率无关。
+
+每次施法得到一个序号（本局第几个特效），画面呈现后用所画状态已创建的特效数判断施法是否已上屏，
+从到达到第一次上屏的毫秒数和帧数记入延迟记录，可导出直方图用于调整缓冲窗口、流水线等设置。
+pygame 的按键事件不带系统时间戳，到达时间是程序取到事件的时刻，不含系统输入队列和显示器扫描的延迟。
+"""
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+from combat import GLOBAL_COOLDOWN, SKILL_NAMES, SKILLS
+
+# 键盘：按键 -> (玩家, 技能)；左侧玩家用 A S D F G，右侧玩家用 J K L ; '
+KEY_BINDINGS = {
+    pygame.K_a: (0, 'normal'),
+    pygame.K_s: (0, 'heal'),
+    pygame.K_d: (0, 'flame'),
+    pygame.K_f: (0, 'shield'),
+    pygame.K_g: (0, 'ultimate'),
+    pygame.K_j: (1, 'normal'),
+    pygame.K_k: (1, 'heal'),
+    pygame.K_l: (1, 'flame'),
+    pygame.K_SEMICOLON: (1, 'shield'),
+    pygame.K_QUOTE: (1, 'ultimate'),
+}
+
+# 手柄：按钮编号 -> 技能（Xbox 布局为 A B X Y LB）；第一个接入的手柄控制左侧玩家，第二个控制右侧
+GAMEPAD_BUTTONS = {0: 'normal', 1: 'heal', 2: 'flame', 3: 'shield', 4: 'ultimate'}
+
+# 冷却中的输入默认保留的毫秒数
+QUEUE_MS = 150
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+class Controls:
+    """输入映射、缓冲和延迟统计
+
+    cast(kind, player) 执行施法并返回施法序号（施法后本局已创建的特效数）；
+    tick_rate 为每秒模拟步数，用于把技能冷却换算成步数。
+    """
+
+    def __init__(self, cast, tick_rate, queue_ms=QUEUE_MS, key_bindings=KEY_BINDINGS,
+                 gamepad_buttons=GAMEPAD_BUTTONS, history=4096):
+        self.cast = cast
+        self.queue_ms = queue_ms
+        self.key_bindings = key_bindings
+        self.gamepad_buttons = gamepad_buttons
+
+        def steps(seconds):
+            return max(1, int(round(seconds * tick_rate)))
+
+        self.cooldown_steps = {name: steps(SKILLS[name].cooldown) for name in SKILL_NAMES}
+        self.gcd_steps = steps(GLOBAL_COOLDOWN)
+        # 玩家 -> 技能 -> 可以再次释放的模拟步；'*' 为公共冷却
+        self.ready_at = [dict.fromkeys(['*'] + SKILL_NAMES, 0) for _ in range(2)]
+        # 手柄 instance_id -> 玩家；joysticks 保留 Joystick 对象，手柄才会持续发出事件
+        self.gamepads = {}
+        self.joysticks = {}
+        self.buffer = []
+        # 已施法但还没上屏的输入
+        self.pending = deque()
+        self.records = deque(maxlen=history)
+        self.dropped = 0
+
+    def open_gamepads(self):
+        """初始化手柄子系统；已接入的手柄会随后以 JOYDEVICEADDED 事件报告"""
+        pygame.joystick.init()
+
+    def handle(self, event, arrived, frame):
+        """处理一个事件，是技能输入时放入缓冲并返回 True；arrived 为取到事件的时刻，frame 为渲染帧号"""
+        if event.type == pygame.KEYDOWN:
+            binding = self.key_bindings.get(event.key)
+            if binding is None:
+                return False
+            player, kind = binding
+        elif event.type == pygame.JOYBUTTONDOWN:
+            player = self.gamepads.get(event.instance_id)
+            kind = self.gamepad_buttons.get(event.button)
+            if player is None or kind is None:
+                return False
+        elif event.type == pygame.JOYDEVICEADDED:
+            self._add_gamepad(event.device_index)
+            return True
+        elif event.type == pygame.JOYDEVICEREMOVED:
+            self.gamepads.pop(event.instance_id, None)
+            self.joysticks.pop(event.instance_id, None)
+            return True
+        else:
+            return False
+        self.buffer.append({'player': player, 'skill': kind, 'arrived': arrived, 'frame': frame})
+        return True
+
+    def _add_gamepad(self, device_index):
+        joystick = pygame.joystick.Joystick(device_index)
+        instance_id = joystick.get_instance_id()
+        taken = set(self.gamepads.values())
+        free = [player for player in (0, 1) if player not in taken]
+        if instance_id in self.gamepads or not free:
+            return
+        self.gamepads[instance_id] = free[0]
+        self.joysticks[instance_id] = joystick
+
+    def dispatch(self, step, now=None):
+        """每帧事件处理完后调用一次：step 为当前模拟步，能释放的输入立即施法，冷却中的继续排队或过期丢弃"""
+        if not self.buffer:
+            return
+        now = time.perf_counter() if now is None else now
+        waiting = []
+        for entry in self.buffer:
+            ready = self.ready_at[entry['player']]
+            if step >= ready['*'] and step >= ready[entry['skill']]:
+                ready['*'] = step + self.gcd_steps
+                ready[entry['skill']] = step + self.cooldown_steps[entry['skill']]
+                entry['queued_ms'] = (now - entry['arrived']) * 1000.0
+                entry['ticket'] = self.cast(entry['skill'], entry['player'])
+                self.pending.append(entry)
+            elif (now - entry['arrived']) * 1000.0 <= self.queue_ms:
+                waiting.append(entry)
+            else:
+                self.dropped += 1
+        self.buffer = waiting
+
+    def presented(self, spawned, frame, now=None):
+        """画面呈现后调用：spawned 为所画状态已创建的特效数，frame 为渲染帧号；
+        施法序号不超过 spawned 的输入即已上屏"""
+        pending = self.pending
+        if not pending or pending[0]['ticket'] > spawned:
+            return
+        now = time.perf_counter() if now is None else now
+        while pending and pending[0]['ticket'] <= spawned:
+            entry = pending.popleft()
+            self.records.append({
+                'player': entry['player'],
+                'skill': entry['skill'],
+                'latency_ms': (now - entry['arrived']) * 1000.0,
+                'frames': frame - entry['frame'],
+                'queued_ms': entry['queued_ms'],
+            })
+
+    @property
+    def last_latency_ms(self):
+        return self.records[-1]['latency_ms'] if self.records else 0.0
+
+    def stats(self):
+        """延迟统计：排队等冷却的时间也计入延迟，queued_ms 单独列出"""
+        if not self.records:
+            return {'inputs': 0, 'dropped': self.dropped}
+        latency = [record['latency_ms'] for record in self.records]
+        frames = [record['frames'] for record in self.records]
+        return {
+            'inputs': len(self.records),
+            'dropped': self.dropped,
+            'latency_ms_mean': sum(latency) / len(latency),
+            'latency_ms_p50': _percentile(latency, 50),
+            'latency_ms_p95': _percentile(latency, 95),
+            'latency_ms_max': max(latency),
+            'frames_mean': sum(frames) / len(frames),
+            'frames_max': max(frames),
+            'queued': sum(1 for record in self.records if record['queued_ms'] > 0.5),
+        }
+
+    def histogram(self, bin_ms=2.0):
+        """延迟直方图：[(区间下限毫秒, 次数)]，以及 {帧数: 次数}"""
+        bins = {}
+        frames = {}
+        for record in self.records:
+            low = int(record['latency_ms'] // bin_ms) * bin_ms
+            bins[low] = bins.get(low, 0) + 1
+            frames[record['frames']] = frames.get(record['frames'], 0) + 1
+        return sorted(bins.items()), dict(sorted(frames.items()))
+
+    def export(self, path, bin_ms=2.0):
+        """按扩展名导出：.csv 为直方图表格（每个毫秒区间一行，每个帧数一行），其他为包含逐次记录的 JSON"""
+        bins, frames = self.histogram(bin_ms)
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['unit', 'low', 'high', 'count'])
+                for low, count in bins:
+                    writer.writerow(['ms', low, low + bin_ms, count])
+                for count_frames, count in frames.items():
+                    writer.writerow(['frames', count_frames, count_frames + 1, count])
+            return
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'queue_ms': self.queue_ms,
+                'bin_ms': bin_ms,
+                'stats': self.stats(),
+                'histogram_ms': [{'low': low, 'count': count} for low, count in bins],
+                'histogram_frames': {str(key): count for key, count in frames.items()},
+                'records': list(self.records),
+            }, f, ensure_ascii=False, indent=1)
@@ -0,0 +1,143 @@
+from particles import ParticleSystem
+from profiler import profiler
+from simulation import DETAIL_LEVELS, Simulation
+
+# 每个特效除粒子外固定的绘制调用数估计（光环、光球、文字等）
+SHAPE_DRAW_CALLS = 8
+
+
+def _measured_update(effect):
+    profiler.measure(effect, 'update', effect.update)
+
+
+class EffectManager:
+    """统一管理所有激活特效：一次遍历完成更新和绘制，并按预算调整细节等级
+
+    超出粒子或绘制调用预算、或帧时间超过目标时逐级降低细节（减少粒子生成、
+    去掉多层光晕、剔除接近透明的粒子）；负载回落并保持一段时间后再逐级恢复。
+
+    特效状态保存在 simulation（无头 Simulation）中，管理器只负责预算、细节等级和绘制，
+    因此同一局可以快照、回放或交给无头模拟继续推进。
+    传入 particle_batch（particle_render.ParticleBatch）时所有粒子批量光栅化后一次合成。
+    """
+
+    def __init__(self, simulation=None, max_particles=1500, max_draw_calls=1200,
+                 target_frame_ms=1000 / 60, raise_after=60, particle_batch=None):
+        if simulation is None:
+            from skills import EFFECT_TYPES
+            simulation = Simulation(types=EFFECT_TYPES)
+        self.simulation = simulation
+        self.particle_batch = particle_batch
+        self.max_particles = max_particles
+        self.max_draw_calls = max_draw_calls
+        self.target_frame_ms = target_frame_ms
+        # 负载低于预算多少帧后才提升一级细节，避免来回抖动
+        self.raise_after = raise_after
+        self.level = 0
+        self.calm_frames = 0
+        self.particles = 0
+        self.draw_calls = 0
+        self.level_changes = 0
+        self._blits_seen = ParticleSystem.blits_drawn
+        simulation.set_detail(self.detail)
+
+    def __len__(self):
+        return len(self.effects)
+
+    def __iter__(self):
+        return iter(self.effects)
+
+    @property
+    def effects(self):
+        # 回滚或回放跳转会整体替换 simulation.effects，这里每次都取最新的列表
+        return self.simulation.effects
+
+    @property
+    def detail(self):
+        return DETAIL_LEVELS[self.level]
+
+    def add(self, effect):
+        effect.detail = self.detail
+        self.effects.append(effect)
+        return effect
+
+    def spawn(self, kind, *args, **kwargs):
+        """按名称创建特效，随机源从本局种子派生，可由回放复现"""
+        return self.simulation.spawn(kind, *args, **kwargs)
+
+    def clear(self):
+        self.effects.clear()
+
+    def update(self):
+        """推进所有特效一步，并移除已结束的特效"""
+        if profiler.enabled:
+            self.simulation.step(_measured_update)
+        else:
+            self.simulation.step()
+
+    def interpolate(self, alpha):
+        """设置绘制时的插值系数（游戏循环的 alpha），投射物画在上一步与当前步之间"""
+        self.simulation.timeline.alpha = alpha
+        for effect in self.effects:
+            if effect.owns_timeline:
+                effect.timeline.alpha = alpha
+
+    def draw(self, surface, effects=None):
+        """绘制所有特效；effects 为另一组特效（如流水线模式下的只读快照）时改为绘制它"""
+        if effects is None:
+            effects = self.effects
+        batch = self.particle_batch
+        if batch is not None:
+            batch.begin(surface)
+        if profiler.enabled:
+            for effect in effects:
+                profiler.measure(effect, 'draw', effect.draw, surface)
+        else:
+            for effect in effects:
+                effect.draw(surface)
+        if batch is not None:
+            with profiler.section('particles'):
+                batch.flush()
+
+    def bounds(self):
+        return [effect.bounds() for effect in self.effects]
+
+    def _set_level(self, level):
+        level = max(0, min(level, len(DETAIL_LEVELS) - 1))
+        if level == self.level:
+            return
+        self.level = level
+        self.level_changes += 1
+        self.simulation.set_detail(self.detail)
+
+    def adjust(self, frame_ms=None):
+        """每个渲染帧结束时调用一次，根据预算和帧时间调整细节等级"""
+        self.particles = sum(effect.particle_count() for effect in self.effects)
+        blits = ParticleSystem.blits_drawn
+        self.draw_calls = blits - self._blits_seen + SHAPE_DRAW_CALLS * len(self.effects)
+        self._blits_seen = blits
+
+        over_budget = self.particles > self.max_particles or self.draw_calls > self.max_draw_calls
+        too_slow = frame_ms is not None and frame_ms > self.target_frame_ms * 1.1
+        if over_budget or too_slow:
+            self.calm_frames = 0
+            self._set_level(self.level + 1)
+            return
+
+        relaxed = self.particles < self.max_particles * 0.6 and self.draw_calls < self.max_draw_calls * 0.6
+        if relaxed and (frame_ms is None or frame_ms < self.target_frame_ms * 0.8):
+            self.calm_frames += 1
+            if self.calm_frames >= self.raise_after:
+                self.calm_frames = 0
+                self._set_level(self.level - 1)
+        else:
+            self.calm_frames = 0
+
+    def stats(self):
+        return {
+            'effects': len(self.effects),
+            'particles': self.particles,
+            'draw_calls': self.draw_calls,
+            'level': self.level,
+            'level_changes': self.level_changes,
+        }
@@ -0,0 +1,109 @@
+import secrets
+
+import numpy as np
+
+
+class EffectRNG:
+    """特效随机源：按大块预生成 [0, 1) 随机数，逐个或成批取用
+
+    取代每个粒子多次调用 random 模块；可按对局和特效分别设种子，
+    使基准测试和回放完全可复现。
+    """
+
+    def __init__(self, seed=None, block_size=1024):
+        self.block_size = block_size
+        self._generator = np.random.Generator(np.random.PCG64(seed))
+        self._refill()
+
+    def _refill(self):
+        # 记下生成本块之前的生成器状态，快照恢复时据此重新生成同一块
+        self._block_state = self._generator.bit_generator.state
+        self._array = self._generator.random(self.block_size)
+        self._values = self._array.tolist()
+        self._index = 0
+
+    def _take(self, n):
+        """取出 n 个 [0, 1) 随机数组成的数组"""
+        if n > self.block_size:
+            return self._generator.random(n)
+        if self._index + n > self.block_size:
+            self._refill()
+        start = self._index
+        self._index += n
+        return self._array[start:self._index]
+
+    def get_state(self):
+        """紧凑的完整状态：(块大小, 块起始状态, 生成器当前状态, 块内位置)"""
+        return (self.block_size, _pack_state(self._block_state),
+                _pack_state(self._generator.bit_generator.state), self._index)
+
+    @classmethod
+    def from_state(cls, state):
+        """由 get_state() 的结果重建随机源，之后取出的随机数与原随机源完全一致"""
+        block_size, block_state, current_state, index = state
+        rng = cls.__new__(cls)
+        rng.block_size = block_size
+        rng._generator = np.random.Generator(np.random.PCG64(0))
+        rng._generator.bit_generator.state = _unpack_state(block_state)
+        rng._refill()
+        # 超过块大小的批量请求会直接从生成器取数，当前状态可能已越过本块
+        rng._generator.bit_generator.state = _unpack_state(current_state)
+        rng._index = index
+        return rng
+
+    def random(self, size=None):
+        if size is None:
+            if self._index >= self.block_size:
+                self._refill()
+            value = self._values[self._index]
+            self._index += 1
+            return value
+        return self._take(size)
+
+    def uniform(self, low, high, size=None):
+        return low + (high - low) * self.random(size)
+
+    def randint(self, low, high, size=None):
+        """[low, high] 闭区间整数，与 random.randint 一致"""
+        if size is None:
+            return low + int(self.random() * (high - low + 1))
+        return low + (self._take(size) * (high - low + 1)).astype(np.int32)
+
+    def choice(self, seq, size=None):
+        if size is None:
+            return seq[int(self.random() * len(seq))]
+        return np.asarray(seq)[(self._take(size) * len(seq)).astype(np.int32)]
+
+
+def _pack_state(state):
+    return (state['state']['state'], state['state']['inc'], state['has_uint32'], state['uinteger'])
+
+
+def _unpack_state(packed):
+    value, inc, has_uint32, uinteger = packed
+    return {'bit_generator': 'PCG64', 'state': {'state': value, 'inc': inc},
+            'has_uint32': has_uint32, 'uinteger': uinteger}
+
+
+# 对局根种子：每个新特效从中派生独立的子种子
+_match_seed = None
+_match_sequence = np.random.SeedSequence()
+
+
+def seed_match(seed=None):
+    """为一局比赛设置根种子（None 时随机生成），返回实际使用的种子"""
+    global _match_seed, _match_sequence
+    if seed is None:
+        seed = secrets.randbits(63)
+    _match_seed = seed
+    _match_sequence = np.random.SeedSequence(seed)
+    return seed
+
+
+def match_seed():
+    return _match_seed
+
+
+def spawn_rng():
+    """按创建顺序从对局根种子派生一个特效随机源"""
+    return EffectRNG(_match_sequence.spawn(1)[0])
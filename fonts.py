@@ -0,0 +1,108 @@
+import pygame
+
+from resolution import scale_of
+
+
+class FontManager:
+    """进程级字体注册表：每个 (字体, 字号) 只加载一次"""
+
+    def __init__(self):
+        self._fonts = {}
+        self._texts = {}
+        self._atlases = {}
+        # 实际调用 font.render 的次数（缓存未命中），供性能分析统计
+        self.renders = 0
+
+    def get(self, size, name=None):
+        key = (name, size)
+        font = self._fonts.get(key)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.Font(name, size)
+            self._fonts[key] = font
+        return font
+
+    def render_text(self, text, size, color, name=None):
+        """渲染固定文字并缓存结果（如“蓄力中...”）"""
+        key = (text, size, tuple(color), name)
+        rendered = self._texts.get(key)
+        if rendered is None:
+            rendered = self.get(size, name).render(text, True, color)
+            self._texts[key] = rendered
+            self.renders += 1
+        return rendered
+
+    def render(self, text, size, color, name=None):
+        """渲染经常变化、不值得缓存的文字（如性能面板），同样计入 renders"""
+        self.renders += 1
+        return self.get(size, name).render(text, True, color)
+
+    def glyph_atlas(self, size, color, name=None):
+        key = (name, size, tuple(color))
+        atlas = self._atlases.get(key)
+        if atlas is None:
+            atlas = GlyphAtlas(self.get(size, name), color)
+            self._atlases[key] = atlas
+            self.renders += len(GlyphAtlas.GLYPHS)
+        return atlas
+
+
+class GlyphAtlas:
+    """数字字形图集：数字和正负号只渲染一次，任意伤害数值由图块拼出"""
+
+    GLYPHS = '0123456789+-'
+
+    def __init__(self, font, color):
+        glyphs = [font.render(ch, True, color) for ch in self.GLYPHS]
+        self.height = max(glyph.get_height() for glyph in glyphs)
+        self.surface = pygame.Surface((sum(glyph.get_width() for glyph in glyphs), self.height),
+                                      pygame.SRCALPHA)
+        self.rects = {}
+        x = 0
+        for ch, glyph in zip(self.GLYPHS, glyphs):
+            self.surface.blit(glyph, (x, 0))
+            self.rects[ch] = pygame.Rect(x, 0, glyph.get_width(), self.height)
+            x += glyph.get_width()
+
+    def text_width(self, text):
+        return sum(self.rects[ch].width for ch in text)
+
+    def draw(self, surface, value, pos, sign=False, center=False):
+        """绘制数值；sign=True 时正数带“+”号，center=True 时 pos 为中心点"""
+        text = '%+d' % value if sign else '%d' % value
+        x, y = pos
+        if center:
+            x -= self.text_width(text) // 2
+            y -= self.height // 2
+
+        blits = []
+        for ch in text:
+            rect = self.rects[ch]
+            blits.append((self.surface, (x, y), rect))
+            x += rect.width
+        surface.blits(blits, doreturn=False)
+
+
+# 全局共享的字体管理器
+font_manager = FontManager()
+
+
+def _scaled(surface, pos, size):
+    # 缩小的画布（resolution.RenderTarget）上按比例换算位置和字号
+    scale = scale_of(surface)
+    if scale == 1:
+        return pos, size
+    return (pos[0] * scale, pos[1] * scale), max(1, int(round(size * scale)))
+
+
+def draw_number(surface, value, pos, size, color, sign=False, center=False):
+    """用共享字形图集绘制数值"""
+    pos, size = _scaled(surface, pos, size)
+    font_manager.glyph_atlas(size, color).draw(surface, value, pos, sign, center)
+
+
+def draw_text(surface, text, pos, size, color):
+    """绘制缓存的固定文字，pos 为左上角"""
+    pos, size = _scaled(surface, pos, size)
+    surface.blit(font_manager.render_text(text, size, color), pos)
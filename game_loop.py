@@ -0,0 +1,102 @@
+from collections import deque
+
+import pygame
+
+
+def _no_update(dt):
+    pass
+
+
+class GameLoop:
+    """固定步长游戏循环：按目标帧率限速，模拟以固定 dt 推进，渲染使用插值系数 alpha"""
+
+    def __init__(self, target_fps=60, sim_rate=60, max_steps=5, history=240):
+        self.target_fps = target_fps
+        self.dt = 1.0 / sim_rate
+        # 单帧最多补几步模拟，防止卡顿后陷入“越补越慢”的死循环
+        self.max_steps = max_steps
+        self.clock = pygame.time.Clock()
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.running = True
+        self.frame = 0
+        self.sim_steps = 0
+        self.dropped_time = 0.0
+        self.frame_times = deque(maxlen=history)
+        # 上一帧实际工作耗时（不含限速等待），用于判断负载
+        self.work_ms = 0
+
+    def stop(self):
+        self.running = False
+
+    def tick(self, update):
+        """推进一帧：限速等待，再按累积时间执行若干步固定 dt 模拟"""
+        self.wait()
+        return self.step(update)
+
+    def wait(self):
+        """限速等待并开始新的一帧"""
+        # Clock.tick 会让出 CPU 直到达到目标帧率，不再空转占满一个核心
+        frame_ms = self.clock.tick(self.target_fps)
+        self.work_ms = self.clock.get_rawtime()
+        self.frame_times.append(frame_ms)
+        self.frame += 1
+        self.accumulator += frame_ms / 1000.0
+
+    def step(self, update):
+        """按累积时间执行若干步固定 dt 模拟，返回步数"""
+        steps = 0
+        while self.accumulator >= self.dt and steps < self.max_steps:
+            update(self.dt)
+            self.accumulator -= self.dt
+            steps += 1
+        if steps == self.max_steps and self.accumulator >= self.dt:
+            # 丢弃补不上的时间，模拟变慢但保持可响应
+            self.dropped_time += self.accumulator - self.accumulator % self.dt
+            self.accumulator %= self.dt
+        self.sim_steps += steps
+
+        self.alpha = self.accumulator / self.dt
+        return steps
+
+    def run(self, handle_events, update, render):
+        """主循环：handle_events() 返回 False 时退出，update(dt) 推进模拟，render(alpha) 绘制
+
+        alpha 为累积时间中不足一步的部分（0~1），渲染据此在上一步与当前步的状态之间插值（见 Timeline.interpolated）。
+
+        限速等待放在取事件之前，等待期间到达的输入在同一帧内就被模拟和绘制，不会再多等一帧。
+        """
+        while self.running:
+            self.wait()
+            if handle_events() is False:
+                break
+            self.step(update)
+            render(self.alpha)
+
+    def run_pipelined(self, handle_events, submit, render):
+        """流水线主循环：submit(steps) 把本帧的模拟步数交给工作线程，返回上一批模拟完成后的状态，
+        render(alpha, state) 在工作线程推进模拟的同时绘制该状态"""
+        while self.running:
+            self.wait()
+            if handle_events() is False:
+                break
+            state = submit(self.step(_no_update))
+            render(self.alpha, state)
+
+    def stats(self):
+        """最近若干帧的帧时间统计（毫秒）"""
+        if not self.frame_times:
+            return {'frames': self.frame, 'fps': 0.0}
+        # numpy 只在统计时用到，延迟导入以缩短启动时间
+        import numpy as np
+        times = np.asarray(self.frame_times, dtype=np.float64)
+        mean = float(times.mean())
+        return {
+            'frames': self.frame,
+            'fps': 1000.0 / mean if mean > 0 else 0.0,
+            'frame_ms_mean': mean,
+            'frame_ms_p95': float(np.percentile(times, 95)),
+            'frame_ms_max': float(times.max()),
+            'sim_steps': self.sim_steps,
+            'dropped_ms': self.dropped_time * 1000.0,
+        }
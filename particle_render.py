@@ -0,0 +1,263 @@
+import pygame
+import numpy as np
+
+from particles import ParticleSystem
+from resolution import scale_of
+from sprite_cache import particle_sprites
+
+# 批量绘制期间的 ParticleBatch；为 None 时 draw_particles() 逐个 blit 缓存贴图
+_active_batch = None
+
+
+def particle_bounds(particles):
+    """所有存活粒子的包围矩形，没有粒子时返回 None"""
+    n = particles.count
+    if n == 0:
+        return None
+    size = particles.size[:n]
+    left = int(np.floor((particles.x[:n] - size).min())) - 1
+    top = int(np.floor((particles.y[:n] - size).min())) - 1
+    right = int(np.ceil((particles.x[:n] + size).max())) + 1
+    bottom = int(np.ceil((particles.y[:n] + size).max())) + 1
+    return pygame.Rect(left, top, right - left, bottom - top)
+
+
+def _scaled(x, y, size, scale):
+    # 缩小后不足 1 像素的粒子按 1 像素绘制，避免小粒子在低比例下整体消失
+    return x * scale, y * scale, np.maximum(size * scale, 1)
+
+
+def draw_particles(surface, particles, min_alpha=0, cache=particle_sprites):
+    """用缓存的预渲染贴图批量绘制一个粒子系统
+
+    半径不足 1 像素、完全在画面外、或透明度低于 min_alpha 的粒子会被剔除。
+    有 ParticleBatch 正在向 surface 收集粒子时只登记，统一在 flush() 时绘制。
+    surface 为缩小的画布时按比例换算位置和半径，剔除仍按世界坐标下的半径判断。
+    """
+    n = particles.count
+    if n == 0:
+        return
+    if _active_batch is not None and _active_batch.target is surface:
+        _active_batch.add(particles, min_alpha)
+        return
+
+    size = particles.size[:n]
+    x = particles.x[:n]
+    y = particles.y[:n]
+    alive = size >= 1
+    scale = scale_of(surface)
+    if scale != 1:
+        x, y, size = _scaled(x, y, size, scale)
+    width, height = surface.get_size()
+    alpha = 255 * particles.life[:n] // particles.max_life[:n]
+    mask = alive & (x + size >= 0) & (x - size < width) & (y + size >= 0) & (y - size < height)
+    if min_alpha:
+        mask &= alpha >= min_alpha
+    visible = np.flatnonzero(mask)
+    if visible.size == 0:
+        return
+
+    alpha = alpha[visible]
+    size_q, color_q, alpha_q = cache.quantize(size[visible], particles.color[visible], alpha)
+    radius = size_q * cache.size_step
+    left = (x[visible] - radius).astype(np.int32).tolist()
+    top = (y[visible] - radius).astype(np.int32).tolist()
+
+    get = cache.get
+    surface.blits([(get(s, r, g, b, a), (lx, ty))
+                   for s, (r, g, b), a, lx, ty in zip(size_q.tolist(), color_q.tolist(),
+                                                      alpha_q.tolist(), left, top)],
+                  doreturn=False)
+    ParticleSystem.blits_drawn += visible.size
+
+
+class ParticleBatch:
+    """批量光栅化：一帧内收集所有粒子，用 NumPy 累加到浮点缓冲区，再一次 blit 合成到画面
+
+    mode 为 'add'（加色混合，重叠处变亮）或 'alpha'（按透明度加权的顺序无关混合）。
+    每个圆按行拆成跨度，只在跨度两端记增量再沿 x 做前缀和，工作量与行数而不是面积成正比；
+    画面划分为 tile×tile 的方块，只为有粒子的方块分配缓冲区，稀疏散开的粒子不会放大开销。
+    粒子在 flush() 时统一绘制，因此位于同一层，画在各特效的光环、光球等形状之上。
+    """
+
+    def __init__(self, mode='alpha', size_step=particle_sprites.size_step, tile=32):
+        if mode not in ('add', 'alpha'):
+            raise ValueError('未知的混合模式: %s' % mode)
+        self.mode = mode
+        self.size_step = size_step
+        self.tile = tile
+        self.target = None
+        self._pending = []
+        self._rows_cache = {}
+        # 合成层按方块大小向上取整，只在目标尺寸变化时重新分配
+        self._layer = None
+        self._layer_target = None
+        self.particles_drawn = 0
+        self.spans_drawn = 0
+        self.tiles_drawn = 0
+
+    def begin(self, surface):
+        """开始收集画到 surface 上的粒子"""
+        global _active_batch
+        self.target = surface
+        self._pending.clear()
+        _active_batch = self
+
+    def add(self, particles, min_alpha=0):
+        n = particles.count
+        self._pending.append((particles.x[:n], particles.y[:n], particles.size[:n], particles.color[:n],
+                              particles.life[:n], particles.max_life[:n], min_alpha))
+
+    def _rows(self, size_q):
+        """量化半径对应圆形每一行的 (dy, 半宽)，与 pygame.draw.circle 画出的贴图一致"""
+        rows = self._rows_cache.get(size_q)
+        if rows is None:
+            radius = int(size_q * self.size_step)
+            dy = np.arange(-radius, radius + 1, dtype=np.int32)
+            half = np.floor(np.sqrt(radius * radius - dy * dy)).astype(np.int32)
+            rows = self._rows_cache[size_q] = (dy, half)
+        return rows
+
+    def _spans(self, cx, cy, size_q, width, height):
+        """所有粒子的行跨度 (y, x0, x1, 粒子序号)，已裁剪到画面内并在方块边界处拆开"""
+        ys, x0s, x1s, owners = [], [], [], []
+        for value in np.unique(size_q).tolist():
+            chosen = np.flatnonzero(size_q == value)
+            dy, half = self._rows(value)
+            ys.append((cy[chosen, None] + dy).ravel())
+            x0s.append((cx[chosen, None] - half).ravel())
+            x1s.append((cx[chosen, None] + half).ravel())
+            owners.append(np.repeat(chosen, dy.size))
+        y, x0, x1, owner = (np.concatenate(parts) for parts in (ys, x0s, x1s, owners))
+        x0 = np.maximum(x0, 0)
+        x1 = np.minimum(x1, width - 1)
+        keep = np.flatnonzero((y >= 0) & (y < height) & (x0 <= x1))
+        y, x0, x1, owner = y[keep], x0[keep], x1[keep], owner[keep]
+
+        # 跨方块边界的跨度切成两段，剩余部分继续检查，直到每段都在一个方块内
+        tile = self.tile
+        pieces = []
+        while True:
+            boundary = (x0 // tile + 1) * tile
+            cross = np.flatnonzero(x1 >= boundary)
+            if cross.size == 0:
+                pieces.append((y, x0, x1, owner))
+                break
+            inside = np.ones(y.size, dtype=bool)
+            inside[cross] = False
+            pieces.append((y[inside], x0[inside], x1[inside], owner[inside]))
+            pieces.append((y[cross], x0[cross], boundary[cross] - 1, owner[cross]))
+            y, x0, x1, owner = y[cross], boundary[cross], x1[cross], owner[cross]
+        return tuple(np.concatenate(parts) for parts in zip(*pieces))
+
+    def flush(self):
+        """光栅化收集到的粒子并合成到目标上，结束本次收集"""
+        global _active_batch
+        if _active_batch is self:
+            _active_batch = None
+        surface = self.target
+        self.target = None
+        pending = self._pending
+        self._pending = []
+        if not pending:
+            return
+
+        x, y, size, color, life, max_life = (np.concatenate([batch[i] for batch in pending])
+                                             for i in range(6))
+        min_alpha = np.repeat([batch[6] for batch in pending], [len(batch[0]) for batch in pending])
+        alive = size >= 1
+        scale = scale_of(surface)
+        if scale != 1:
+            x, y, size = _scaled(x, y, size, scale)
+        width, height = surface.get_size()
+        alpha = 255 * life // max_life
+        visible = np.flatnonzero(alive & (x + size >= 0) & (x - size < width) &
+                                 (y + size >= 0) & (y - size < height) & (alpha >= min_alpha))
+        if visible.size == 0:
+            return
+
+        size_q = np.rint(size[visible] / self.size_step).astype(np.int32)
+        radius = size_q * self.size_step
+        reach = radius.astype(np.int32)
+        # 与贴图路径相同的取整：贴图左上角取整后加上圆心偏移
+        cx = (x[visible] - radius).astype(np.int32) + reach
+        cy = (y[visible] - radius).astype(np.int32) + reach
+        span_y, span_x0, span_x1, owner = self._spans(cx, cy, size_q, width, height)
+        if span_y.size == 0:
+            return
+
+        # 有跨度的方块压缩编号，缓冲区形状为 (方块数, tile, tile + 1)，多一列存放终点后一格的负增量
+        tile = self.tile
+        columns = -(-width // tile)
+        tile_id = (span_y // tile) * columns + span_x0 // tile
+        occupied = np.zeros(columns * -(-height // tile), dtype=bool)
+        occupied[tile_id] = True
+        tiles = np.flatnonzero(occupied)
+        slot = np.empty(occupied.size, dtype=np.int32)
+        slot[tiles] = np.arange(tiles.size, dtype=np.int32)
+        stride = tile + 1
+        row = (slot[tile_id] * tile + span_y % tile) * stride
+        edges = np.concatenate([row + span_x0 % tile, row + span_x1 % tile + 1])
+        owners = np.concatenate([owner, owner])
+        sign = np.ones(edges.size, dtype=np.float32)
+        sign[span_y.size:] = -1
+        cells = tiles.size * tile * stride
+
+        def accumulate(values):
+            # 每个粒子一个值，按跨度铺开后得到 (方块数, tile, tile) 的逐像素总和
+            delta = np.bincount(edges, values[owners] * sign, cells)
+            return np.cumsum(delta.reshape(tiles.size, tile, stride), axis=2)[:, :, :tile]
+
+        weight = alpha[visible].astype(np.float32) / 255
+        premultiplied = color[visible] * weight[:, None]
+        channels = [accumulate(premultiplied[:, c]) for c in range(3)]
+        if self.mode == 'alpha':
+            coverage = accumulate(weight)
+            # 累积不透明度 1 - Π(1 - a)，颜色取按透明度加权的平均
+            transmit = np.exp(accumulate(np.log1p(-np.minimum(weight, 0.999))))
+            scale = np.divide(1.0, coverage, out=np.zeros_like(coverage), where=coverage > 1e-6)
+            channels = [channel * scale for channel in channels]
+
+        # 方块拼回覆盖所有方块的矩形区域（没有粒子的方块为 0），整块写入合成层后一次 blit
+        tile_y, tile_x = np.divmod(tiles, columns)
+        top, left = int(tile_y.min()), int(tile_x.min())
+        rows, cols = int(tile_y.max()) - top + 1, int(tile_x.max()) - left + 1
+        area = pygame.Rect(left * tile, top * tile, cols * tile, rows * tile)
+        where = (tile_x - left, tile_y - top)
+
+        def assemble(values):
+            # (方块数, tile 行, tile 列) -> surfarray 的 [x, y] 顺序
+            grid = np.zeros((cols, rows, tile, tile), dtype=np.uint8)
+            grid[where] = np.minimum(values, 255).transpose(0, 2, 1)
+            return grid.transpose(0, 2, 1, 3).reshape(cols * tile, rows * tile)
+
+        layer = self._layer_for(surface)
+        region = (slice(area.left, area.right), slice(area.top, area.bottom))
+        pixels = pygame.surfarray.pixels3d(layer)
+        for c, channel in enumerate(channels):
+            pixels[region + (c,)] = assemble(channel)
+        del pixels
+        area = area.clip(surface.get_rect())
+        if self.mode == 'add':
+            surface.blit(layer, area, area, special_flags=pygame.BLEND_RGB_ADD)
+        else:
+            pygame.surfarray.pixels_alpha(layer)[region] = assemble((1 - transmit) * 255)
+            surface.blit(layer, area, area)
+
+        self.particles_drawn += visible.size
+        self.spans_drawn += span_y.size
+        self.tiles_drawn += tiles.size
+        # 整批只算一次绘制调用
+        ParticleSystem.blits_drawn += 1
+
+    def _layer_for(self, surface):
+        size = surface.get_size()
+        if self._layer is None or self._layer_target != size:
+            tile = self.tile
+            padded = (-(-size[0] // tile) * tile, -(-size[1] // tile) * tile)
+            if self.mode == 'add':
+                self._layer = pygame.Surface(padded, 0, 32)
+            else:
+                self._layer = pygame.Surface(padded, pygame.SRCALPHA, 32)
+            self._layer_target = size
+        return self._layer
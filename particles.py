@@ -0,0 +1,110 @@
+import numpy as np
+
+from effect_rng import spawn_rng
+
+
+class ParticleSystem:
+    """结构化数组（SoA）粒子存储，批量更新替代逐个 Particle 对象
+
+    只包含模拟数据，不依赖 pygame；绘制见 particle_render.draw_particles。
+    """
+
+    # 所有粒子系统累计绘制的贴图数，由 particle_render 累加，供预算统计读取增量
+    blits_drawn = 0
+
+    def __init__(self, capacity=64, rng=None):
+        self.count = 0
+        # 未指定的粒子属性从该随机源批量取值
+        self.rng = rng if rng is not None else spawn_rng()
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """分配（或扩容）底层数组，保留已有粒子"""
+        old = None
+        if hasattr(self, 'x'):
+            old = self.x, self.y, self.vx, self.vy, self.gravity, self.size, \
+                self.decay, self.life, self.max_life, self.color
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.gravity = np.zeros(capacity, dtype=np.float32)
+        self.size = np.zeros(capacity, dtype=np.float32)
+        self.decay = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int32)
+        self.max_life = np.ones(capacity, dtype=np.int32)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        if old is not None:
+            n = self.count
+            for new_array, old_array in zip((self.x, self.y, self.vx, self.vy, self.gravity, self.size,
+                                             self.decay, self.life, self.max_life, self.color), old):
+                new_array[:n] = old_array[:n]
+
+    def __len__(self):
+        return self.count
+
+    def emit(self, n, x, y, color=(255, 255, 255), vx=None, vy=None, size=None,
+             life=None, gravity=None, decay=None):
+        """一次性发射 n 个粒子
+
+        参数可以是标量或长度为 n 的数组；未指定的属性沿用原 Particle 的随机默认值。
+        """
+        if n <= 0:
+            return
+        rng = self.rng
+        if vx is None:
+            vx = rng.uniform(-2.0, 2.0, n)
+        if vy is None:
+            vy = rng.uniform(-2.0, 2.0, n)
+        if size is None:
+            size = rng.uniform(1.0, 3.0, n)
+        if life is None:
+            life = rng.randint(20, 60, n)
+        if gravity is None:
+            gravity = rng.uniform(0.05, 0.2, n)
+        if decay is None:
+            decay = rng.uniform(0.05, 0.1, n)
+
+        end = self.count + n
+        if end > self.capacity:
+            self._allocate(max(end, self.capacity * 2))
+
+        s = slice(self.count, end)
+        self.x[s] = x
+        self.y[s] = y
+        self.vx[s] = vx
+        self.vy[s] = vy
+        self.gravity[s] = gravity
+        self.size[s] = size
+        self.decay[s] = decay
+        self.life[s] = life
+        self.max_life[s] = life
+        self.color[s] = color
+        self.count = end
+
+    def update(self):
+        """批量推进一帧，并用交换压缩移除死亡粒子"""
+        n = self.count
+        if n == 0:
+            return
+
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.vy[:n] += self.gravity[:n]
+        self.life[:n] -= 1
+        np.maximum(self.size[:n] - self.decay[:n], 0, out=self.size[:n])
+
+        alive = self.life[:n] > 0
+        alive_count = int(np.count_nonzero(alive))
+        if alive_count == n:
+            return
+
+        # 交换压缩：用尾部存活粒子填补前部空洞，只移动死亡粒子数量级的数据
+        holes = np.flatnonzero(~alive[:alive_count])
+        if holes.size:
+            sources = np.flatnonzero(alive[alive_count:]) + alive_count
+            for array in (self.x, self.y, self.vx, self.vy, self.gravity, self.size,
+                          self.decay, self.life, self.max_life, self.color):
+                array[holes] = array[sources]
+        self.count = alive_count
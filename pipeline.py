@@ -0,0 +1,375 @@
+"""流水线模式：工作线程推进下一帧的模拟，主线程同时绘制上一帧的只读快照
+
+每帧主线程把本帧的模拟步数和期间排队的指令（施法、细节等级调整等）交给工作线程，
+取回上一批模拟完成后截取的 FrameState，在工作线程推进模拟的同时绘制它。
+FrameState 与模拟状态不共享可变数据：粒子数组和时间轴求值结果都是不可写的副本，
+嵌套的字典和列表逐层复制。快照有两份，主线程绘制前一份，工作线程写入后一份，取回时交换。
+
+模拟只在工作线程上修改，所有指令都在两步之间按排队顺序执行，
+因此同样的指令序列（按模拟步计）得到的状态与单线程模式逐字节一致；代价是画面比单线程模式晚一帧。
+
+两个线程之间仍有 GIL：只有 NumPy 的数组运算和 pygame 的 blit/fill/缩放等释放 GIL 的调用能真正并行，
+Python 代码部分仍是轮流执行。stats() 给出两边的实际耗时和时间区间的重叠，
+python pipeline.py 对比单线程和流水线两种模式的帧耗时并检查画面一致。
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from particles import ParticleSystem
+from tween import Timeline
+
+
+# 绘制和统计用到的粒子字段；快照中的粒子系统只有这些字段，不能再 update() 或发射
+PARTICLE_FIELDS = ('x', 'y', 'size', 'life', 'max_life', 'color')
+
+# 不可变的值（坐标、颜色等元组只含标量），快照中直接共用
+_SHARED = {int, float, str, bool, tuple, type(None)}
+
+
+class _Freezer:
+    """复制特效状态：嵌套的字典和列表逐层复制，粒子系统和时间轴换成只读副本
+
+    一局常有几十个小粒子系统（每个火球、六边形各一个），逐个复制数组的调用开销远大于数据量，
+    这里先收集全部粒子系统，每个字段拼接成一个连续数组复制一次，各副本再取其中的切片。
+    """
+
+    def __init__(self):
+        self.timelines = {}
+        self.systems = []
+
+    def value(self, value):
+        kind = type(value)
+        if kind in _SHARED:
+            return value
+        if kind is dict:
+            return {key: self.value(item) for key, item in value.items()}
+        if kind is list:
+            return [self.value(item) for item in value]
+        if kind is ParticleSystem:
+            copy = ParticleSystem.__new__(ParticleSystem)
+            copy.count = copy.capacity = value.count
+            # 随机源与原系统共用，绘制时不读取
+            copy.rng = value.rng
+            self.systems.append((value, copy))
+            return copy
+        if kind is Timeline:
+            # 同一局的特效共享一条时间轴，快照中也只复制一次
+            copy = self.timelines.get(id(value))
+            if copy is None:
+                copy = self.timelines[id(value)] = value.frozen()
+            return copy
+        # 细节等级不会被原地修改
+        return value
+
+    def finish(self):
+        systems = self.systems
+        if not systems:
+            return
+        ends = np.cumsum([system.count for system, _ in systems]).tolist()
+        for field in PARTICLE_FIELDS:
+            data = np.concatenate([getattr(system, field)[:system.count] for system, _ in systems])
+            data.flags.writeable = False
+            start = 0
+            for (_, copy), end in zip(systems, ends):
+                setattr(copy, field, data[start:end])
+                start = end
+
+    def effects(self, effects):
+        frozen = []
+        for effect in effects:
+            cls = type(effect)
+            copy = cls.__new__(cls)
+            copy.__dict__ = self.value(effect.__dict__)
+            frozen.append(copy)
+        self.finish()
+        return frozen
+
+
+def freeze_effects(effects):
+    """特效列表的只读副本：类型不变，可以直接交给绘制代码"""
+    return _Freezer().effects(effects)
+
+
+class FrameState:
+    """某一模拟步结束时的特效快照，接口与 EffectManager 的 bounds()/draw() 一致
+
+    manager 为 EffectManager 时借用它的粒子批量绘制和性能计时，为 None 时逐个调用特效的 draw()；
+    spawned 为截取时本局已创建的特效数，用于判断某次施法是否已经上屏。
+    """
+
+    def __init__(self, effects, frame, manager=None, spawned=0):
+        freezer = _Freezer()
+        self.effects = freezer.effects(effects)
+        # 快照中的时间轴副本，绘制前由 interpolate() 设置插值系数
+        self.timelines = list(freezer.timelines.values())
+        self.frame = frame
+        self.spawned = spawned
+        self.manager = manager
+        self.particles = sum(effect.particle_count() for effect in self.effects)
+
+    def __len__(self):
+        return len(self.effects)
+
+    def __iter__(self):
+        return iter(self.effects)
+
+    def particle_count(self):
+        return self.particles
+
+    def bounds(self):
+        return [effect.bounds() for effect in self.effects]
+
+    def interpolate(self, alpha):
+        for timeline in self.timelines:
+            timeline.alpha = alpha
+
+    def draw(self, surface):
+        if self.manager is not None:
+            self.manager.draw(surface, self.effects)
+        else:
+            for effect in self.effects:
+                effect.draw(surface)
+
+
+class Pipeline:
+    """在工作线程上推进模拟并截取快照
+
+    advance(steps) 在工作线程上推进 steps 个模拟步，capture() 在工作线程上返回当前状态的快照；
+    两者之外不要在其他线程读写模拟状态，需要修改时用 queue() 排队，由工作线程在下一批模拟步之前执行。
+    """
+
+    def __init__(self, advance, capture):
+        self.advance = advance
+        self.capture = capture
+        self.commands = []
+        # 双缓冲：front 为主线程正在绘制的快照，back 由工作线程写入
+        self.front = capture()
+        self.back = None
+        self._job = None
+        self._error = None
+        self._busy = False
+        self._job_ready = threading.Condition()
+        self._done = threading.Event()
+        self.frames = 0
+        # 最近一批模拟和最近一次绘制的时间区间与各自线程的 CPU 时间（秒）
+        self._work = None
+        self._render = None
+        self.last_update_ms = 0.0
+        self.last_overlap_ms = 0.0
+        self.last_parallel_ms = 0.0
+        self.update_time = 0.0
+        self.render_time = 0.0
+        self.overlap_time = 0.0
+        self.parallel_time = 0.0
+        self.wait_time = 0.0
+        self._thread = threading.Thread(target=self._run, name='simulation', daemon=True)
+        self._thread.start()
+
+    def queue(self, command, *args):
+        """排队一个指令，工作线程在下一批模拟步之前按排队顺序调用 command(*args)"""
+        self.commands.append((command, args))
+
+    def submit(self, steps):
+        """等待上一批模拟完成，交换快照，把本帧的 steps 步连同排队的指令交给工作线程；返回可以绘制的快照"""
+        self._collect()
+        commands, self.commands = self.commands, []
+        with self._job_ready:
+            self._done.clear()
+            self._busy = True
+            self._job = (steps, commands)
+            self._job_ready.notify()
+        return self.front
+
+    def _collect(self):
+        if not self._busy:
+            return
+        start = time.perf_counter()
+        self._done.wait()
+        self.wait_time += time.perf_counter() - start
+        self._busy = False
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        self.front, self.back = self.back, None
+
+        # 上一次绘制与这一批模拟同时进行：overlap 为两者时间区间的交集；
+        # 受 GIL 限制，区间重叠时两个线程未必同时在运行，两线程 CPU 时间之和超出合并区间的部分才是真正并行的时间
+        work_start, work_end, work_cpu = self._work
+        overlap = parallel = 0.0
+        if self._render is not None:
+            render_start, render_end, render_cpu = self._render
+            overlap = max(0.0, min(work_end, render_end) - max(work_start, render_start))
+            if overlap:
+                span = max(work_end, render_end) - min(work_start, render_start)
+                parallel = min(overlap, max(0.0, work_cpu + render_cpu - span))
+            self._render = None
+        self.last_update_ms = (work_end - work_start) * 1000
+        self.last_overlap_ms = overlap * 1000
+        self.last_parallel_ms = parallel * 1000
+        self.update_time += work_end - work_start
+        self.overlap_time += overlap
+        self.parallel_time += parallel
+        self.frames += 1
+
+    def rendering(self):
+        """绘制计时，用法：with pipeline.rendering(): ..."""
+        return _RenderSection(self)
+
+    def _run(self):
+        while True:
+            with self._job_ready:
+                while self._job is None:
+                    self._job_ready.wait()
+                job, self._job = self._job, None
+            if job is False:
+                return
+            steps, commands = job
+            start = time.perf_counter()
+            cpu = time.thread_time()
+            try:
+                for command, args in commands:
+                    command(*args)
+                if steps:
+                    self.advance(steps)
+                self.back = self.capture()
+            except BaseException as error:
+                self._error = error
+            self._work = (start, time.perf_counter(), time.thread_time() - cpu)
+            self._done.set()
+
+    def close(self):
+        """等待最后一批模拟完成并结束工作线程；之后模拟状态可以在主线程上直接访问"""
+        self._collect()
+        # 最后排队但还没执行的指令在主线程上补执行，保证不丢失
+        for command, args in self.commands:
+            command(*args)
+        self.commands = []
+        with self._job_ready:
+            self._job = False
+            self._job_ready.notify()
+        self._thread.join()
+
+    def stats(self):
+        frames = max(self.frames, 1)
+        return {
+            'frames': self.frames,
+            'update_ms': self.update_time * 1000 / frames,
+            'render_ms': self.render_time * 1000 / frames,
+            'overlap_ms': self.overlap_time * 1000 / frames,
+            'parallel_ms': self.parallel_time * 1000 / frames,
+            # 模拟耗时中与绘制同时进行、以及真正并行的比例
+            'overlap_ratio': self.overlap_time / self.update_time if self.update_time else 0.0,
+            'parallel_ratio': self.parallel_time / self.update_time if self.update_time else 0.0,
+            'wait_ms': self.wait_time * 1000 / frames,
+        }
+
+
+class _RenderSection:
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.cpu = time.thread_time()
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.pipeline._render = (self.start, end, time.thread_time() - self.cpu)
+        self.pipeline.render_time += end - self.start
+
+
+def _schedule(frames, seed, cast_every):
+    """每帧的模拟步数与施法：步数按 1,1,2,0,1,... 波动，模拟掉帧补步和提前出帧"""
+    import numpy as np
+    from simulation import SIM_TYPES
+    choices = np.random.default_rng(seed)
+    kinds = list(SIM_TYPES)
+    pattern = (1, 1, 2, 0, 1, 1)
+    schedule = []
+    for frame in range(frames):
+        casts = []
+        if frame % cast_every == 0:
+            casts.append((kinds[choices.integers(len(kinds))], (frame // cast_every) % 2))
+            casts.append((kinds[choices.integers(len(kinds))], 1 - (frame // cast_every) % 2))
+        schedule.append((pattern[frame % len(pattern)], casts))
+    return schedule
+
+
+def _run_sequential(seed, schedule, surface):
+    from simulation import Simulation, cast
+    from skills import EFFECT_TYPES
+    simulation = Simulation(seed, types=EFFECT_TYPES)
+    pixels = []
+    start = time.perf_counter()
+    for steps, casts in schedule:
+        for kind, caster in casts:
+            cast(simulation, kind, caster)
+        simulation.run(steps)
+        surface.fill((20, 20, 30))
+        for effect in simulation.effects:
+            effect.draw(surface)
+        pixels.append(hash(surface.get_buffer().raw))
+    return simulation, pixels, time.perf_counter() - start
+
+
+def _run_pipelined(seed, schedule, surface):
+    from simulation import Simulation, cast
+    from skills import EFFECT_TYPES
+    simulation = Simulation(seed, types=EFFECT_TYPES)
+    pipeline = Pipeline(simulation.run, lambda: FrameState(simulation.effects, simulation.frame))
+    pixels = []
+    start = time.perf_counter()
+    for steps, casts in schedule + [(0, [])]:
+        for kind, caster in casts:
+            pipeline.queue(cast, simulation, kind, caster)
+        state = pipeline.submit(steps)
+        with pipeline.rendering():
+            surface.fill((20, 20, 30))
+            state.draw(surface)
+        pixels.append(hash(surface.get_buffer().raw))
+    pipeline.close()
+    # 流水线画面晚一帧：第 k + 1 帧绘制的是第 k 帧模拟完成后的状态
+    return simulation, pixels[1:], time.perf_counter() - start, pipeline.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='对比单线程与流水线模式：帧耗时、模拟与绘制的重叠，以及状态和画面是否一致')
+    parser.add_argument('--frames', type=int, default=600, help='渲染帧数')
+    parser.add_argument('--seed', type=int, default=0, help='对局种子')
+    parser.add_argument('--cast-every', type=int, default=8, help='每隔多少帧双方各释放一个技能')
+    parser.add_argument('--rounds', type=int, default=3, help='两种模式交替运行的轮数，耗时取最好成绩')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from snapshot import snapshot_simulation
+    pygame.display.init()
+    screen = pygame.display.set_mode((800, 600))
+    surface = pygame.Surface(screen.get_size()).convert()
+    schedule = _schedule(args.frames, args.seed, args.cast_every)
+
+    sequential_best = pipelined_best = float('inf')
+    for _ in range(args.rounds):
+        simulation, pixels, elapsed = _run_sequential(args.seed, schedule, surface)
+        sequential_best = min(sequential_best, elapsed)
+        probe, probe_pixels, elapsed, stats = _run_pipelined(args.seed, schedule, surface)
+        if elapsed < pipelined_best:
+            pipelined_best, best_stats = elapsed, stats
+
+    frames = args.frames
+    print('单线程: %.3f ms/帧' % (sequential_best * 1000 / frames))
+    print('流水线: %.3f ms/帧（模拟 %.3f ms，绘制 %.3f ms，等待模拟 %.3f ms）' % (
+        pipelined_best * 1000 / frames, best_stats['update_ms'], best_stats['render_ms'], best_stats['wait_ms']))
+    print('重叠: 时间区间 %.3f ms（模拟耗时的 %.0f%%），真正并行 %.3f ms（%.0f%%），CPU 核心数 %d' % (
+        best_stats['overlap_ms'], best_stats['overlap_ratio'] * 100, best_stats['parallel_ms'],
+        best_stats['parallel_ratio'] * 100, os.cpu_count() or 1))
+    print('最终状态一致: %s' % (snapshot_simulation(probe) == snapshot_simulation(simulation)))
+    print('逐帧画面一致: %s' % (probe_pixels == pixels))
+
+
+if __name__ == '__main__':
+    main()
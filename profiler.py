@@ -0,0 +1,355 @@
+"""运行时性能分析：记录主循环各阶段和各类特效的耗时、粒子数、Surface 分配与字体渲染次数
+
+关闭时每个钩子只有一次 profiler.enabled 判断；开启后可在画面上叠加显示，
+也可导出为 JSON、CSV 或 Chrome trace（chrome://tracing、Perfetto 可直接打开）。
+"""
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+from fonts import font_manager
+
+
+class SurfaceCounter:
+    """临时替换 pygame.Surface，统计运行期间新建的 Surface 数量"""
+
+    def __init__(self):
+        self.count = 0
+        self._original = None
+
+    def __enter__(self):
+        counter = self
+        original = self._original = pygame.Surface
+
+        class CountingSurface(original):
+            def __init__(self, *args, **kwargs):
+                counter.count += 1
+                super().__init__(*args, **kwargs)
+
+        pygame.Surface = CountingSurface
+        return self
+
+    def __exit__(self, *exc):
+        pygame.Surface = self._original
+
+
+class _NullSection:
+    """关闭时使用的空计时段，不做任何事"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class _Section:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.profiler._add_section(self.name, self.start, end)
+        return False
+
+
+class Profiler:
+    """帧级性能分析器
+
+    begin_frame()/end_frame() 包住一帧，section(name) 记录主循环阶段，
+    measure(effect, phase, func) 记录单个特效的 update/draw 并按特效类型汇总。
+    """
+
+    def __init__(self, history=240, max_records=36000, max_events=200000):
+        self.enabled = False
+        # frames 供叠加层显示最近若干帧，records 保留较长的记录用于导出
+        self.frames = deque(maxlen=history)
+        self.records = deque(maxlen=max_records)
+        self.events = deque(maxlen=max_events)
+        self._surfaces = SurfaceCounter()
+        self._origin = 0.0
+        self._frame = None
+        self._frame_start = None
+        self._frame_index = 0
+
+    def enable(self):
+        if self.enabled:
+            return
+        self._surfaces.__enter__()
+        self._origin = time.perf_counter()
+        self._frame = None
+        self._frame_start = None
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._surfaces.__exit__()
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def _us(self, t):
+        return (t - self._origin) * 1e6
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._frame is not None and self._frame_start is not None:
+            # 帧时间取相邻两帧开始的间隔，包含限速等待
+            self._frame['frame_ms'] = (now - self._frame_start) * 1000
+        self._frame_start = now
+        self._frame_index += 1
+        self._frame = {
+            'frame': self._frame_index,
+            'frame_ms': 0.0,
+            'sections': {},
+            'effects': {},
+            'particles': 0,
+            'surfaces': self._surfaces.count,
+            'font_renders': font_manager.renders,
+        }
+
+    def end_frame(self, effects=()):
+        """一帧结束：统计各类特效的存活实例和粒子数"""
+        frame = self._frame
+        if not self.enabled or frame is None:
+            return
+        for effect in effects:
+            stats = self._effect_stats(type(effect).__name__)
+            stats['count'] += 1
+            particles = effect.particle_count()
+            stats['particles'] += particles
+            frame['particles'] += particles
+        frame['surfaces'] = self._surfaces.count - frame['surfaces']
+        frame['font_renders'] = font_manager.renders - frame['font_renders']
+        self.frames.append(frame)
+        self.records.append(frame)
+        self.events.append(('C', 'particles', self._us(time.perf_counter()), frame['particles']))
+
+    def counter(self, name, value):
+        """记录本帧的一个数值（如渲染比例），写入帧记录并作为 Chrome trace 计数器导出"""
+        if not self.enabled or self._frame is None:
+            return
+        self._frame.setdefault('counters', {})[name] = value
+        self.events.append(('C', name, self._us(time.perf_counter()), value))
+
+    def section(self, name):
+        """主循环阶段计时，用法：with profiler.section('update'): ..."""
+        if not self.enabled or self._frame is None:
+            return _NULL_SECTION
+        return _Section(self, name)
+
+    def _add_section(self, name, start, end):
+        sections = self._frame['sections']
+        sections[name] = sections.get(name, 0.0) + (end - start) * 1000
+        self.events.append(('X', name, self._us(start), (end - start) * 1e6))
+
+    def _effect_stats(self, name):
+        stats = self._frame['effects'].get(name)
+        if stats is None:
+            stats = self._frame['effects'][name] = {
+                'count': 0, 'update_ms': 0.0, 'draw_ms': 0.0, 'particles': 0,
+                'surfaces': 0, 'font_renders': 0,
+            }
+        return stats
+
+    def measure(self, effect, phase, func, *args):
+        """调用 func(*args) 并记到该特效类型的 phase（'update' 或 'draw'）下"""
+        if self._frame is None:
+            return func(*args)
+        name = type(effect).__name__
+        surfaces = self._surfaces.count
+        renders = font_manager.renders
+        start = time.perf_counter()
+        result = func(*args)
+        end = time.perf_counter()
+        stats = self._effect_stats(name)
+        stats[phase + '_ms'] += (end - start) * 1000
+        stats['surfaces'] += self._surfaces.count - surfaces
+        stats['font_renders'] += font_manager.renders - renders
+        self.events.append(('X', '%s.%s' % (name, phase), self._us(start), (end - start) * 1e6))
+        return result
+
+    def frame_times(self):
+        return [frame['frame_ms'] for frame in self.frames if frame['frame_ms']]
+
+    def summary(self):
+        """最近若干帧的平均值，供叠加层显示"""
+        frames = [frame for frame in self.frames if frame['frame_ms']]
+        if not frames:
+            return None
+        n = len(frames)
+        sections = {}
+        effects = {}
+        for frame in frames:
+            for name, ms in frame['sections'].items():
+                sections[name] = sections.get(name, 0.0) + ms / n
+            for name, stats in frame['effects'].items():
+                total = effects.setdefault(name, dict.fromkeys(stats, 0.0))
+                for key, value in stats.items():
+                    total[key] += value / n
+        return {
+            'frame_ms': sum(frame['frame_ms'] for frame in frames) / n,
+            'frame_ms_max': max(frame['frame_ms'] for frame in frames),
+            'particles': frames[-1]['particles'],
+            'surfaces': sum(frame['surfaces'] for frame in frames) / n,
+            'font_renders': sum(frame['font_renders'] for frame in frames) / n,
+            'sections': sections,
+            'effects': effects,
+        }
+
+    def export(self, path):
+        """按扩展名导出：.csv 为逐帧表格，.trace.json 为 Chrome trace，其他为 JSON"""
+        if path.endswith('.csv'):
+            self.export_csv(path)
+        elif path.endswith('.trace.json'):
+            self.export_chrome_trace(path)
+        else:
+            self.export_json(path)
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'frames': list(self.records)}, f, ensure_ascii=False, indent=1)
+
+    def export_csv(self, path):
+        """每帧一行汇总（effect 列为 *），加上每类特效一行"""
+        sections = sorted({name for frame in self.records for name in frame['sections']})
+        fields = ['frame', 'effect', 'frame_ms'] + ['loop_%s_ms' % name for name in sections] + [
+            'count', 'update_ms', 'draw_ms', 'particles', 'surfaces', 'font_renders']
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fields, restval='')
+            writer.writeheader()
+            for frame in self.records:
+                row = {'frame': frame['frame'], 'effect': '*', 'frame_ms': round(frame['frame_ms'], 3),
+                       'count': sum(stats['count'] for stats in frame['effects'].values()),
+                       'particles': frame['particles'], 'surfaces': frame['surfaces'],
+                       'font_renders': frame['font_renders']}
+                for name, ms in frame['sections'].items():
+                    row['loop_%s_ms' % name] = round(ms, 3)
+                writer.writerow(row)
+                for name, stats in sorted(frame['effects'].items()):
+                    row = {'frame': frame['frame'], 'effect': name}
+                    row.update((key, round(value, 3)) for key, value in stats.items())
+                    writer.writerow(row)
+
+    def export_chrome_trace(self, path):
+        events = []
+        for kind, name, ts, value in self.events:
+            if kind == 'X':
+                events.append({'name': name, 'cat': 'effect' if '.' in name else 'frame',
+                               'ph': 'X', 'ts': ts, 'dur': value, 'pid': 0, 'tid': 0})
+            else:
+                events.append({'name': name, 'ph': 'C', 'ts': ts, 'pid': 0,
+                               'args': {name: value}})
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+class ProfilerOverlay:
+    """屏幕左上角的性能面板：帧时间曲线、各阶段耗时和各类特效统计
+
+    曲线每帧更新；文字每 text_every 帧刷新一次，且只重新渲染内容变化的行。
+    渲染经由 font_manager，面板自身的字体渲染也计入 font renders/frame。
+    """
+
+    def __init__(self, profiler, rect=None, budget_ms=1000 / 60, text_every=15):
+        self.profiler = profiler
+        self.rect = rect or pygame.Rect(8, 8, 330, 200)
+        self.budget_ms = budget_ms
+        self.text_every = text_every
+        self.visible = False
+        # 面板只分配一次，且在开始计数之前，避免算进特效的 Surface 分配
+        self.panel = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        # 已渲染的文字行 [(文字, Surface)]，以及距下次刷新文字的帧数
+        self._lines = []
+        self._countdown = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        if self.visible:
+            self.profiler.enable()
+            self._countdown = 0
+        return self.visible
+
+    def bounds(self):
+        return self.rect if self.visible else None
+
+    def draw(self, surface):
+        if not self.visible:
+            return
+        panel = self.panel
+        panel.fill((0, 0, 0, 170))
+
+        # 帧时间曲线：横线为帧预算，纵轴上限为两倍预算
+        graph = pygame.Rect(6, 6, self.rect.width - 12, 50)
+        pygame.draw.rect(panel, (60, 60, 60), graph, 1)
+        scale = graph.height / (self.budget_ms * 2)
+        budget_y = graph.bottom - int(self.budget_ms * scale)
+        pygame.draw.line(panel, (80, 160, 80), (graph.left, budget_y), (graph.right - 1, budget_y))
+        times = self.profiler.frame_times()[-graph.width:]
+        if len(times) > 1:
+            points = [(graph.right - len(times) + i,
+                       max(graph.top, graph.bottom - 1 - int(ms * scale)))
+                      for i, ms in enumerate(times)]
+            pygame.draw.lines(panel, (255, 220, 80), False, points)
+
+        self._countdown -= 1
+        if self._countdown <= 0:
+            self._countdown = self.text_every
+            self._refresh_text(graph.bottom + 4)
+        y = graph.bottom + 4
+        line_height = font_manager.get(14).get_linesize()
+        for _, rendered in self._lines:
+            panel.blit(rendered, (6, y))
+            y += line_height
+        surface.blit(panel, self.rect)
+
+    def _lines_text(self):
+        summary = self.profiler.summary()
+        lines = []
+        if summary is not None:
+            lines.append('frame %.1f ms (max %.1f)  particles %d' % (
+                summary['frame_ms'], summary['frame_ms_max'], summary['particles']))
+            lines.append('  '.join('%s %.2f' % item for item in sorted(summary['sections'].items())))
+            lines.append('surfaces/frame %.1f  font renders/frame %.1f' % (
+                summary['surfaces'], summary['font_renders']))
+            for name, stats in sorted(summary['effects'].items()):
+                lines.append('%-18s x%-3.0f p%-5.0f u%.2f d%.2f s%.1f' % (
+                    name[:18], stats['count'], stats['particles'], stats['update_ms'],
+                    stats['draw_ms'], stats['surfaces']))
+        return lines
+
+    def _refresh_text(self, top):
+        """重新生成文字行，内容没变的行沿用上次渲染的 Surface"""
+        line_height = font_manager.get(14).get_linesize()
+        rows = max(0, (self.rect.height - top) // line_height)
+        old = self._lines
+        lines = []
+        for index, text in enumerate(self._lines_text()[:rows]):
+            if index < len(old) and old[index][0] == text:
+                lines.append(old[index])
+            else:
+                lines.append((text, font_manager.render(text, 14, (230, 230, 230))))
+        self._lines = lines
+
+
+# 全局共享的分析器
+profiler = Profiler()
@@ -0,0 +1,195 @@
+import pygame
+
+from resolution import RenderTarget, scaled_size
+
+
+def merge_rects(rects):
+    """合并相互重叠的矩形，减少重复恢复和提交的区域"""
+    merged = []
+    for rect in rects:
+        rect = rect.copy()
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class DirtyRectRenderer:
+    """脏矩形渲染：只恢复并重绘特效本帧和上一帧触及的区域，再用 display.update(rects) 提交
+
+    脏区域面积超过 full_threshold（占屏幕比例）时自动退回整屏 flip。
+    """
+
+    def __init__(self, screen, background, full_threshold=0.5):
+        self.screen = screen
+        self.background = background
+        self.full_threshold = full_threshold
+        self.screen_rect = screen.get_rect()
+        self.prev_rects = []
+        self.prev_sprites = []
+        self.needs_full = True
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.idle_frames = 0
+
+    def invalidate(self):
+        """下一帧强制整屏重绘（如窗口被遮挡后恢复）"""
+        self.needs_full = True
+
+    def render(self, sprites, effects, overlays=()):
+        """sprites 为人物层 [(surface, rect)]，贴图或位置变化时才重绘；effects 为特效集合，需实现 bounds()（返回矩形列表）
+        与 draw(surface)；overlays 为画在最上层的面板，各自实现 bounds() 与 draw(surface)"""
+        current = []
+        for rect in effects.bounds() + [overlay.bounds() for overlay in overlays]:
+            if rect is not None:
+                rect = rect.clip(self.screen_rect)
+                if rect.width and rect.height:
+                    current.append(rect)
+
+        # 人物换了动画帧或位置时，新旧位置都要重绘
+        changed = []
+        for index, (surface, rect) in enumerate(sprites):
+            previous = self.prev_sprites[index] if index < len(self.prev_sprites) else None
+            if previous is None or previous[0] is not surface or previous[1] != rect:
+                changed.append(rect.clip(self.screen_rect))
+                if previous is not None:
+                    changed.append(previous[1].clip(self.screen_rect))
+        self.prev_sprites = [(surface, rect.copy()) for surface, rect in sprites]
+
+        dirty = merge_rects(current + self.prev_rects + changed)
+        self.prev_rects = current
+
+        area = sum(rect.width * rect.height for rect in dirty)
+        if self.needs_full or area > self.full_threshold * self.screen_rect.width * self.screen_rect.height:
+            self._render_full(sprites, effects, overlays)
+            return
+
+        if not dirty:
+            # 画面没有任何变化，不提交
+            self.idle_frames += 1
+            return
+
+        # 只恢复脏区域内的背景和人物
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            self.screen.blit(self.background, rect, rect)
+            for surface, sprite_rect in sprites:
+                if sprite_rect.colliderect(rect):
+                    self.screen.blit(surface, sprite_rect)
+        self.screen.set_clip(None)
+
+        effects.draw(self.screen)
+        for overlay in overlays:
+            overlay.draw(self.screen)
+
+        pygame.display.update(dirty)
+        self.partial_frames += 1
+
+    def _render_full(self, sprites, effects, overlays):
+        self.screen.blit(self.background, (0, 0))
+        for surface, rect in sprites:
+            self.screen.blit(surface, rect)
+        effects.draw(self.screen)
+        for overlay in overlays:
+            overlay.draw(self.screen)
+        pygame.display.flip()
+        self.needs_full = False
+        self.full_frames += 1
+
+    def stats(self):
+        return {
+            'full_frames': self.full_frames,
+            'partial_frames': self.partial_frames,
+            'idle_frames': self.idle_frames,
+        }
+
+
+class ScaledRenderer:
+    """动态分辨率渲染：背景、人物和特效画到按 controller.scale 缩小的离屏画布，再放大到窗口
+
+    比例为 1 时直接画到窗口（传入 direct 时交给它，如 DirtyRectRenderer）；缩小时每帧整屏重绘。
+    叠加层（性能面板等）总是在放大之后按窗口分辨率绘制。smooth 为 True 时用双线性插值放大，
+    画面更柔和但比最近邻慢得多。
+    """
+
+    def __init__(self, screen, background, controller, smooth=False, direct=None):
+        self.screen = screen
+        self.background = background
+        self.controller = controller
+        self.smooth = smooth
+        self.direct = direct
+        # 比例 -> (离屏画布, 缩放后的背景)；缩放后的人物贴图按 (比例, 贴图) 缓存
+        self._targets = {}
+        self._sprites = {}
+        self._scale = 1.0
+        self.scaled_frames = 0
+        self.native_frames = 0
+
+    def invalidate(self):
+        if self.direct is not None:
+            self.direct.invalidate()
+
+    def _target(self, scale):
+        target = self._targets.get(scale)
+        if target is None:
+            size = scaled_size(self.screen.get_size(), scale)
+            canvas = RenderTarget(size, scale, like=self.screen)
+            target = self._targets[scale] = canvas, pygame.transform.smoothscale(self.background, size)
+        return target
+
+    def prepare(self, surfaces):
+        """预先为各档比例生成 surfaces 的缩放版本，避免切换比例或人物换帧时在帧循环中缩放"""
+        for scale in self.controller.scales:
+            if scale != 1:
+                for surface in surfaces:
+                    self._sprite(surface, scale)
+
+    def _sprite(self, surface, scale):
+        key = (scale, surface)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = self._sprites[key] = pygame.transform.smoothscale(
+                surface, scaled_size(surface.get_size(), scale))
+        return sprite
+
+    def render(self, sprites, effects, overlays=()):
+        """参数与 DirtyRectRenderer.render 相同"""
+        scale = self.controller.scale
+        if scale != self._scale:
+            # 回到原分辨率时窗口上还是放大的画面，需要整屏重绘一次
+            self._scale = scale
+            self.invalidate()
+        if scale == 1:
+            self.native_frames += 1
+            if self.direct is not None:
+                self.direct.render(sprites, effects, overlays)
+                return
+            self._draw_scene(self.screen, self.background, sprites, effects, 1)
+        else:
+            self.scaled_frames += 1
+            canvas, background = self._target(scale)
+            self._draw_scene(canvas, background, sprites, effects, scale)
+            if self.smooth:
+                pygame.transform.smoothscale(canvas, self.screen.get_size(), self.screen)
+            else:
+                pygame.transform.scale(canvas, self.screen.get_size(), self.screen)
+        for overlay in overlays:
+            overlay.draw(self.screen)
+        pygame.display.flip()
+
+    def _draw_scene(self, surface, background, sprites, effects, scale):
+        surface.blit(background, (0, 0))
+        for image, rect in sprites:
+            if scale == 1:
+                surface.blit(image, rect)
+            else:
+                surface.blit(self._sprite(image, scale), (int(rect.x * scale), int(rect.y * scale)))
+        effects.draw(surface)
+
+    def stats(self):
+        stats = self.direct.stats() if self.direct is not None else {}
+        stats.update(scaled_frames=self.scaled_frames, native_frames=self.native_frames)
+        stats.update(self.controller.stats())
+        return stats
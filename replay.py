@@ -0,0 +1,261 @@
+"""对局回放：记录技能释放和细节等级切换、对局种子以及定期的整局关键帧
+
+文件格式（小端）：
+- 文件头：魔数 b'PKRP'、版本、对局种子、总步数、关键帧间隔、事件数、关键帧数
+- 事件表：每条 (步号 u4, 类型 u1, 参数 a u1, 参数 b u1)，按步号升序；
+  释放技能时 a 为技能序号、b 为施法方，切换细节时 a 为细节等级序号
+- 关键帧索引：每个关键帧 (步号 u4, 压缩后长度 u4)
+- 关键帧数据：snapshot_simulation() 的结果经 zlib 压缩后依次拼接
+
+步号为 s 的事件在第 s 步模拟之前生效；步号为 k 的关键帧是模拟了 k 步、
+尚未应用步号 k 的事件时的状态。跳转到任意帧时先恢复不晚于目标的最近关键帧，
+再无头快进剩余的步数，不需要从第 0 帧重新模拟。
+"""
+import argparse
+import bisect
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from simulation import DETAIL_LEVELS, SIM_TYPES, Simulation, cast
+from snapshot import restore_simulation, snapshot_simulation
+
+REPLAY_MAGIC = b'PKRP'
+REPLAY_VERSION = 1
+
+# 默认每 5 秒（300 个模拟步）保存一个关键帧
+KEYFRAME_INTERVAL = 300
+
+# 事件类型
+CAST = 0
+DETAIL = 1
+
+SKILL_NAMES = list(SIM_TYPES)
+
+_HEADER = struct.Struct('<4sHQIIII')
+EVENT_DTYPE = np.dtype([('step', '<u4'), ('type', 'u1'), ('a', 'u1'), ('b', 'u1')])
+KEYFRAME_DTYPE = np.dtype([('step', '<u4'), ('size', '<u4')])
+
+
+class Replay:
+    """一局回放的全部数据：种子、事件表和压缩后的关键帧"""
+
+    def __init__(self, seed, length, keyframe_interval, events, keyframes):
+        self.seed = seed
+        self.length = length
+        self.keyframe_interval = keyframe_interval
+        self.events = events
+        # [(步号, zlib 压缩的快照)]，按步号升序
+        self.keyframes = keyframes
+        self.keyframe_steps = [step for step, _ in keyframes]
+
+    def save(self, path):
+        index = np.array([(step, len(data)) for step, data in self.keyframes], dtype=KEYFRAME_DTYPE)
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.length,
+                                 self.keyframe_interval, len(self.events), len(self.keyframes)))
+            f.write(self.events.tobytes())
+            f.write(index.tobytes())
+            for _, data in self.keyframes:
+                f.write(data)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, seed, length, interval, n_events, n_keyframes = _HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC:
+            raise ValueError('不是回放文件: %s' % path)
+        if version != REPLAY_VERSION:
+            raise ValueError('回放版本不匹配: %d' % version)
+        offset = _HEADER.size
+        events = np.frombuffer(data, dtype=EVENT_DTYPE, count=n_events, offset=offset).copy()
+        offset += events.nbytes
+        index = np.frombuffer(data, dtype=KEYFRAME_DTYPE, count=n_keyframes, offset=offset)
+        offset += index.nbytes
+        keyframes = []
+        for step, size in index.tolist():
+            keyframes.append((step, data[offset:offset + size]))
+            offset += size
+        return cls(seed, length, interval, events, keyframes)
+
+    def size(self):
+        return _HEADER.size + self.events.nbytes + KEYFRAME_DTYPE.itemsize * len(self.keyframes) + sum(
+            len(data) for _, data in self.keyframes)
+
+
+def _detail_index(detail):
+    for index, level in enumerate(DETAIL_LEVELS):
+        if level == detail:
+            return index
+    raise ValueError('回放只支持 DETAIL_LEVELS 中的细节等级')
+
+
+class ReplayRecorder:
+    """边玩边记录：技能释放经 cast() 进入对局并写入事件表，每步结束后调用 after_step()"""
+
+    def __init__(self, simulation, keyframe_interval=KEYFRAME_INTERVAL):
+        self.simulation = simulation
+        self.keyframe_interval = keyframe_interval
+        self.events = []
+        self.keyframes = []
+        # 开局状态作为第一个关键帧，当前细节等级作为第一条事件
+        self._keyframe()
+        self.detail_changed(_detail_index(simulation.detail))
+
+    def _keyframe(self):
+        self.keyframes.append((self.simulation.frame, zlib.compress(snapshot_simulation(self.simulation))))
+
+    def cast(self, kind, caster):
+        """以 caster（0 或 1）释放技能并记录"""
+        self.events.append((self.simulation.frame, CAST, SKILL_NAMES.index(kind), caster))
+        return cast(self.simulation, kind, caster)
+
+    def detail_changed(self, level):
+        """记录细节等级切换（切换本身由 EffectManager 完成）"""
+        self.events.append((self.simulation.frame, DETAIL, level, 0))
+
+    def after_step(self):
+        if self.simulation.frame % self.keyframe_interval == 0:
+            self._keyframe()
+
+    def replay(self):
+        return Replay(self.simulation.seed, self.simulation.frame, self.keyframe_interval,
+                      np.array(self.events, dtype=EVENT_DTYPE), list(self.keyframes))
+
+    def save(self, path):
+        replay = self.replay()
+        replay.save(path)
+        return replay
+
+
+def _retype(effects, types):
+    """把快照中的特效换成 types 中对应的类（可绘制类与纯模拟类状态相同，只差绘制方法）
+
+    types 中的条目可以是创建特效的工厂（如 baking.BakedType），这时换成它的 live 类；
+    不属于任何模拟类的特效（如烘焙特效）保持不变。
+    """
+    for effect in effects:
+        for name, base in SIM_TYPES.items():
+            if isinstance(effect, base):
+                effect.__class__ = getattr(types[name], 'live', types[name])
+                break
+
+
+class ReplayPlayer:
+    """回放播放器：seek() 跳到任意帧，advance() 按任意倍速推进
+
+    types 默认为纯模拟类（无头播放）；在场景中播放时传入 skills.EFFECT_TYPES。
+    """
+
+    def __init__(self, replay, types=None):
+        self.replay = replay
+        self.types = types or SIM_TYPES
+        self.simulation = Simulation(replay.seed, types=self.types)
+        self._steps = replay.events['step']
+        self._next = 0
+        self._restore(0)
+
+    @property
+    def frame(self):
+        return self.simulation.frame
+
+    @property
+    def done(self):
+        return self.simulation.frame >= self.replay.length
+
+    def _apply_events(self):
+        frame = self.simulation.frame
+        events = self.replay.events
+        while self._next < len(events) and self._steps[self._next] == frame:
+            _, kind, a, b = events[self._next].tolist()
+            if kind == CAST:
+                cast(self.simulation, SKILL_NAMES[a], b)
+            elif kind == DETAIL:
+                self.simulation.set_detail(DETAIL_LEVELS[a])
+            self._next += 1
+
+    def step(self):
+        self._apply_events()
+        self.simulation.step()
+
+    def advance(self, steps=1):
+        """推进最多 steps 步，不超过回放结尾；返回实际推进的步数"""
+        steps = max(0, min(steps, self.replay.length - self.simulation.frame))
+        for _ in range(steps):
+            self.step()
+        return steps
+
+    def _restore(self, index):
+        step, data = self.replay.keyframes[index]
+        restore_simulation(self.simulation, zlib.decompress(data))
+        _retype(self.simulation.effects, self.types)
+        self._next = int(np.searchsorted(self._steps, step, 'left'))
+
+    def seek(self, frame):
+        """跳到第 frame 步：恢复最近的关键帧后无头快进；当前帧已在两者之间时直接快进"""
+        frame = max(0, min(frame, self.replay.length))
+        index = bisect.bisect_right(self.replay.keyframe_steps, frame) - 1
+        if not self.replay.keyframe_steps[index] <= self.simulation.frame <= frame:
+            self._restore(index)
+        self.advance(frame - self.simulation.frame)
+        return self.simulation.frame
+
+
+def record_random(seed, steps, cast_every=20, keyframe_interval=KEYFRAME_INTERVAL):
+    """录制一局双方随机释放技能的无头对局，用于测试回放"""
+    simulation = Simulation(seed)
+    recorder = ReplayRecorder(simulation, keyframe_interval)
+    choices = np.random.default_rng(seed)
+    for step in range(steps):
+        if step % cast_every == 0:
+            recorder.cast(SKILL_NAMES[choices.integers(len(SKILL_NAMES))], (step // cast_every) % 2)
+        simulation.step()
+        recorder.after_step()
+    return recorder.replay()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='检查回放文件：跳转耗时、倍速播放耗时与确定性')
+    parser.add_argument('path', help='回放文件')
+    parser.add_argument('--record', type=int, metavar='STEPS',
+                        help='先录制一局指定步数的随机对局写入 path')
+    parser.add_argument('--seed', type=int, default=0, help='--record 使用的对局种子')
+    parser.add_argument('--seek', type=int, action='append', default=[], help='测量跳转到该帧的耗时')
+    parser.add_argument('--verify', action='store_true',
+                        help='从第 0 帧线性重放，检查每个关键帧是否与录制时一致')
+    args = parser.parse_args(argv)
+
+    if args.record:
+        Replay.save(record_random(args.seed, args.record), args.path)
+    replay = Replay.load(args.path)
+    print('回放 %d 步（%.1f 秒），事件 %d 条，关键帧 %d 个，文件 %d 字节' % (
+        replay.length, replay.length / 60, len(replay.events), len(replay.keyframes), replay.size()))
+
+    player = ReplayPlayer(replay)
+    start = time.perf_counter()
+    player.advance(replay.length)
+    linear_ms = (time.perf_counter() - start) * 1000
+    print('线性重放到结尾 %.1f ms（%.0f 倍实时）' % (linear_ms, replay.length / 60 * 1000 / max(linear_ms, 1e-6)))
+
+    for frame in args.seek or [replay.length // 2, replay.length - 1]:
+        player.seek(0)
+        start = time.perf_counter()
+        player.seek(frame)
+        print('从开头跳转到第 %d 帧 %.2f ms' % (player.frame, (time.perf_counter() - start) * 1000))
+
+    if args.verify:
+        player = ReplayPlayer(replay)
+        mismatches = 0
+        for step, data in replay.keyframes[1:]:
+            player.advance(step - player.frame)
+            if snapshot_simulation(player.simulation) != zlib.decompress(data):
+                mismatches += 1
+                print('第 %d 帧关键帧不一致' % step)
+        print('关键帧校验: %d/%d 一致' % (len(replay.keyframes) - 1 - mismatches, len(replay.keyframes) - 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""动态分辨率：场景画到按比例缩小的离屏画布上再放大到窗口，帧时间超预算时降低比例，负载回落后恢复
+
+特效、形状、粒子和数字都按世界坐标（窗口像素）调用绘制函数，由目标画布的 scale 换算成画布像素，
+特效代码不需要知道当前比例；画到普通 Surface（scale 视为 1）时与原先的绘制完全相同。
+"""
+import pygame
+
+
+class RenderTarget(pygame.Surface):
+    """带缩放比例的画布：世界坐标乘以 scale 即画布上的像素坐标
+
+    like 为另一个 Surface 时使用与它相同的像素格式（如窗口的显示格式）。
+    """
+
+    def __init__(self, size, scale=1.0, flags=0, like=None):
+        if like is None:
+            super().__init__(size, flags)
+        else:
+            super().__init__(size, flags, like)
+        self.scale = scale
+
+
+def scale_of(surface):
+    return getattr(surface, 'scale', 1.0)
+
+
+def scaled_size(size, scale):
+    return max(1, int(round(size[0] * scale))), max(1, int(round(size[1] * scale)))
+
+
+def scaled_rect(surface, rect):
+    """世界坐标的矩形换算到画布上（向外取整，保证覆盖）"""
+    scale = scale_of(surface)
+    if scale == 1:
+        return rect
+    left, top = int(rect.left * scale), int(rect.top * scale)
+    return pygame.Rect(left, top, int(rect.right * scale + 0.999) - left, int(rect.bottom * scale + 0.999) - top)
+
+
+def _width(width, scale):
+    return max(1, int(round(width * scale))) if width else 0
+
+
+def circle(surface, color, center, radius, width=0):
+    """pygame.draw.circle 的世界坐标版本"""
+    scale = scale_of(surface)
+    if scale != 1:
+        center = (int(center[0] * scale), int(center[1] * scale))
+        radius = max(1, int(radius * scale))
+        width = _width(width, scale)
+    pygame.draw.circle(surface, color, center, radius, width)
+
+
+def line(surface, color, start, end, width=1):
+    """pygame.draw.line 的世界坐标版本"""
+    scale = scale_of(surface)
+    if scale != 1:
+        start = (start[0] * scale, start[1] * scale)
+        end = (end[0] * scale, end[1] * scale)
+        width = _width(width, scale)
+    pygame.draw.line(surface, color, start, end, width)
+
+
+def lines(surface, color, closed, points, width=1):
+    """pygame.draw.lines 的世界坐标版本"""
+    scale = scale_of(surface)
+    if scale != 1:
+        points = [(x * scale, y * scale) for x, y in points]
+        width = _width(width, scale)
+    pygame.draw.lines(surface, color, closed, points, width)
+
+
+class ResolutionController:
+    """在几档渲染比例之间切换
+
+    连续 lower_after 帧超出帧预算时降一档；帧时间低于预算的 raise_below 倍并保持 raise_after 帧后升一档，
+    升档比降档慢，避免在两档之间来回抖动。每次切换记入 changes，附带当时的帧时间、特效数和粒子数，
+    便于和特效负载对照。只给一档比例时即为固定比例。
+    """
+
+    def __init__(self, scales=(1.0, 0.7, 0.5), target_frame_ms=1000 / 60, lower_after=3,
+                 raise_after=120, raise_below=0.7):
+        self.scales = sorted(scales, reverse=True)
+        self.target_frame_ms = target_frame_ms
+        self.lower_after = lower_after
+        self.raise_after = raise_after
+        self.raise_below = raise_below
+        self.level = 0
+        self.slow_frames = 0
+        self.calm_frames = 0
+        self.changes = []
+
+    @property
+    def scale(self):
+        return self.scales[self.level]
+
+    def adjust(self, frame_ms, frame=0, effects=0, particles=0):
+        """每个渲染帧结束时调用一次；切换比例时返回本次的记录，否则返回 None"""
+        if frame_ms > self.target_frame_ms * 1.1:
+            self.calm_frames = 0
+            self.slow_frames += 1
+            if self.slow_frames >= self.lower_after:
+                self.slow_frames = 0
+                return self._set_level(self.level + 1, frame_ms, frame, effects, particles)
+            return None
+
+        self.slow_frames = 0
+        if frame_ms < self.target_frame_ms * self.raise_below:
+            self.calm_frames += 1
+            if self.calm_frames >= self.raise_after:
+                self.calm_frames = 0
+                return self._set_level(self.level - 1, frame_ms, frame, effects, particles)
+        else:
+            self.calm_frames = 0
+        return None
+
+    def _set_level(self, level, frame_ms, frame, effects, particles):
+        level = max(0, min(level, len(self.scales) - 1))
+        if level == self.level:
+            return None
+        change = {
+            'frame': frame,
+            'from': self.scale,
+            'to': self.scales[level],
+            'frame_ms': frame_ms,
+            'effects': effects,
+            'particles': particles,
+        }
+        self.level = level
+        self.changes.append(change)
+        return change
+
+    @staticmethod
+    def describe(change):
+        return '渲染比例 %.2f -> %.2f（第 %d 帧，帧时间 %.1f ms，特效 %d 个，粒子 %d 个）' % (
+            change['from'], change['to'], change['frame'], change['frame_ms'], change['effects'],
+            change['particles'])
+
+    def stats(self):
+        return {
+            'scale': self.scale,
+            'scale_changes': len(self.changes),
+            'min_scale': min([self.scale] + [change['to'] for change in self.changes]),
+        }
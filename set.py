@@ -1,60 +1,478 @@
+# 最先导入 startup，以便启动分析统计 pygame 等模块的导入耗时
+from startup import BackgroundLoader, StartupProfiler, profiling_requested
+
 import pygame
 import sys
+import time
 
-# 初始化 pygame
-pygame.init()
+from assets import AssetManager
+from characters import CharacterSprite, Characters
+from controls import Controls
+from game_loop import GameLoop
+from profiler import ProfilerOverlay, profiler
+from renderer import DirtyRectRenderer, ScaledRenderer
+from resolution import ResolutionController
 
 # 设置窗口大小
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption('双人PK游戏')
-
-# 加载背景图片并调整大小
-bg = pygame.image.load('bg.png')  # 加载背景图片
-bg = pygame.transform.scale(bg, (WIDTH, HEIGHT))  # 将背景图调整为适应窗口大小
-
-# 加载人物贴图
-left_player = pygame.image.load('left.png')  # 左侧人物
-right_player = pygame.image.load('right.png')  # 右侧人物
 
 # 设置人物贴图大小
 PLAYER_WIDTH = 160  # 可以根据实际需要调整宽度
 PLAYER_HEIGHT = 240  # 可以根据实际需要调整高度
 
-# 调整人物图片大小
-left_player = pygame.transform.scale(left_player, (PLAYER_WIDTH, PLAYER_HEIGHT))
-right_player = pygame.transform.scale(right_player, (PLAYER_WIDTH, PLAYER_HEIGHT))
+# 目标帧率（渲染）；模拟固定按 TICK_RATE 推进
+TARGET_FPS = 60
+
+# 脏矩形渲染：只重绘特效触及的区域，适合填充率受限的低功耗显示设备
+DIRTY_RECTS = True
+
+# 动态分辨率：背景、人物和特效先画到缩小的离屏画布再放大到窗口，帧时间超预算时逐档降低比例，
+# 负载回落后恢复；每次切换打印当时的帧时间、特效数和粒子数。RENDER_SCALES 为可用的比例（从高到低），
+# 只给一个值即为固定比例，如 (0.75,)
+DYNAMIC_RESOLUTION = False
+RENDER_SCALES = (1.0, 0.7, 0.5)
+# 放大方式：True 为双线性插值（smoothscale，800x600 约 2~3 ms），False 为最近邻（scale，约 0.5 ms）
+SMOOTH_UPSCALE = False
+
+# 流水线模式：模拟在工作线程上推进下一帧，主线程同时绘制上一帧模拟结果的只读快照，画面比单线程晚一帧；
+# 施法和细节等级调整排队到两步之间执行，结果与单线程模式一致。两个线程共用 GIL，只有 NumPy 和 pygame
+# 释放 GIL 的部分能真正并行，退出时打印实测的模拟/绘制耗时与重叠。回放时不使用
+PIPELINED = False
+
+# 人物动画：施法、受击、治疗时播放对应动作，有护盾时着色；所有帧在启动时生成，每帧每人一次 blit
+ANIMATED_PLAYERS = True
+
+# 玩家输入：左侧 A S D F G、右侧 J K L ; ' 释放普攻/治疗/火焰/护盾/大招，手柄按钮 0~4 同理。
+# 冷却中按下的技能保留 INPUT_QUEUE_MS 毫秒，冷却结束即补发；INPUT_GAMEPADS 为 False 时不初始化手柄
+INPUT_QUEUE_MS = 150
+INPUT_GAMEPADS = True
+# 退出时导出输入到上屏的延迟直方图（.json 含逐次记录，.csv 为直方图）；None 表示只打印统计
+INPUT_LATENCY_EXPORT = 'input_latency'
+
+# 对局随机种子：None 表示随机生成；固定后特效表现可完全复现
+MATCH_SEED = None
+
+# 烘焙模式：治疗、护盾、大招预先渲染成帧图集，施法后播放图集，每帧一次 blit；
+# 普通攻击和火焰攻击依赖目标位置，仍实时模拟。回放时需与录制时的设置一致
+BAKED_EFFECTS = False
+
+# 粒子绘制方式：'sprites' 逐个 blit 缓存贴图；'add'/'alpha' 用 NumPy 批量光栅化后一次合成
+# （加色混合/透明度混合），开销取决于覆盖的行数而非粒子个数，适合粒子极多且密集的画面
+PARTICLE_BACKEND = 'sprites'
+
+# 启动到第一帧战斗画面的时间预算（毫秒），启动分析报告会标出超预算
+STARTUP_BUDGET_MS = 1000
+
+# 性能分析：True 时从启动起就记录；运行中按 F3 显示/隐藏性能面板，F4 导出记录
+PROFILE = False
+# 导出文件名前缀，会生成 .json、.csv 和 .trace.json（Chrome trace）三个文件
+PROFILE_EXPORT = 'profile'
+
+# 对局结束时把回放写入该文件；None 表示不录制。用 python set.py --replay 文件 播放
+RECORD_REPLAY = 'last_match.replay'
+# 回放时左右方向键跳转的秒数
+REPLAY_SEEK_SECONDS = 5
+
+# 需要加载的图片：(路径, 缩放尺寸, 是否带透明通道)
+ASSETS = {
+    'bg': ('bg.png', (WIDTH, HEIGHT), False),  # 背景图调整为适应窗口大小
+    'left': ('left.png', (PLAYER_WIDTH, PLAYER_HEIGHT), True),  # 左侧人物
+    'right': ('right.png', (PLAYER_WIDTH, PLAYER_HEIGHT), True),  # 右侧人物
+}
+
+
+def _import_effects():
+    # 特效模块依赖 numpy，导入较慢，放到后台线程
+    import effect_manager
+    import replay
+    import skills
+
+
+def _warm_caches():
+    from skills import warm_caches
+    warm_caches(RENDER_SCALES if DYNAMIC_RESOLUTION else (1.0,))
+
+
+def replay_requested(argv=None):
+    """命令行 --replay 文件 指定的回放文件，没有时返回 None"""
+    argv = sys.argv[1:] if argv is None else argv
+    if '--replay' in argv:
+        index = argv.index('--replay') + 1
+        if index < len(argv):
+            return argv[index]
+    return None
+
+
+class BattleScene:
+    """双人PK战斗场景"""
+
+    def __init__(self, startup_profiler=None, replay_path=None):
+        self.startup_profiler = startup_profiler or StartupProfiler(budget_ms=STARTUP_BUDGET_MS)
+        self.startup_profiler.mark('模块导入')
+
+        # 只初始化用到的子系统（显示与事件），字体在第一次使用时初始化，不初始化音频
+        with self.startup_profiler.phase('显示初始化'):
+            pygame.display.init()
+            self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+            pygame.display.set_caption('双人PK游戏')
+
+        # 后台线程读取资源像素、导入特效模块并预热缓存，主线程显示加载画面
+        self.assets = AssetManager()
+        loader = BackgroundLoader(self.startup_profiler)
+        loader.add('导入特效模块', _import_effects)
+        loader.add('读取资源', self.assets.preload, list(ASSETS.values()))
+        loader.add('预热字体缓存', _warm_caches)
+        loader.start()
+        if not self.show_loading(loader):
+            pygame.quit()
+            sys.exit()
+        results = loader.join()
+
+        # 显示格式转换必须在主线程进行
+        with self.startup_profiler.phase('转换资源格式'):
+            for key, surface, alpha in results['读取资源']:
+                self.assets.finish(key, surface, alpha)
+            self.bg = self.assets.load(*ASSETS['bg'])
+            self.left_player = self.assets.load(*ASSETS['left'])
+            self.right_player = self.assets.load(*ASSETS['right'])
+        for line in self.assets.report():
+            print('资源加载', line)
+
+        # 获取人物图片尺寸
+        self.left_player_rect = self.left_player.get_rect()
+        self.right_player_rect = self.right_player.get_rect()
+
+        # 设置人物底部位置
+        player_height = self.left_player_rect.height + 100
+        ground_level = HEIGHT - player_height  # 底部对齐水平线
+
+        # 设置人物初始位置
+        self.left_player_rect.topleft = (100, ground_level)  # 左侧人物位置
+        self.right_player_rect.topright = (WIDTH - 150, ground_level)  # 右侧人物位置
+
+        # 人物动画：所有帧和着色变体在这里一次生成并转换为显示格式
+        self.characters = None
+        if ANIMATED_PLAYERS:
+            with self.startup_profiler.phase('生成人物动画'):
+                self.characters = Characters([
+                    CharacterSprite(self.left_player, self.left_player_rect, 0, facing=1),
+                    CharacterSprite(self.right_player, self.right_player_rect, 1, facing=-1),
+                ])
+
+        # 特效模块已在后台导入，这里直接取用
+        from effect_manager import EffectManager
+        from effect_rng import seed_match
+        from replay import Replay, ReplayPlayer, ReplayRecorder
+        from simulation import Simulation
+        from skills import EFFECT_TYPES, TICK_RATE
+
+        # 烘焙模式下治疗、护盾、大招施法时创建烘焙播放器，其余特效仍实时模拟；
+        # 回放必须使用与录制时相同的设置，事件重放才会得到与关键帧相同的特效
+        self.baker = None
+        types = EFFECT_TYPES
+        if BAKED_EFFECTS:
+            # 图集需要转换为显示格式，在主线程烘焙（命中磁盘缓存时很快）
+            with self.startup_profiler.phase('烘焙特效'):
+                from baking import EffectBaker
+                self.baker = EffectBaker()
+                self.baker.bake()
+                types = self.baker.types(EFFECT_TYPES)
+
+        # 回放模式下对局状态由回放驱动，不接受施法，也不按负载调整细节等级
+        self.replay_player = None
+        self.recorder = None
+        if replay_path is not None:
+            self.replay_player = ReplayPlayer(Replay.load(replay_path), types)
+            simulation = self.replay_player.simulation
+            self.match_seed = seed_match(simulation.seed)
+            self.replay_speed = 1.0
+            self.replay_paused = False
+            self._replay_steps = 0.0
+        else:
+            self.match_seed = seed_match(MATCH_SEED)
+            simulation = Simulation(self.match_seed, types=types)
+
+        # 当前激活的技能特效，统一控制粒子预算和细节等级
+        particle_batch = None
+        if PARTICLE_BACKEND != 'sprites':
+            from particle_render import ParticleBatch
+            particle_batch = ParticleBatch(PARTICLE_BACKEND)
+        self.effects = EffectManager(simulation, particle_batch=particle_batch)
+        if replay_path is None and RECORD_REPLAY:
+            self.recorder = ReplayRecorder(simulation)
+        self._recorded_level = self.effects.level
+
+        # 流水线模式下模拟状态只在工作线程上读写，主线程只绘制 capture_frame() 截取的快照
+        self.pipeline = None
+        if PIPELINED and replay_path is None:
+            from pipeline import Pipeline
+            self.pipeline = Pipeline(self.advance, self.capture_frame)
+
+        # 玩家输入，回放模式下不接受；casts 为已请求的施法数，即下一次施法上屏时所画状态应有的特效数
+        self.casts = simulation.spawned
+        self.controls = None
+        if replay_path is None:
+            self.controls = Controls(self.cast_input, TICK_RATE, INPUT_QUEUE_MS)
+            if INPUT_GAMEPADS:
+                with self.startup_profiler.phase('初始化手柄'):
+                    self.controls.open_gamepads()
+
+        self.renderer = DirtyRectRenderer(self.screen, self.bg)
+        self.resolution = None
+        if DYNAMIC_RESOLUTION:
+            self.resolution = ResolutionController(RENDER_SCALES, target_frame_ms=1000 / TARGET_FPS)
+            self.renderer = ScaledRenderer(self.screen, self.bg, self.resolution, SMOOTH_UPSCALE,
+                                           direct=self.renderer if DIRTY_RECTS else None)
+            with self.startup_profiler.phase('缩放人物贴图'):
+                self.renderer.prepare(self.characters.surfaces() if self.characters is not None
+                                      else [self.left_player, self.right_player])
+        self.tick_rate = TICK_RATE
+        self.loop = GameLoop(target_fps=TARGET_FPS, sim_rate=TICK_RATE)
+
+        self.profile_overlay = ProfilerOverlay(profiler, budget_ms=1000 / TARGET_FPS)
+        if PROFILE:
+            profiler.enable()
+
+    def show_loading(self, loader):
+        """后台加载期间显示的轻量加载画面（只有进度条，不依赖字体和图片）；关闭窗口返回 False"""
+        clock = pygame.time.Clock()
+        bar = pygame.Rect(0, 0, WIDTH // 2, 12)
+        bar.center = (WIDTH // 2, HEIGHT // 2)
+        while not loader.done:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return False
+            self.screen.fill((20, 20, 30))
+            pygame.draw.rect(self.screen, (80, 80, 100), bar, 1)
+            fill = bar.inflate(-4, -4)
+            fill.width = int(fill.width * loader.progress)
+            if fill.width > 0:
+                pygame.draw.rect(self.screen, (100, 200, 255), fill)
+            pygame.display.flip()
+            self.startup_profiler.first_frame()
+            clock.tick(30)
+        return True
+
+    def handle_events(self):
+        profiler.begin_frame()
+        # 事件处理
+        with profiler.section('events'):
+            # pygame 事件不带时间戳，以取到事件的时刻作为输入到达时间
+            events = pygame.event.get()
+            arrived = time.perf_counter()
+            for event in events:
+                if event.type == pygame.QUIT:
+                    return False
+                elif event.type == pygame.WINDOWEXPOSED:
+                    self.renderer.invalidate()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    # 面板打开期间开启分析；关闭面板时除非 PROFILE 否则停止记录
+                    if not self.profile_overlay.toggle() and not PROFILE:
+                        profiler.disable()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                    self.export_profile()
+                elif self.controls is not None:
+                    self.controls.handle(event, arrived, self.loop.frame)
+                elif event.type == pygame.KEYDOWN:
+                    self.handle_replay_key(event.key)
+            # 本帧的输入在模拟推进前统一施法，冷却按已推进的模拟步计算
+            if self.controls is not None:
+                self.controls.dispatch(self.loop.sim_steps)
+        return True
+
+    def handle_replay_key(self, key):
+        """回放控制：左右方向键跳转，上下方向键加减速，空格暂停"""
+        player = self.replay_player
+        jump = REPLAY_SEEK_SECONDS * self.tick_rate
+        if key == pygame.K_LEFT:
+            player.seek(player.frame - jump)
+        elif key == pygame.K_RIGHT:
+            player.seek(player.frame + jump)
+        elif key == pygame.K_UP:
+            self.replay_speed = min(self.replay_speed * 2, 32.0)
+        elif key == pygame.K_DOWN:
+            self.replay_speed = max(self.replay_speed / 2, 0.25)
+        elif key == pygame.K_SPACE:
+            self.replay_paused = not self.replay_paused
+        else:
+            return
+        self.update_replay_caption()
+
+    def update_replay_caption(self):
+        player = self.replay_player
+        rate = self.tick_rate
+        pygame.display.set_caption('双人PK游戏 - 回放 %.1f/%.1f 秒 %s' % (
+            player.frame / rate, player.replay.length / rate,
+            '暂停' if self.replay_paused else 'x%g' % self.replay_speed))
+
+    def cast(self, kind, caster):
+        """以 caster（0 为左侧、1 为右侧）释放技能；录制时同时写入回放，回放模式下忽略
+
+        流水线模式下排队到下一批模拟步之前执行，返回 None。
+        """
+        if self.replay_player is not None:
+            return None
+        self.casts += 1
+        if self.pipeline is not None:
+            self.pipeline.queue(self._cast, kind, caster)
+            return None
+        return self._cast(kind, caster)
+
+    def cast_input(self, kind, caster):
+        """玩家输入的施法，返回施法序号供延迟统计判断何时上屏"""
+        self.cast(kind, caster)
+        return self.casts
+
+    def _cast(self, kind, caster):
+        if self.recorder is not None:
+            return self.recorder.cast(kind, caster)
+        from simulation import cast
+        return cast(self.effects.simulation, kind, caster)
+
+    def update(self, dt):
+        # 以固定 dt 推进所有特效，渲染掉帧时会在同一帧内补足模拟步数
+        with profiler.section('update'):
+            if self.replay_player is not None:
+                self.update_replay()
+                return
+            self.effects.update()
+            if self.recorder is not None:
+                self.recorder.after_step()
+
+    def advance(self, steps):
+        """流水线模式下在工作线程上推进 steps 步；性能记录只在主线程写入，这里不按特效计时"""
+        simulation = self.effects.simulation
+        for _ in range(steps):
+            simulation.step()
+            if self.recorder is not None:
+                self.recorder.after_step()
+
+    def capture_frame(self):
+        """流水线模式下在工作线程上截取当前状态的只读快照"""
+        from pipeline import FrameState
+        simulation = self.effects.simulation
+        return FrameState(simulation.effects, simulation.frame, self.effects, simulation.spawned)
+
+    def update_replay(self):
+        # 快于实时播放时一个模拟步内推进多步，中间状态不渲染
+        if self.replay_paused:
+            return
+        self._replay_steps += self.replay_speed
+        steps = int(self._replay_steps)
+        self._replay_steps -= steps
+        self.replay_player.advance(steps)
+
+    def render(self, alpha, state=None):
+        # state 为流水线模式下工作线程截取的快照，否则直接绘制当前的特效
+        effects = self.effects if state is None else state
+        frame = self.effects.simulation.frame if state is None else state.frame
+        # 渲染帧落在两个模拟步之间，投射物按 alpha 插值绘制
+        effects.interpolate(alpha)
+        with profiler.section('render'):
+            if self.pipeline is not None:
+                with self.pipeline.rendering():
+                    self.draw(effects, frame)
+                profiler.counter('pipeline_update_ms', self.pipeline.last_update_ms)
+                profiler.counter('pipeline_overlap_ms', self.pipeline.last_overlap_ms)
+                profiler.counter('pipeline_parallel_ms', self.pipeline.last_parallel_ms)
+            else:
+                self.draw(effects, frame)
+        if self.controls is not None:
+            # 画面已提交显示；帧数从输入到达时的渲染帧算起，当帧施法当帧上屏为 0
+            self.controls.presented(self.effects.simulation.spawned if state is None else state.spawned,
+                                    self.loop.frame)
+        profiler.end_frame(effects)
+        self.startup_profiler.first_game_frame()
+        if self.resolution is not None:
+            particles = self.effects.simulation.particle_count() if state is None else state.particle_count()
+            self.adjust_resolution(len(effects), particles)
+        if self.replay_player is not None:
+            if self.loop.frame % 30 == 0:
+                self.update_replay_caption()
+            return
+        if self.pipeline is not None:
+            self.pipeline.queue(self.adjust_detail, self.loop.work_ms)
+        else:
+            self.adjust_detail(self.loop.work_ms)
+
+    def draw(self, effects, frame):
+        sprites = self.player_sprites(effects, frame)
+        if DIRTY_RECTS or self.resolution is not None:
+            self.renderer.render(sprites, effects, [self.profile_overlay])
+        else:
+            self.render_full(sprites, effects)
+
+    def player_sprites(self, effects, frame):
+        """本帧的人物层 [(surface, rect)]：动画人物按特效提示和模拟帧号选出预先生成的帧"""
+        if self.characters is None:
+            return [(self.left_player, self.left_player_rect), (self.right_player, self.right_player_rect)]
+        self.characters.update(effects, frame)
+        return self.characters.layers()
+
+    def adjust_detail(self, frame_ms):
+        # 流水线模式下由工作线程在两步之间调用，与单线程模式一样落在确定的模拟步上
+        self.effects.adjust(frame_ms)
+        if self.recorder is not None and self.effects.level != self._recorded_level:
+            self._recorded_level = self.effects.level
+            self.recorder.detail_changed(self.effects.level)
+
+    def adjust_resolution(self, effects, particles):
+        change = self.resolution.adjust(self.loop.work_ms, self.loop.frame, effects, particles)
+        profiler.counter('render_scale', self.resolution.scale)
+        if change is not None:
+            print(ResolutionController.describe(change))
+
+    def export_profile(self):
+        if not profiler.records:
+            return
+        for ext in ('.json', '.csv', '.trace.json'):
+            profiler.export(PROFILE_EXPORT + ext)
+        print('性能记录已导出: %s.{json,csv,trace.json}（%d 帧）' % (PROFILE_EXPORT, len(profiler.records)))
 
-# 获取人物图片尺寸
-left_player_rect = left_player.get_rect()
-right_player_rect = right_player.get_rect()
+    def render_full(self, sprites, effects):
+        # 绘制背景
+        self.screen.blit(self.bg, (0, 0))
 
-# 设置人物底部位置
-player_height = left_player_rect.height+100
-ground_level = HEIGHT - player_height  # 底部对齐水平线
+        # 绘制人物
+        for surface, rect in sprites:
+            self.screen.blit(surface, rect)
 
-# 设置人物初始位置
-left_player_rect.topleft = (100, ground_level)  # 左侧人物位置
-right_player_rect.topright = (WIDTH - 150, ground_level)  # 右侧人物位置
+        # 绘制特效
+        effects.draw(self.screen)
+        self.profile_overlay.draw(self.screen)
 
-# 主循环
-running = True
-while running:
-    # 事件处理
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
+        # 刷新屏幕
+        pygame.display.flip()
 
-    # 绘制背景
-    screen.blit(bg, (0, 0))
+    def run(self):
+        # 主循环
+        if self.pipeline is not None:
+            self.loop.run_pipelined(self.handle_events, self.pipeline.submit, self.render)
+            self.pipeline.close()
+            print('流水线统计:', self.pipeline.stats())
+        else:
+            self.loop.run(self.handle_events, self.update, self.render)
+        print('帧时间统计:', self.loop.stats())
+        if self.controls is not None:
+            print('输入延迟统计:', self.controls.stats())
+            if INPUT_LATENCY_EXPORT and self.controls.records:
+                for ext in ('.json', '.csv'):
+                    self.controls.export(INPUT_LATENCY_EXPORT + ext)
+                print('输入延迟已导出: %s.{json,csv}' % INPUT_LATENCY_EXPORT)
+        if self.resolution is not None:
+            print('渲染统计:', self.renderer.stats())
+        if PROFILE:
+            self.export_profile()
+        if self.recorder is not None and RECORD_REPLAY:
+            replay = self.recorder.save(RECORD_REPLAY)
+            print('回放已保存: %s（%d 步，%d 字节）' % (RECORD_REPLAY, replay.length, replay.size()))
 
-    # 绘制人物
-    screen.blit(left_player, left_player_rect)
-    screen.blit(right_player, right_player_rect)
 
-    # 刷新屏幕
-    pygame.display.flip()
+if __name__ == '__main__':
+    # --profile-startup 或 PK_PROFILE_STARTUP=1 时打印启动各阶段耗时
+    # --replay 文件 时播放回放而不是开始新对局
+    BattleScene(StartupProfiler(profiling_requested(), STARTUP_BUDGET_MS), replay_requested()).run()
 
-# 退出 pygame
-pygame.quit()
-sys.exit()
+    # 退出 pygame
+    pygame.quit()
+    sys.exit()
@@ -0,0 +1,156 @@
+from collections import OrderedDict
+
+import pygame
+
+from resolution import scale_of, scaled_size
+
+
+def _draw_plus(surface, color):
+    """治疗加号（30x30）"""
+    pygame.draw.line(surface, color, (5, 15), (25, 15), 4)
+    pygame.draw.line(surface, color, (15, 5), (15, 25), 4)
+
+
+def _draw_arrow(surface, color):
+    """减益向下箭头（20x20）"""
+    pygame.draw.polygon(surface, color, [(10, 5), (5, 15), (15, 15)])
+    pygame.draw.line(surface, color, (10, 15), (10, 18), 2)
+
+
+def _draw_shield(surface, color, border_color):
+    """护盾图标（25x25）"""
+    pygame.draw.polygon(surface, color, [(12, 5), (5, 12), (12, 20), (19, 12)])
+    pygame.draw.polygon(surface, border_color, [(12, 5), (5, 12), (12, 20), (19, 12)], 2)
+
+
+# 图标名 -> (尺寸, 绘制函数)
+ICONS = {
+    'plus': ((30, 30), _draw_plus),
+    'arrow': ((20, 20), _draw_arrow),
+    'shield': ((25, 25), _draw_shield),
+}
+
+
+def _blit(surface, texture, position, alpha):
+    """以 alpha 贴共享纹理，贴完恢复为不透明"""
+    alpha = min(255, int(alpha))
+    if alpha >= 255:
+        surface.blit(texture, position)
+        return
+    texture.set_alpha(alpha)
+    surface.blit(texture, position)
+    texture.set_alpha(255)
+
+
+class ShapeCache:
+    """程序化形状纹理缓存：实心圆、圆环和图标按量化后的半径、线宽、颜色只渲染一次
+
+    纹理为带透明通道（SRCALPHA）的 Surface，形状外的像素全透明；透明度在贴图时通过 set_alpha 施加，
+    贴完立即恢复，缓存中的纹理始终是完全不透明的状态，同一形状的淡入淡出不会产生新的 Surface，
+    也不会把上一次的透明度带给下一个使用者。
+    """
+
+    def __init__(self, max_entries=256, radius_step=1, color_step=1):
+        self.max_entries = max_entries
+        self.radius_step = radius_step
+        self.color_step = color_step
+        self._textures = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _quantize_color(self, color):
+        if color is None:
+            return None
+        step = self.color_step
+        return tuple(min(255, int(round(c / step)) * step) for c in color[:3])
+
+    def _lookup(self, key, build):
+        texture = self._textures.get(key)
+        if texture is not None:
+            self.hits += 1
+            self._textures.move_to_end(key)
+            return texture
+
+        self.misses += 1
+        texture = build()
+        self._textures[key] = texture
+        if len(self._textures) > self.max_entries:
+            self._textures.popitem(last=False)
+            self.evictions += 1
+        return texture
+
+    def circle(self, radius, color, width=0, rim_color=None, rim_width=0):
+        """半径为 radius 的圆（width=0 为实心，否则为圆环），可选叠加一圈边框"""
+        r = int(round(radius / self.radius_step) * self.radius_step)
+        color = self._quantize_color(color)
+        rim_color = self._quantize_color(rim_color)
+        key = ('circle', r, width, color, rim_color, rim_width)
+
+        def build():
+            texture = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+            pygame.draw.circle(texture, color, (r, r), r, width)
+            if rim_color is not None:
+                pygame.draw.circle(texture, rim_color, (r, r), r, rim_width)
+            return texture
+
+        return self._lookup(key, build)
+
+    def icon(self, name, *colors, scale=1.0):
+        colors = tuple(self._quantize_color(color) for color in colors)
+        key = ('icon', name, colors, scale)
+
+        def build():
+            size, draw = ICONS[name]
+            texture = pygame.Surface(size, pygame.SRCALPHA)
+            draw(texture, *colors)
+            if scale != 1:
+                # 图标按固定尺寸绘制，缩小的画布上整体缩放
+                texture = pygame.transform.smoothscale(texture, scaled_size(size, scale))
+            return texture
+
+        return self._lookup(key, build)
+
+    def draw_circle(self, surface, center, radius, color, alpha=255, width=0, rim_color=None, rim_width=0):
+        """以 center 为圆心绘制缓存的圆，透明度在贴图时施加"""
+        scale = scale_of(surface)
+        if scale != 1:
+            center = (center[0] * scale, center[1] * scale)
+            radius *= scale
+            width = max(1, int(round(width * scale))) if width else 0
+            rim_width = max(1, int(round(rim_width * scale))) if rim_width else 0
+        if radius < 1 or alpha <= 0:
+            return
+        texture = self.circle(radius, color, width, rim_color, rim_width)
+        _blit(surface, texture, (int(center[0] - radius), int(center[1] - radius)), alpha)
+
+    def draw_icon(self, surface, name, topleft, alpha=255, *colors):
+        if alpha <= 0:
+            return
+        scale = scale_of(surface)
+        if scale != 1:
+            topleft = (topleft[0] * scale, topleft[1] * scale)
+        texture = self.icon(name, *colors, scale=scale)
+        _blit(surface, texture, topleft, alpha)
+
+    def clear(self):
+        self._textures.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._textures),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+# 全局共享的形状纹理缓存
+shapes = ShapeCache()
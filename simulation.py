@@ -0,0 +1,570 @@
+"""特效模拟层：不依赖 pygame，不创建 Surface，也不需要字体
+
+只推进特效状态（位置、计时器、粒子数组），可以在无显示环境下运行对局（CI、回放校验、快照回滚），
+也可以放到渲染线程之外。绘制由 skills.py 中的同名特效类负责。
+
+这一层逐个特效推进，单核每秒约几千到一万步（每局 600 步时为每秒个位数到十几局，
+python simulation.py 实测）。平衡性调整需要的每秒成千上万局由 combat.py 的向量化战斗规则模拟完成，
+它不模拟特效画面，只结算技能数值。
+"""
+import argparse
+import math
+import secrets
+import sys
+import time
+
+import numpy as np
+
+from combat import SKILLS
+from effect_rng import EffectRNG, spawn_rng
+from emitters import EMITTERS
+from particles import ParticleSystem
+from tween import Timeline, own_timeline
+
+# 特效内部的帧计数（life、timer 等）都以此频率为一个模拟步，
+# 由固定步长循环按 dt = 1 / TICK_RATE 推进，与渲染帧率无关
+TICK_RATE = 60
+
+
+class DetailLevel:
+    """特效细节等级：控制粒子生成比例、是否绘制多层光晕、以及透明粒子的剔除阈值"""
+
+    def __init__(self, spawn_scale=1.0, glow=True, min_alpha=0):
+        self.spawn_scale = spawn_scale
+        self.glow = glow
+        self.min_alpha = min_alpha
+
+    def scale_count(self, n):
+        """按生成比例缩减一次性爆发的粒子数"""
+        return int(round(n * self.spawn_scale))
+
+
+# 从高到低的细节等级，由 EffectManager 根据预算切换
+DETAIL_LEVELS = [
+    DetailLevel(1.0, True, 0),
+    DetailLevel(0.6, True, 12),
+    DetailLevel(0.35, False, 32),
+    DetailLevel(0.15, False, 64),
+]
+FULL_DETAIL = DETAIL_LEVELS[0]
+
+# 只推进技能逻辑（阶段、计时、数值），不生成粒子；用于平衡测试和 CI 的大批量对局
+LOGIC_ONLY = DetailLevel(0.0, False, 255)
+
+
+class NormalAttackSim:
+    """普通攻击的模拟状态：只推进数据，不涉及任何绘制"""
+
+    def __init__(self, start_x, start_y, target_x, target_y, is_player1=True, rng=None, timeline=None):
+        self.rng = rng if rng is not None else spawn_rng()
+        self.timeline, self.owns_timeline = own_timeline(timeline)
+        self.start_pos = (start_x, start_y)
+        self.target_pos = (target_x, target_y)
+        self.speed = 0.15
+        # 飞行轨迹：1 / speed 帧内从起点匀速飞到目标
+        self.motion = self.timeline.add((0, 1 / self.speed), (self.start_pos, self.target_pos))
+        self.tweens = [self.motion]
+        self.color = (255, 255, 100) if is_player1 else (100, 255, 255)  # 金色/青色
+        self.particles = ParticleSystem(rng=self.rng)
+        self.hit_effect = False
+        self.hit_particles = ParticleSystem(rng=self.rng)
+        self.is_hit = False
+        self.hit_timer = 0
+        self.damage = SKILLS['normal'].damage
+        self.detail = FULL_DETAIL
+
+    @property
+    def current_pos(self):
+        return self.timeline.point(self.motion)
+
+    def update(self):
+        if self.owns_timeline:
+            self.timeline.step()
+        if not self.is_hit:
+            # 创建轨迹粒子
+            if EMITTERS['normal.trail'].trigger(self.rng, self.detail):
+                particle_color = (255, 255, 200) if self.color == (255, 255, 100) else (200, 255, 255)
+                x, y = self.current_pos
+                EMITTERS['normal.trail'].emit(self.particles, x, y, particle_color)
+
+            # 更新粒子
+            self.particles.update()
+
+            # 检查是否击中目标
+            if self.timeline.done(self.motion):
+                self.create_hit_effect()
+                self.is_hit = True
+        else:
+            # 更新击中粒子
+            self.hit_timer += 1
+            self.hit_particles.update()
+
+    def create_hit_effect(self):
+        """创建击中特效"""
+        # 创建击中光晕
+        color = (255, 255, 150) if self.color == (255, 255, 100) else (150, 255, 255)
+        EMITTERS['normal.hit_ring'].burst(self.hit_particles, self.target_pos[0], self.target_pos[1],
+                                          self.detail, color)
+
+        # 创建数字"10"的粒子效果（伤害数值）
+        EMITTERS['normal.hit_number'].burst(self.hit_particles, self.target_pos[0], self.target_pos[1],
+                                            self.detail)
+
+    def particle_count(self):
+        return len(self.particles) + len(self.hit_particles)
+
+    def is_done(self):
+        return self.is_hit and len(self.hit_particles) == 0
+
+
+class HealSim:
+    """回血技能的模拟状态：只推进数据，不涉及任何绘制"""
+
+    def __init__(self, x, y, rng=None, timeline=None):
+        self.rng = rng if rng is not None else spawn_rng()
+        self.timeline, self.owns_timeline = own_timeline(timeline)
+        self.x = x
+        self.y = y
+        self.max_radius = 40
+        # 光环每帧扩大 1 直到 max_radius，之后每帧缩小 0.5
+        self.halo = self.timeline.add((0, self.max_radius, self.max_radius * 3), (0, self.max_radius, 0))
+        self.tweens = [self.halo]
+        self.heal_particles = ParticleSystem(rng=self.rng)
+        self.number_particles = ParticleSystem(rng=self.rng)
+        self.life = 60
+        self.max_life = self.life
+        self.amount = SKILLS['heal'].heal
+        self.detail = FULL_DETAIL
+
+    @property
+    def radius(self):
+        return self.timeline.value(self.halo)
+
+    def update(self):
+        if self.owns_timeline:
+            self.timeline.step()
+        self.life -= 1
+
+        # 创建治疗粒子（绿色向上飘）
+        if EMITTERS['heal.rise'].trigger(self.rng, self.detail) and self.life > 20:
+            # 出生在当前光环半径以内
+            EMITTERS['heal.rise'].emit(self.heal_particles, self.x, self.y, distance=(0, self.radius))
+
+        # 创建数字"15"的粒子效果
+        if self.life == 50:  # 在特定时间创建数字粒子
+            EMITTERS['heal.number'].burst(self.number_particles, self.x, self.y, self.detail)
+
+        # 更新粒子
+        self.heal_particles.update()
+        self.number_particles.update()
+
+    def particle_count(self):
+        return len(self.heal_particles) + len(self.number_particles)
+
+    def is_done(self):
+        return self.life <= 0
+
+
+class FlameAttackSim:
+    """火焰攻击的模拟状态：只推进数据，不涉及任何绘制"""
+
+    def __init__(self, start_x, start_y, target_x, target_y, rng=None, timeline=None):
+        self.rng = rng if rng is not None else spawn_rng()
+        self.timeline, self.owns_timeline = own_timeline(timeline)
+        self.tweens = []
+        self.start_pos = (start_x, start_y)
+        self.target_pos = (target_x, target_y)
+        self.fireballs = []
+        self.explosions = []
+        self.debuff_indicator = None
+        self.damage = SKILLS['flame'].damage
+        self.debuff = SKILLS['flame'].debuff
+        self.detail = FULL_DETAIL
+        self.create_fireballs()
+
+    def create_fireballs(self):
+        """创建多个火球"""
+        for i in range(3):
+            offset_x = self.rng.uniform(-20, 20)
+            offset_y = self.rng.uniform(-20, 20)
+            target = (self.target_pos[0] + offset_x, self.target_pos[1] + offset_y)
+            speed = self.rng.uniform(0.08, 0.12)
+
+            fireball = {
+                'target_x': target[0],
+                'target_y': target[1],
+                # 从施法者位置匀速飞向带偏移的目标
+                'motion': self.timeline.add((0, 1 / speed), (self.start_pos, target)),
+                'particles': ParticleSystem(rng=self.rng),
+                'exploded': False
+            }
+            self.tweens.append(fireball['motion'])
+            self.fireballs.append(fireball)
+
+    def update(self):
+        timeline = self.timeline
+        if self.owns_timeline:
+            timeline.step()
+
+        # 更新火球
+        for fireball in self.fireballs:
+            if not fireball['exploded']:
+                x, y = timeline.point(fireball['motion'])
+
+                # 创建火焰轨迹粒子
+                if EMITTERS['flame.trail'].trigger(self.rng, self.detail):
+                    EMITTERS['flame.trail'].emit(fireball['particles'], x, y)
+
+                # 更新粒子
+                fireball['particles'].update()
+
+                # 检查是否击中
+                if timeline.done(fireball['motion']):
+                    self.create_explosion(x, y)
+                    fireball['exploded'] = True
+
+                    # 创建减益效果指示器，计时本帧就开始
+                    if self.debuff_indicator is None:
+                        max_timer = 60  # 持续1秒（假设60FPS）
+                        self.debuff_indicator = {
+                            'x': fireball['target_x'],
+                            'y': fireball['target_y'],
+                            'clock': timeline.add((0, max_timer), (0, max_timer), elapsed=1),
+                            'max_timer': max_timer
+                        }
+                        self.tweens.append(self.debuff_indicator['clock'])
+
+        # 更新爆炸效果
+        for explosion in self.explosions[:]:
+            explosion['particles'].update()
+            if timeline.done(explosion['grow']):
+                timeline.release(explosion['grow'])
+                self.explosions.remove(explosion)
+
+    def create_explosion(self, x, y):
+        duration = 30
+        self.explosions.append({
+            'x': x,
+            'y': y,
+            # (timer, radius)：计时每帧加 1，光晕基础半径每帧加 0.5，本帧就开始推进
+            'grow': self.timeline.add((0, duration + 1), ((0, 10), (duration + 1, 10 + (duration + 1) * 0.5)),
+                                      elapsed=1),
+            'max_radius': 40,
+            'duration': duration,
+            'particles': ParticleSystem(rng=self.rng)
+        })
+
+        # 创建爆炸粒子
+        EMITTERS['flame.explosion'].burst(self.explosions[-1]['particles'], x, y, self.detail)
+
+    def particle_count(self):
+        return sum(len(fireball['particles']) for fireball in self.fireballs) + \
+            sum(len(explosion['particles']) for explosion in self.explosions)
+
+    def is_done(self):
+        return all(fireball['exploded'] for fireball in self.fireballs) and \
+            len(self.explosions) == 0 and \
+            (self.debuff_indicator is None or self.timeline.done(self.debuff_indicator['clock']))
+
+
+class ShieldSim:
+    """防御屏障的模拟状态：只推进数据，不涉及任何绘制"""
+
+    def __init__(self, x, y, rng=None, timeline=None):
+        self.rng = rng if rng is not None else spawn_rng()
+        self.timeline, self.owns_timeline = own_timeline(timeline)
+        self.x = x
+        self.y = y
+        self.radius = 20
+        self.max_radius = 35
+        self.hexagons = []
+        self.particles = ParticleSystem(rng=self.rng)
+        self.life = 90  # 持续1.5秒
+        self.max_life = self.life
+        # 整体每帧旋转 0.03 弧度
+        self.spin = self.timeline.add((0, self.life), (0, self.life * 0.03))
+        self.tweens = [self.spin]
+        self.amount = SKILLS['shield'].shield
+        self.detail = FULL_DETAIL
+        self.create_hexagons()
+
+    def create_hexagons(self):
+        """创建六边形护盾段"""
+        num_sides = 6
+        for i in range(num_sides):
+            angle = (i / num_sides) * math.pi * 2
+            offset = self.rng.uniform(0, math.pi * 2)
+            self.hexagons.append({
+                'angle': angle,
+                'distance': self.rng.uniform(0.8, 1.2),
+                # 脉动系数 0.8 + 0.2 * sin(相位)，相位每帧加 0.1
+                'pulse': self.timeline.add((0, self.life), (offset, offset + self.life * 0.1), wave=(0.8, 0.2)),
+                'particles': ParticleSystem(rng=self.rng)
+            })
+            self.tweens.append(self.hexagons[-1]['pulse'])
+
+    @property
+    def angle(self):
+        return self.timeline.value(self.spin)
+
+    def update(self):
+        if self.owns_timeline:
+            self.timeline.step()
+        self.life -= 1
+
+        # 更新六边形位置和粒子
+        spin = self.angle
+        for hexagon in self.hexagons:
+            # 创建护盾粒子
+            if EMITTERS['shield.segment'].trigger(self.rng, self.detail) and self.life > 30:
+                pulse = self.timeline.value(hexagon['pulse'])
+                angle = hexagon['angle'] + spin
+                distance = self.radius * hexagon['distance'] * pulse
+                px = self.x + math.cos(angle) * distance
+                py = self.y + math.sin(angle) * distance
+                # 沿护盾段切向飘出
+                EMITTERS['shield.segment'].emit(hexagon['particles'], px, py, angle=angle)
+
+            # 更新粒子
+            hexagon['particles'].update()
+
+        # 创建中心粒子
+        if EMITTERS['shield.core'].trigger(self.rng, self.detail) and self.life > 20:
+            EMITTERS['shield.core'].emit(self.particles, self.x, self.y)
+
+        # 更新中心粒子
+        self.particles.update()
+
+    def particle_count(self):
+        return len(self.particles) + sum(len(hexagon['particles']) for hexagon in self.hexagons)
+
+    def is_done(self):
+        return self.life <= 0
+
+
+# 大招各阶段的起始帧及结束帧
+PHASE_KEYS = (0, 61, 92, 153)
+
+
+class UltimateSim:
+    """大招的模拟状态：只推进数据，不涉及任何绘制"""
+
+    def __init__(self, x, y, is_player1=True, rng=None, timeline=None):
+        self.rng = rng if rng is not None else spawn_rng()
+        self.timeline, self.owns_timeline = own_timeline(timeline)
+        self.x = x
+        self.y = y
+        self.is_player1 = is_player1
+        self.main_color = (255, 100, 100) if is_player1 else (100, 100, 255)  # 红色/蓝色
+        self.secondary_color = (255, 200, 100) if is_player1 else (100, 200, 255)
+        # 阶段 0:蓄力 1 秒, 1:释放 0.5 秒, 2:治疗 1 秒；分段即阶段，段内帧数即阶段计时
+        self.phases = self.timeline.add(PHASE_KEYS, (0, 1, 2, 2), 'step')
+        self.tweens = [self.phases]
+        self.charge_particles = ParticleSystem(rng=self.rng)
+        self.explosion_particles = ParticleSystem(rng=self.rng)
+        self.heal_particles = ParticleSystem(rng=self.rng)
+        self.energy_lines = []
+        self.damage = SKILLS['ultimate'].damage
+        self.heal_amount = SKILLS['ultimate'].heal
+        self.detail = FULL_DETAIL
+
+    @property
+    def phase(self):
+        return self.timeline.segment(self.phases)
+
+    @property
+    def timer(self):
+        return int(self.timeline.local(self.phases))
+
+    def update(self):
+        timeline = self.timeline
+        if self.owns_timeline:
+            timeline.step()
+        phase, timer = self.phase, self.timer
+
+        if phase == 0:  # 蓄力阶段
+            # 创建蓄力粒子
+            # 粒子从外圈出发向中心移动
+            if EMITTERS['ultimate.charge'].trigger(self.rng, self.detail):
+                EMITTERS['ultimate.charge'].emit(self.charge_particles, self.x, self.y, self.secondary_color)
+
+            # 创建能量线，本帧就开始推进
+            if timer % 3 == 0:
+                angle = self.rng.uniform(0, math.pi * 2)
+                start_x = self.x + math.cos(angle) * 80
+                start_y = self.y + math.sin(angle) * 80
+                speed = self.rng.uniform(0.05, 0.1)
+                self.energy_lines.append({
+                    'start': (start_x, start_y),
+                    'end': (self.x, self.y),
+                    'progress': timeline.add((0, 1 / speed), (0, 1), elapsed=1)
+                })
+
+            # 移除走完的能量线
+            for line in self.energy_lines[:]:
+                if timeline.done(line['progress']):
+                    timeline.release(line['progress'])
+                    self.energy_lines.remove(line)
+
+        elif self.energy_lines:
+            # 蓄力结束后能量线不再绘制
+            timeline.release(*(line['progress'] for line in self.energy_lines))
+            self.energy_lines = []
+
+        if phase == 1:  # 释放阶段
+            # 创建爆炸粒子
+            if timer < 30:
+                EMITTERS['ultimate.burst'].burst(self.explosion_particles, self.x, self.y, self.detail,
+                                                 self.main_color)
+
+        elif phase == 2:  # 治疗阶段
+            # 创建治疗粒子
+            if timer < 30:
+                heal_color = (100, 255, 100) if self.is_player1 else (100, 255, 200)
+                # 粒子从外圈出发向中心移动（治疗回流）
+                EMITTERS['ultimate.heal'].burst(self.heal_particles, self.x, self.y, self.detail, heal_color)
+
+        # 更新所有粒子
+        self.charge_particles.update()
+        self.explosion_particles.update()
+        self.heal_particles.update()
+
+    def particle_count(self):
+        return len(self.charge_particles) + len(self.explosion_particles) + len(self.heal_particles)
+
+    def is_done(self):
+        return self.timeline.done(self.phases)
+
+
+# 特效名称 -> 模拟类
+SIM_TYPES = {
+    'normal': NormalAttackSim,
+    'heal': HealSim,
+    'flame': FlameAttackSim,
+    'shield': ShieldSim,
+    'ultimate': UltimateSim,
+}
+
+
+class Simulation:
+    """无头对局模拟：持有一局中所有激活的特效，以固定步长推进
+
+    types 为特效名称到类的映射，默认使用纯模拟类；传入 skills.EFFECT_TYPES 得到可绘制的特效。
+    每局有独立的根种子，不读写 effect_rng 的全局对局种子，同一进程可以并行推进多局；
+    同样的种子和释放序列得到完全相同的状态。
+    所有特效的补间放在同一条时间轴上，每步开头统一求值一次。
+
+    特效需要提供 update()、is_done()、particle_count() 和 detail 属性；用到补间的特效另有
+    timeline 与 tweens（自己创建的补间句柄），结束时由 step() 统一释放。不用补间的特效
+    （如烘焙特效）可以没有这两个属性，或令 tweens 为空。
+    """
+
+    def __init__(self, seed=None, types=None, detail=FULL_DETAIL):
+        self.seed = secrets.randbits(63) if seed is None else seed
+        self._sequence = np.random.SeedSequence(self.seed)
+        self.types = types or SIM_TYPES
+        self.detail = detail
+        self.effects = []
+        self.timeline = Timeline()
+        self.frame = 0
+
+    def spawn(self, kind, *args, **kwargs):
+        """创建并加入一个特效，随机源按创建顺序从本局根种子派生"""
+        rng = EffectRNG(self._sequence.spawn(1)[0])
+        effect = self.types[kind](*args, rng=rng, timeline=self.timeline, **kwargs)
+        effect.detail = self.detail
+        self.effects.append(effect)
+        return effect
+
+    @property
+    def spawned(self):
+        """本局已创建的特效数（随根种子序列一起保存在快照中）"""
+        return self._sequence.n_children_spawned
+
+    def set_detail(self, detail):
+        """切换细节等级，对已有特效和之后创建的特效都生效"""
+        self.detail = detail
+        for effect in self.effects:
+            effect.detail = detail
+
+    def step(self, update=None):
+        """推进一个模拟步，并用交换删除移除已结束的特效
+
+        update 可替换单个特效的更新调用（例如加上性能计时），默认直接调用 effect.update()。
+        """
+        self.timeline.step()
+        effects = self.effects
+        for index in range(len(effects) - 1, -1, -1):
+            effect = effects[index]
+            if update is None:
+                effect.update()
+            else:
+                update(effect)
+            if effect.is_done():
+                tweens = getattr(effect, 'tweens', None)
+                if tweens:
+                    effect.timeline.release(*tweens)
+                last = effects.pop()
+                if index < len(effects):
+                    effects[index] = last
+        self.frame += 1
+
+    def run(self, steps):
+        for _ in range(steps):
+            self.step()
+
+    def particle_count(self):
+        return sum(effect.particle_count() for effect in self.effects)
+
+
+# 无头对局中双方的施法位置，与 set.py 的人物站位一致
+PLAYER_POSITIONS = ((180, 380), (570, 380))
+
+
+def cast(simulation, kind, caster):
+    """以 caster（0 或 1）的身份释放技能，目标为另一方"""
+    x, y = PLAYER_POSITIONS[caster]
+    tx, ty = PLAYER_POSITIONS[1 - caster]
+    if kind == 'normal':
+        return simulation.spawn(kind, x, y, tx, ty, is_player1=caster == 0)
+    if kind == 'flame':
+        return simulation.spawn(kind, x, y, tx, ty)
+    if kind == 'ultimate':
+        return simulation.spawn(kind, x, y, is_player1=caster == 0)
+    return simulation.spawn(kind, x, y)
+
+
+def random_match(seed, steps=600, cast_every=20, detail=FULL_DETAIL):
+    """双方每隔 cast_every 步轮流随机释放一个技能的无头对局"""
+    simulation = Simulation(seed, detail=detail)
+    choices = np.random.default_rng(seed)
+    kinds = list(SIM_TYPES)
+    for step in range(steps):
+        if step % cast_every == 0:
+            cast(simulation, kinds[choices.integers(len(kinds))], (step // cast_every) % 2)
+        simulation.step()
+    return simulation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='无头运行随机对局，测量特效模拟吞吐量'
+                                                 '（批量平衡性模拟见 combat.py）')
+    parser.add_argument('--matches', type=int, default=200, help='对局数')
+    parser.add_argument('--steps', type=int, default=600, help='每局模拟步数（60 步为 1 秒）')
+    parser.add_argument('--seed', type=int, default=0, help='第一局的种子，之后依次加一')
+    parser.add_argument('--logic-only', action='store_true', help='不生成粒子，只推进技能逻辑')
+    args = parser.parse_args(argv)
+    detail = LOGIC_ONLY if args.logic_only else FULL_DETAIL
+
+    start = time.perf_counter()
+    particles = 0
+    for i in range(args.matches):
+        particles += random_match(args.seed + i, args.steps, detail=detail).particle_count()
+    elapsed = time.perf_counter() - start
+    print('%d 局 x %d 步: %.2f s，%.1f 局/秒，%.0f 步/秒（剩余粒子 %d，未加载 pygame: %s）' % (
+        args.matches, args.steps, elapsed, args.matches / elapsed,
+        args.matches * args.steps / elapsed, particles, 'pygame' not in sys.modules))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""特效状态的紧凑快照与恢复，用于回滚联机：每帧保存，必要时回退并重新模拟若干帧
+
+快照由两部分组成：
+- 所有粒子系统的存活粒子，按字段拼接成连续数组后直接存原始字节；
+- 其余状态（标量、坐标元组、fireball/explosion/hexagon/energy_line 等嵌套字典）
+  经 marshal 编码，粒子系统、随机源、时间轴和细节等级用引用代替。
+
+同一局的特效共享一条时间轴，快照中只保存一次，恢复后仍然共享。
+
+恢复时创建新的特效对象，与原对象互不影响；恢复后继续模拟的结果与原状态完全一致。
+"""
+import argparse
+import copy
+import importlib
+import marshal
+import pickle
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from effect_rng import EffectRNG
+from particles import ParticleSystem
+from simulation import DETAIL_LEVELS, LOGIC_ONLY, SIM_TYPES, DetailLevel, Simulation, cast
+from tween import Timeline
+
+# 快照格式版本，字段变化时递增
+SNAPSHOT_VERSION = 3
+
+# 粒子系统的字段及其类型，按此顺序拼接；color 每个粒子 3 个分量
+PARTICLE_FIELDS = ('x', 'y', 'vx', 'vy', 'gravity', 'size', 'decay', 'life', 'max_life', 'color')
+PARTICLE_DTYPES = {field: np.dtype(np.float32) for field in PARTICLE_FIELDS}
+PARTICLE_DTYPES.update(life=np.dtype(np.int32), max_life=np.dtype(np.int32), color=np.dtype(np.uint8))
+
+# 引用标记：嵌套字典中不会出现以双下划线开头的键
+_PARTICLES = '__p__'
+_RNG = '__r__'
+_DETAIL = '__d__'
+_TIMELINE = '__t__'
+
+_HEADER = struct.Struct('<HI')
+
+_PRIMITIVES = (int, float, str, bool, type(None))
+
+
+class _Encoder:
+    def __init__(self):
+        self.systems = []
+        self.rngs = []
+        self._rng_ids = {}
+        self.timelines = []
+        self._timeline_ids = {}
+
+    def value(self, value):
+        if isinstance(value, _PRIMITIVES):
+            return value
+        if isinstance(value, tuple):
+            # 坐标、颜色等元组只含标量，直接保存
+            return value
+        if isinstance(value, list):
+            return [self.value(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.value(item) for key, item in value.items()}
+        if isinstance(value, ParticleSystem):
+            self.systems.append(value)
+            return {_PARTICLES: (len(self.systems) - 1, self.rng(value.rng))}
+        if isinstance(value, EffectRNG):
+            return {_RNG: self.rng(value)}
+        if isinstance(value, Timeline):
+            index = self._timeline_ids.get(id(value))
+            if index is None:
+                index = self._timeline_ids[id(value)] = len(self.timelines)
+                self.timelines.append(value)
+            return {_TIMELINE: index}
+        if isinstance(value, DetailLevel):
+            return {_DETAIL: (value.spawn_scale, value.glow, value.min_alpha)}
+        if isinstance(value, (np.floating, np.integer)):
+            return value.item()
+        raise TypeError('无法快照的特效状态: %s' % type(value).__name__)
+
+    def rng(self, rng):
+        index = self._rng_ids.get(id(rng))
+        if index is None:
+            index = self._rng_ids[id(rng)] = len(self.rngs)
+            self.rngs.append(rng)
+        return index
+
+
+def _class_key(cls):
+    return '%s:%s' % (cls.__module__, cls.__qualname__)
+
+
+_classes = {}
+
+
+def _class_for(key):
+    cls = _classes.get(key)
+    if cls is None:
+        module, name = key.split(':')
+        cls = _classes[key] = getattr(importlib.import_module(module), name)
+    return cls
+
+
+def snapshot(effects, extra=None):
+    """把特效列表（及可选的附加状态，需为 marshal 可编码的数据或时间轴）编码为 bytes"""
+    encoder = _Encoder()
+    classes = []
+    class_index = {}
+    entries = []
+    for effect in effects:
+        cls = type(effect)
+        index = class_index.get(cls)
+        if index is None:
+            index = class_index[cls] = len(classes)
+            classes.append(_class_key(cls))
+        entries.append((index, {key: encoder.value(value) for key, value in effect.__dict__.items()}))
+    extra = encoder.value(extra)
+
+    systems = encoder.systems
+    counts = [system.count for system in systems]
+    particles = b''
+    if systems and sum(counts):
+        particles = b''.join(
+            np.concatenate([getattr(system, field)[:system.count] for system in systems]).tobytes()
+            for field in PARTICLE_FIELDS)
+
+    # 版本 2 不按对象身份生成引用，相同的状态总是编码出相同的字节，快照可直接比较
+    state = marshal.dumps((classes, entries, counts, [rng.get_state() for rng in encoder.rngs],
+                           [timeline.get_state() for timeline in encoder.timelines], extra), 2)
+    return _HEADER.pack(SNAPSHOT_VERSION, len(state)) + state + particles
+
+
+def _restore_particles(counts, data):
+    total = sum(counts)
+    columns = {}
+    offset = 0
+    for field in PARTICLE_FIELDS:
+        dtype = PARTICLE_DTYPES[field]
+        width = 3 if field == 'color' else 1
+        column = np.frombuffer(data, dtype=dtype, count=total * width, offset=offset)
+        columns[field] = column.reshape(total, 3) if width == 3 else column
+        offset += total * width * dtype.itemsize
+
+    systems = []
+    start = 0
+    for count in counts:
+        system = ParticleSystem.__new__(ParticleSystem)
+        system.count = 0
+        system.rng = None
+        system._allocate(max(64, count))
+        if count:
+            for field in PARTICLE_FIELDS:
+                getattr(system, field)[:count] = columns[field][start:start + count]
+        system.count = count
+        start += count
+        systems.append(system)
+    return systems
+
+
+def _detail_level(values):
+    for level in DETAIL_LEVELS + [LOGIC_ONLY]:
+        if (level.spawn_scale, level.glow, level.min_alpha) == values:
+            return level
+    return DetailLevel(*values)
+
+
+def restore(data):
+    """由 snapshot() 的结果重建特效列表，返回 (effects, extra)"""
+    version, length = _HEADER.unpack_from(data)
+    if version != SNAPSHOT_VERSION:
+        raise ValueError('快照版本不匹配: %d' % version)
+    start = _HEADER.size
+    classes, entries, counts, rng_states, timeline_states, extra = marshal.loads(data[start:start + length])
+    rngs = [EffectRNG.from_state(state) for state in rng_states]
+    timelines = [Timeline.from_state(state) for state in timeline_states]
+    systems = _restore_particles(counts, data[start + length:]) if counts else []
+
+    def decode(value):
+        if isinstance(value, list):
+            return [decode(item) for item in value]
+        if isinstance(value, dict):
+            if _PARTICLES in value:
+                system_index, rng_index = value[_PARTICLES]
+                system = systems[system_index]
+                system.rng = rngs[rng_index]
+                return system
+            if _RNG in value:
+                return rngs[value[_RNG]]
+            if _TIMELINE in value:
+                return timelines[value[_TIMELINE]]
+            if _DETAIL in value:
+                return _detail_level(value[_DETAIL])
+            return {key: decode(item) for key, item in value.items()}
+        return value
+
+    effects = []
+    for class_index, state in entries:
+        cls = _class_for(classes[class_index])
+        effect = cls.__new__(cls)
+        effect.__dict__.update((key, decode(value)) for key, value in state.items())
+        effects.append(effect)
+    return effects, decode(extra)
+
+
+def _sequence_state(sequence):
+    return (sequence.entropy, tuple(sequence.spawn_key), sequence.pool_size, sequence.n_children_spawned)
+
+
+def _sequence_from_state(state):
+    entropy, spawn_key, pool_size, spawned = state
+    return np.random.SeedSequence(entropy, spawn_key=spawn_key, pool_size=pool_size,
+                                  n_children_spawned=spawned)
+
+
+def snapshot_simulation(simulation):
+    """整局快照：特效、帧号、派生新特效随机源的种子序列、新特效的细节等级以及共享的时间轴"""
+    detail = simulation.detail
+    return snapshot(simulation.effects, [simulation.frame, _sequence_state(simulation._sequence),
+                                         (detail.spawn_scale, detail.glow, detail.min_alpha), simulation.timeline])
+
+
+def restore_simulation(simulation, data):
+    """把 simulation 回退到快照时的状态"""
+    effects, (frame, sequence, detail, timeline) = restore(data)
+    simulation.effects = effects
+    simulation.timeline = timeline
+    simulation.frame = frame
+    simulation._sequence = _sequence_from_state(sequence)
+    simulation.detail = _detail_level(detail)
+
+
+def _busy_simulation(seed, effects_per_side):
+    """双方各自连续释放技能，直到场上有 2 * effects_per_side 个特效"""
+    simulation = Simulation(seed)
+    kinds = list(SIM_TYPES)
+    for i in range(effects_per_side * 2):
+        cast(simulation, kinds[i % len(kinds)], i % 2)
+        simulation.run(4)
+    return simulation
+
+
+def _measure(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='测量特效快照的大小、保存/恢复耗时和回滚重模拟耗时')
+    parser.add_argument('--effects', type=int, default=5, help='每方同时存在的特效数')
+    parser.add_argument('--rollback', type=int, default=8, help='回滚后重新模拟的帧数')
+    parser.add_argument('--repeat', type=int, default=50, help='每项取最好成绩的重复次数')
+    parser.add_argument('--seed', type=int, default=0, help='对局种子')
+    args = parser.parse_args(argv)
+
+    simulation = _busy_simulation(args.seed, args.effects)
+    data = snapshot_simulation(simulation)
+
+    # 正确性：恢复后重新模拟，与原对局继续模拟的状态逐字节一致
+    probe = Simulation(args.seed)
+    restore_simulation(probe, data)
+    simulation.run(args.rollback)
+    probe.run(args.rollback)
+    identical = snapshot_simulation(probe) == snapshot_simulation(simulation)
+
+    data = snapshot_simulation(simulation)
+    save_ms = _measure(lambda: snapshot_simulation(simulation), args.repeat)
+    restore_ms = _measure(lambda: restore_simulation(probe, data), args.repeat)
+
+    def rollback():
+        restore_simulation(probe, data)
+        probe.run(args.rollback)
+
+    rollback_ms = _measure(rollback, args.repeat)
+    deepcopy_ms = _measure(lambda: copy.deepcopy(simulation.effects), max(1, args.repeat // 5))
+    pickled = pickle.dumps(simulation.effects, protocol=pickle.HIGHEST_PROTOCOL)
+
+    print('特效 %d 个，粒子 %d 个' % (len(simulation.effects), simulation.particle_count()))
+    print('快照大小 %d 字节（zlib 后 %d 字节；pickle %d 字节）' % (
+        len(data), len(zlib.compress(data, 1)), len(pickled)))
+    print('保存 %.3f ms，恢复 %.3f ms（deepcopy %.3f ms）' % (save_ms, restore_ms, deepcopy_ms))
+    print('回滚：恢复并重新模拟 %d 帧 %.3f ms（帧预算 %.1f ms）' % (args.rollback, rollback_ms, 1000 / 60))
+    print('恢复后重新模拟与原对局一致: %s' % identical)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+import pygame
+import numpy as np
+
+
+class ParticleSpriteCache:
+    """粒子贴图缓存：按量化后的 (尺寸, 颜色, 透明度) 预渲染圆形贴图，LRU 淘汰"""
+
+    def __init__(self, max_entries=512, size_step=0.5, color_step=8, alpha_step=16):
+        self.max_entries = max_entries
+        self.size_step = size_step
+        self.color_step = color_step
+        self.alpha_step = alpha_step
+        self._sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, size, color, alpha):
+        """把粒子属性数组量化为缓存键的整数分量"""
+        size_q = np.rint(np.asarray(size) / self.size_step).astype(np.int32)
+        color_q = np.rint(np.asarray(color, dtype=np.float32) / self.color_step).astype(np.int32)
+        alpha_q = np.rint(np.asarray(alpha, dtype=np.float32) / self.alpha_step).astype(np.int32)
+        return size_q, color_q, alpha_q
+
+    def get(self, size_q, r_q, g_q, b_q, alpha_q):
+        """按量化键取贴图，未命中时渲染并放入缓存"""
+        key = (size_q, r_q, g_q, b_q, alpha_q)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self._sprites.move_to_end(key)
+            return sprite
+
+        self.misses += 1
+        radius = size_q * self.size_step
+        color = (min(255, r_q * self.color_step),
+                 min(255, g_q * self.color_step),
+                 min(255, b_q * self.color_step),
+                 min(255, alpha_q * self.alpha_step))
+        sprite = pygame.Surface((int(radius * 2), int(radius * 2)), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (int(radius), int(radius)), int(radius))
+
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_entries:
+            self._sprites.popitem(last=False)
+            self.evictions += 1
+        return sprite
+
+    def clear(self):
+        self._sprites.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """命中统计，用于调整量化步长"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._sprites),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+# 全局共享的粒子贴图缓存
+particle_sprites = ParticleSpriteCache()
@@ -0,0 +1,117 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# 尽早记录时间点，用于统计解释器启动后各模块导入的耗时
+PROCESS_START = time.perf_counter()
+
+
+def profiling_requested(argv=None):
+    """命令行 --profile-startup 或环境变量 PK_PROFILE_STARTUP=1 开启启动分析"""
+    argv = sys.argv if argv is None else argv
+    return '--profile-startup' in argv or os.environ.get('PK_PROFILE_STARTUP') == '1'
+
+
+class StartupProfiler:
+    """启动分析：按阶段记录耗时，统计到首帧的时间并与预算比较"""
+
+    def __init__(self, enabled=False, budget_ms=1000):
+        self.enabled = enabled
+        self.budget_ms = budget_ms
+        self.phases = []
+        self.first_frame_ms = None
+        self.first_game_frame_ms = None
+        self._last = PROCESS_START
+
+    def _now_ms(self):
+        return (time.perf_counter() - PROCESS_START) * 1000
+
+    def mark(self, name):
+        """记录从上一个标记到现在的耗时（如模块导入）"""
+        now = time.perf_counter()
+        self.phases.append((name, (now - self._last) * 1000, '主线程'))
+        self._last = now
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._last = time.perf_counter()
+            self.phases.append((name, (self._last - start) * 1000, '主线程'))
+
+    def add(self, name, ms, thread='后台'):
+        self.phases.append((name, ms, thread))
+
+    def first_frame(self):
+        """第一帧（加载画面）已显示"""
+        if self.first_frame_ms is None:
+            self.first_frame_ms = self._now_ms()
+
+    def first_game_frame(self):
+        """第一帧战斗画面已显示，启用分析时打印报告"""
+        if self.first_game_frame_ms is None:
+            self.first_game_frame_ms = self._now_ms()
+            if self.enabled:
+                print(self.report())
+
+    def report(self):
+        lines = ['启动耗时分析:']
+        for name, ms, thread in self.phases:
+            lines.append('  %-16s %8.1f ms  [%s]' % (name, ms, thread))
+        if self.first_frame_ms is not None:
+            lines.append('  首帧（加载画面）   %8.1f ms' % self.first_frame_ms)
+        if self.first_game_frame_ms is not None:
+            over = '  超出预算!' if self.first_game_frame_ms > self.budget_ms else ''
+            lines.append('  首帧（战斗画面）   %8.1f ms  预算 %d ms%s'
+                         % (self.first_game_frame_ms, self.budget_ms, over))
+        return '\n'.join(lines)
+
+
+class BackgroundLoader:
+    """后台加载线程：依次执行加载任务，主线程轮询进度并显示加载画面"""
+
+    def __init__(self, profiler=None):
+        self.profiler = profiler
+        self.tasks = []
+        self.results = {}
+        self.completed = 0
+        self.error = None
+        self._thread = None
+
+    def add(self, name, func, *args):
+        self.tasks.append((name, func, args))
+
+    @property
+    def progress(self):
+        return self.completed / len(self.tasks) if self.tasks else 1.0
+
+    @property
+    def done(self):
+        return self._thread is not None and not self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='loader', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for name, func, args in self.tasks:
+            start = time.perf_counter()
+            try:
+                self.results[name] = func(*args)
+            except Exception as exc:
+                self.error = exc
+                return
+            if self.profiler is not None:
+                self.profiler.add(name, (time.perf_counter() - start) * 1000)
+            self.completed += 1
+
+    def join(self):
+        """等待加载结束；后台任务出错时在主线程重新抛出"""
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.results
@@ -0,0 +1,7 @@
+"""测试公共设置：模块都在仓库根目录下，pygame 使用无显示的 dummy 驱动"""
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+from combat import MAX_HP, MAX_SHIELD, SKILLS, STRATEGIES, Battle, simulate
+
+
+def _cast(battle, player, name, matches=None):
+    """对选中的对局（默认全部）释放技能 name"""
+    choice = np.full(battle.n, -1, dtype=np.int16)
+    choice[slice(None) if matches is None else matches] = battle.index(name)
+    battle.cast(player, choice)
+
+
+def _run(battle, ticks):
+    for _ in range(ticks):
+        battle.step()
+
+
+def test_damage_lands_after_delay():
+    battle = Battle(1)
+    _cast(battle, 0, 'flame')
+    assert battle.pending[0, battle.index('flame'), 0] == battle.delay_ticks[battle.index('flame')] == 2
+    battle.step()
+    assert battle.hp[1, 0] == MAX_HP
+    battle.step()
+    assert battle.hp[1, 0] == MAX_HP - SKILLS['flame'].damage
+    assert battle.pending[0, battle.index('flame'), 0] == -1
+
+
+def test_cooldown_and_global_cooldown():
+    battle = Battle(1)
+    _cast(battle, 0, 'normal')
+    # 公共冷却期间其他技能也不能释放，不可用的选择被忽略
+    _cast(battle, 0, 'flame')
+    assert battle.casts[0, battle.index('flame')] == 0
+    assert not battle.available(0)[:, 0].any()
+    _run(battle, battle.gcd_ticks - 1)
+    assert not battle.available(0)[battle.index('flame'), 0]
+    battle.step()
+    assert battle.available(0)[battle.index('flame'), 0]
+    # 普通攻击冷却 0.5 秒，与公共冷却同时结束
+    assert battle.available(0)[battle.index('normal'), 0]
+    _cast(battle, 0, 'heal')
+    _run(battle, battle.gcd_ticks)
+    assert not battle.available(0)[battle.index('heal'), 0]
+    assert battle.casts[0].tolist() == [1, 1, 0, 0, 0]
+
+
+def test_shield_absorbs_before_hp_and_is_capped():
+    battle = Battle(1)
+    _cast(battle, 1, 'shield')
+    battle.step()
+    assert battle.shield[1, 0] == SKILLS['shield'].shield
+    _cast(battle, 0, 'normal')
+    battle.step()
+    assert battle.hp[1, 0] == MAX_HP
+    assert battle.shield[1, 0] == SKILLS['shield'].shield - SKILLS['normal'].damage
+
+    battle.shield[1] = MAX_SHIELD - 5
+    battle.cooldown[1] = 0
+    battle.gcd[1] = 0
+    _cast(battle, 1, 'shield')
+    battle.step()
+    assert battle.shield[1, 0] == MAX_SHIELD
+
+
+def test_heal_does_not_exceed_max_hp():
+    battle = Battle(2)
+    battle.hp[0, 1] = MAX_HP - 5
+    _cast(battle, 0, 'heal')
+    _run(battle, battle.delay_ticks[battle.index('heal')])
+    assert battle.hp[0].tolist() == [MAX_HP, MAX_HP]
+    battle.hp[0] = 100
+    battle.cooldown[0] = 0
+    battle.gcd[0] = 0
+    _cast(battle, 0, 'heal')
+    _run(battle, battle.delay_ticks[battle.index('heal')])
+    assert battle.hp[0].tolist() == [100 + SKILLS['heal'].heal] * 2
+
+
+def test_flame_debuff_reduces_outgoing_damage():
+    battle = Battle(1)
+    _cast(battle, 0, 'flame')
+    _run(battle, 2)
+    assert battle.debuff[1, 0] == battle.debuff_ticks
+    _cast(battle, 1, 'normal')
+    battle.step()
+    assert battle.hp[0, 0] == MAX_HP - (SKILLS['normal'].damage - SKILLS['flame'].debuff)
+
+    # 减益过期后恢复全额伤害
+    _run(battle, battle.debuff_ticks)
+    assert battle.debuff[1, 0] == 0
+    battle.hp[0] = MAX_HP
+    _cast(battle, 1, 'normal')
+    battle.step()
+    assert battle.hp[0, 0] == MAX_HP - SKILLS['normal'].damage
+
+
+def test_winner_draw_and_timeout():
+    battle = Battle(4, max_seconds=2)
+    battle.hp[1, 0] = 5
+    battle.hp[0, 1] = 5
+    battle.hp[:, 2] = 5
+    _cast(battle, 0, 'normal', [0, 2])
+    _cast(battle, 1, 'normal', [1, 2])
+    battle.step()
+    assert battle.winner.tolist() == [0, 1, 2, -1]
+    assert battle.length[:3].tolist() == [1, 1, 1]
+    assert battle.running.tolist() == [False, False, False, True]
+
+    # 已结束的对局不再结算
+    _run(battle, 5)
+    assert battle.hp[0, 0] == MAX_HP
+    _run(battle, battle.max_ticks)
+    assert battle.winner[3] == 2
+    assert battle.length[3] == battle.max_ticks
+    assert not battle.running.any()
+    assert battle.seconds()[3] == 2
+
+
+def test_matches_are_independent():
+    battle = Battle(3)
+    _cast(battle, 0, 'normal', [0])
+    _cast(battle, 0, 'flame', [2])
+    _run(battle, 2)
+    assert battle.hp[1].tolist() == [MAX_HP - 10, MAX_HP, MAX_HP - 40]
+    assert battle.debuff[1].tolist() == [0, 0, battle.debuff_ticks]
+
+
+@pytest.mark.parametrize('strategy', sorted(STRATEGIES))
+def test_simulate_is_deterministic(strategy):
+    first = simulate(300, strategy, 'aggressive', seed=5, chunk=128)
+    again = simulate(300, strategy, 'aggressive', seed=5, chunk=128)
+    assert first == again
+    assert sum(first['win_rate']) + first['draw_rate'] == pytest.approx(1)
+    assert sum(first['length_histogram'].values()) == 300
+    assert 0 < first['length_s']['mean'] <= 90
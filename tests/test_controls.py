@@ -0,0 +1,138 @@
+import csv
+import json
+
+import pygame
+import pytest
+
+from controls import Controls
+
+TICK_RATE = 60
+
+
+def _key(key):
+    return pygame.event.Event(pygame.KEYDOWN, key=key)
+
+
+@pytest.fixture
+def casts():
+    return []
+
+
+@pytest.fixture
+def controls(casts):
+    def cast(kind, player):
+        casts.append((kind, player))
+        return len(casts)
+
+    return Controls(cast, TICK_RATE, queue_ms=150)
+
+
+def test_bindings_fill_the_buffer(controls):
+    assert controls.handle(_key(pygame.K_a), 1.0, 3)
+    assert controls.handle(_key(pygame.K_QUOTE), 1.0, 3)
+    assert not controls.handle(_key(pygame.K_z), 1.0, 3)
+    assert not controls.handle(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=(0, 0)), 1.0, 3)
+    assert [(entry['player'], entry['skill']) for entry in controls.buffer] == [(0, 'normal'), (1, 'ultimate')]
+
+
+def test_gamepad_buttons_map_to_their_player(controls):
+    controls.gamepads = {7: 1}
+    assert controls.handle(pygame.event.Event(pygame.JOYBUTTONDOWN, instance_id=7, button=2), 0.0, 0)
+    assert not controls.handle(pygame.event.Event(pygame.JOYBUTTONDOWN, instance_id=8, button=2), 0.0, 0)
+    assert not controls.handle(pygame.event.Event(pygame.JOYBUTTONDOWN, instance_id=7, button=9), 0.0, 0)
+    assert controls.buffer == [{'player': 1, 'skill': 'flame', 'arrived': 0.0, 'frame': 0}]
+    controls.handle(pygame.event.Event(pygame.JOYDEVICEREMOVED, instance_id=7), 0.0, 0)
+    assert controls.gamepads == {}
+
+
+def test_ready_input_casts_immediately(controls, casts):
+    controls.handle(_key(pygame.K_a), 10.0, 0)
+    controls.handle(_key(pygame.K_j), 10.0, 0)
+    controls.dispatch(0, now=10.001)
+    assert casts == [('normal', 0), ('normal', 1)]
+    assert controls.buffer == []
+    assert [entry['ticket'] for entry in controls.pending] == [1, 2]
+    assert controls.pending[0]['queued_ms'] == pytest.approx(1.0)
+
+
+def test_global_cooldown_queues_other_skills(controls, casts):
+    controls.handle(_key(pygame.K_a), 0.0, 0)
+    controls.dispatch(0, now=0.0)
+    controls.handle(_key(pygame.K_d), 0.0, 0)
+    controls.dispatch(1, now=0.0)
+    assert casts == [('normal', 0)]
+    assert len(controls.buffer) == 1
+    # 公共冷却结束前一步仍在排队，结束时补发
+    controls.dispatch(controls.gcd_steps - 1, now=0.1)
+    assert len(casts) == 1
+    controls.dispatch(controls.gcd_steps, now=0.12)
+    assert casts == [('normal', 0), ('flame', 0)]
+    assert controls.pending[-1]['queued_ms'] == pytest.approx(120)
+
+
+def test_skill_cooldown_outlasts_queue_window(controls, casts):
+    controls.handle(_key(pygame.K_s), 0.0, 0)
+    controls.dispatch(0, now=0.0)
+    assert controls.cooldown_steps['heal'] == 4 * TICK_RATE
+    controls.handle(_key(pygame.K_s), 1.0, 60)
+    controls.dispatch(60, now=1.0)
+    controls.dispatch(70, now=1.1)
+    assert len(controls.buffer) == 1 and controls.dropped == 0
+    # 超过 queue_ms 后丢弃，不会在冷却结束时补发
+    controls.dispatch(80, now=1.2)
+    assert controls.buffer == [] and controls.dropped == 1
+    controls.dispatch(controls.cooldown_steps['heal'], now=4.0)
+    assert casts == [('heal', 0)]
+
+
+def test_players_have_separate_cooldowns(controls, casts):
+    controls.handle(_key(pygame.K_g), 0.0, 0)
+    controls.handle(_key(pygame.K_a), 0.0, 0)
+    controls.handle(_key(pygame.K_QUOTE), 0.0, 0)
+    controls.dispatch(0, now=0.0)
+    assert casts == [('ultimate', 0), ('ultimate', 1)]
+    assert [(entry['player'], entry['skill']) for entry in controls.buffer] == [(0, 'normal')]
+
+
+def test_presented_records_latency_in_ticket_order(controls):
+    for key in (pygame.K_a, pygame.K_j, pygame.K_f):
+        controls.handle(_key(key), 1.0, 10)
+    controls.dispatch(0, now=1.0)
+    controls.presented(0, 11, now=1.01)
+    assert not controls.records
+    controls.presented(2, 12, now=1.02)
+    assert [record['skill'] for record in controls.records] == ['normal', 'normal']
+    assert controls.records[0]['latency_ms'] == pytest.approx(20)
+    assert controls.records[0]['frames'] == 2
+    assert len(controls.pending) == 0
+    # 同一玩家的护盾被公共冷却挡住，仍在缓冲中
+    assert controls.buffer[0]['skill'] == 'shield'
+    assert controls.last_latency_ms == pytest.approx(20)
+
+
+def test_stats_histogram_and_export(controls, tmp_path):
+    assert controls.stats() == {'inputs': 0, 'dropped': 0}
+    for i, latency in enumerate((0.003, 0.005, 0.021)):
+        controls.handle(_key(pygame.K_a if i % 2 == 0 else pygame.K_j), 0.0, 0)
+        controls.dispatch(i * controls.gcd_steps, now=0.0)
+        controls.presented(i + 1, i + 1, now=latency)
+    stats = controls.stats()
+    assert stats['inputs'] == 3
+    assert stats['latency_ms_max'] == pytest.approx(21)
+    assert stats['latency_ms_p50'] == pytest.approx(5)
+    assert stats['frames_max'] == 3
+    bins, frames = controls.histogram(bin_ms=4)
+    assert bins == [(0, 1), (4, 1), (20, 1)]
+    assert frames == {1: 1, 2: 1, 3: 1}
+
+    path = tmp_path / 'latency.json'
+    controls.export(str(path))
+    data = json.loads(path.read_text(encoding='utf-8'))
+    assert data['stats']['inputs'] == 3 and len(data['records']) == 3
+
+    path = tmp_path / 'latency.csv'
+    controls.export(str(path), bin_ms=4)
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['unit', 'low', 'high', 'count']
+    assert len(rows) == 1 + 3 + 3
@@ -0,0 +1,135 @@
+import json
+import math
+import re
+
+import numpy as np
+import pytest
+
+from effect_rng import EffectRNG
+import simulation
+from emitters import EMITTER_FILE, EMITTERS, Emitter, load_emitters
+from particles import ParticleSystem
+from simulation import DETAIL_LEVELS, FULL_DETAIL
+
+
+def _particles(system):
+    n = system.count
+    return np.column_stack([system.x[:n], system.y[:n], system.vx[:n], system.vy[:n], system.size[:n],
+                            system.life[:n], system.gravity[:n], system.decay[:n], system.color[:n]])
+
+
+def test_every_definition_in_file_compiles():
+    with open(EMITTER_FILE, encoding='utf-8') as f:
+        names = set(json.load(f))
+    emitters = load_emitters()
+    assert set(emitters) == names == set(EMITTERS)
+
+
+def test_effects_only_reference_defined_emitters():
+    with open(simulation.__file__, encoding='utf-8') as f:
+        used = set(re.findall(r"EMITTERS\['([^']+)'\]", f.read()))
+    assert used and used <= set(EMITTERS)
+
+
+def test_burst_follows_definition():
+    system = ParticleSystem(rng=EffectRNG(1))
+    EMITTERS['normal.hit_number'].burst(system, 100, 200, FULL_DETAIL)
+    assert len(system) == 10
+    n = system.count
+    assert (system.x[:n] == 100).all() and (system.y[:n] == 170).all()
+    assert ((system.vy[:n] >= -2) & (system.vy[:n] <= -1)).all()
+    assert (system.size[:n] == 2).all() and (system.life[:n] == 30).all()
+    assert system.color[:n].tolist() == [[255, 255, 255]] * n
+
+
+def test_random_angle_and_direction():
+    emitter = EMITTERS['normal.hit_ring']
+    system = ParticleSystem(rng=EffectRNG(2))
+    emitter.burst(system, 0, 0, FULL_DETAIL, color=(10, 20, 30))
+    n = system.count
+    assert n == emitter.count
+    speed = np.hypot(system.vx[:n], system.vy[:n])
+    assert ((speed >= 2 - 1e-4) & (speed <= 5 + 1e-4)).all()
+    assert ((system.life[:n] >= 15) & (system.life[:n] <= 30)).all()
+    assert system.color[:n].tolist() == [[10, 20, 30]] * n
+
+
+def test_burst_scales_with_detail():
+    emitter = EMITTERS['flame.explosion']
+    counts = []
+    for detail in DETAIL_LEVELS:
+        system = ParticleSystem(rng=EffectRNG(3))
+        emitter.burst(system, 0, 0, detail)
+        counts.append(len(system))
+    assert counts[0] == emitter.count
+    assert counts == sorted(counts, reverse=True)
+    assert counts == [detail.scale_count(emitter.count) for detail in DETAIL_LEVELS]
+
+
+@pytest.mark.parametrize('name', sorted(EMITTERS))
+def test_emit_matches_single_burst(name):
+    """标量发射与批量发射一个粒子取用同样的随机数，得到同样的粒子"""
+    emitter = EMITTERS[name]
+    systems = [ParticleSystem(rng=EffectRNG(4)) for _ in range(2)]
+    color = None if emitter.palette is not None else (1, 2, 3)
+    angle = None if emitter.random_angle else 0.7
+    for _ in range(5):
+        emitter.emit(systems[0], 50, 60, color=color, angle=angle)
+        emitter._spawn(systems[1], 1, 50, 60, color, angle, None)
+    assert np.allclose(_particles(systems[0]), _particles(systems[1]))
+
+
+def test_same_seed_same_particles():
+    def run(seed):
+        system = ParticleSystem(rng=EffectRNG(seed))
+        for name in sorted(EMITTERS):
+            emitter = EMITTERS[name]
+            color = None if emitter.palette is not None else (9, 9, 9)
+            emitter.burst(system, 10, 20, FULL_DETAIL, color=color, angle=None if emitter.random_angle else 1.0)
+        return _particles(system)
+
+    assert np.array_equal(run(5), run(5))
+    assert not np.array_equal(run(5), run(6))
+
+
+def test_trigger_uses_chance_and_detail():
+    emitter = EMITTERS['heal.rise']
+    rng = EffectRNG(8)
+    hits = sum(emitter.trigger(rng, FULL_DETAIL) for _ in range(4000))
+    assert hits / 4000 == pytest.approx(emitter.chance, abs=0.03)
+    low = DETAIL_LEVELS[-1]
+    hits = sum(emitter.trigger(rng, low) for _ in range(4000))
+    assert hits / 4000 == pytest.approx(emitter.chance * low.spawn_scale, abs=0.03)
+
+
+@pytest.mark.parametrize('spec, field', [
+    ({'mode': 'fountain'}, 'mode'),
+    ({'count': -1}, 'count'),
+    ({'count': 2.5}, 'count'),
+    ({'chance': 1.5}, 'chance'),
+    ({'offset': [1]}, 'offset'),
+    ({'palette': []}, 'palette'),
+    ({'palette': [[300, 0, 0]]}, '颜色'),
+    ({'angle': 'up'}, 'angle'),
+    ({'direction': 'out'}, 'speed'),
+    ({'direction': 'sideways', 'speed': 1}, 'direction'),
+    ({'size': [1, 2, 3]}, 'size'),
+    ({'life': [1.5, 3]}, 'life'),
+    ({'direction': 'out', 'speed': 2, 'vx': 1}, 'vx'),
+    ({'colour': [1, 2, 3]}, 'colour'),
+])
+def test_invalid_definitions_are_rejected(tmp_path, spec, field):
+    path = tmp_path / 'emitters.json'
+    path.write_text(json.dumps({'bad': spec}), encoding='utf-8')
+    with pytest.raises(ValueError, match=field) as error:
+        load_emitters(str(path))
+    assert 'bad' in str(error.value)
+
+
+def test_offset_and_distance():
+    emitter = Emitter('probe', {
+        'offset': [5, -5], 'distance': 10, 'vx': 0, 'vy': 0, 'life': 3})
+    system = ParticleSystem(rng=EffectRNG(9))
+    emitter.burst(system, 0, 0, FULL_DETAIL, color=(0, 0, 0), angle=math.pi / 2)
+    assert system.x[0] == pytest.approx(5, abs=1e-5)
+    assert system.y[0] == pytest.approx(5)
@@ -0,0 +1,72 @@
+import numpy as np
+
+from effect_rng import EffectRNG
+from particles import ParticleSystem
+
+
+def _fields(system):
+    n = system.count
+    return [array[:n].copy() for array in (system.x, system.y, system.vx, system.vy, system.gravity,
+                                           system.size, system.decay, system.life, system.max_life,
+                                           system.color)]
+
+
+def test_emit_grows_capacity_and_keeps_particles():
+    system = ParticleSystem(capacity=4, rng=EffectRNG(1))
+    system.emit(3, 10, 20, color=(1, 2, 3), life=5)
+    system.emit(6, 30, 40, color=(4, 5, 6), life=7)
+    assert len(system) == 9
+    assert system.capacity >= 9
+    assert list(system.x[:9]) == [10] * 3 + [30] * 6
+    assert system.color[:3].tolist() == [[1, 2, 3]] * 3
+    assert list(system.max_life[:9]) == [5] * 3 + [7] * 6
+
+
+def test_update_removes_dead_particles():
+    system = ParticleSystem(rng=EffectRNG(2))
+    system.emit(5, 0, 0, life=[1, 3, 1, 2, 3], vx=0, vy=0, gravity=0)
+    system.update()
+    assert len(system) == 3
+    assert sorted(system.life[:3]) == [1, 2, 2]
+    system.update()
+    assert list(system.life[:len(system)]) == [1, 1]
+    system.update()
+    assert len(system) == 0
+
+
+def test_compaction_keeps_every_survivor_intact():
+    """交换压缩只移动粒子，不改变存活粒子的任何属性"""
+    system = ParticleSystem(rng=EffectRNG(3))
+    system.emit(200, 50, 60)
+    for _ in range(25):
+        before = _fields(system)
+        # 按本步之后的状态逐个推进，作为参照
+        n = system.count
+        x = before[0] + before[2]
+        y = before[1] + before[3]
+        vy = before[3] + before[4]
+        life = before[7] - 1
+        size = np.maximum(before[5] - before[6], 0)
+        alive = life > 0
+        expected = sorted(zip(x[alive].tolist(), y[alive].tolist(), vy[alive].tolist(),
+                              size[alive].tolist(), life[alive].tolist(),
+                              before[9][alive].tolist()))
+
+        system.update()
+        after = _fields(system)
+        assert system.count == int(alive.sum()) <= n
+        actual = sorted(zip(after[0].tolist(), after[1].tolist(), after[3].tolist(),
+                            after[5].tolist(), after[7].tolist(), after[9].tolist()))
+        assert actual == expected
+        assert (system.life[:system.count] > 0).all()
+
+
+def test_emit_after_compaction_reuses_tail():
+    system = ParticleSystem(capacity=8, rng=EffectRNG(4))
+    system.emit(8, 0, 0, life=[1, 5, 1, 5, 1, 5, 1, 5])
+    system.update()
+    assert len(system) == 4
+    system.emit(4, 99, 99, life=9)
+    assert len(system) == 8
+    assert system.capacity == 8
+    assert list(system.x[4:8]) == [99] * 4
@@ -0,0 +1,59 @@
+import numpy as np
+import pygame
+import pytest
+
+from pipeline import FrameState, _run_pipelined, _run_sequential, _schedule, freeze_effects
+from simulation import SIM_TYPES, Simulation, cast
+from snapshot import snapshot_simulation
+
+
+@pytest.fixture(scope='module')
+def surface():
+    pygame.display.init()
+    screen = pygame.display.set_mode((800, 600))
+    yield pygame.Surface(screen.get_size()).convert()
+    pygame.display.quit()
+
+
+def _busy(seed):
+    simulation = Simulation(seed)
+    for i, kind in enumerate(SIM_TYPES):
+        cast(simulation, kind, i % 2)
+        simulation.run(6)
+    return simulation
+
+
+def test_frozen_effects_do_not_follow_the_simulation():
+    simulation = _busy(1)
+    before = snapshot_simulation(simulation)
+    frozen = freeze_effects(simulation.effects)
+    assert [type(effect) for effect in frozen] == [type(effect) for effect in simulation.effects]
+    positions = frozen[0].timeline.output.copy()
+    counts = [effect.particle_count() for effect in frozen]
+
+    simulation.run(10)
+    assert snapshot_simulation(simulation) != before
+    assert [effect.particle_count() for effect in frozen] == counts
+    assert np.array_equal(frozen[0].timeline.output, positions)
+    with pytest.raises(ValueError):
+        frozen[0].timeline.output[0, 0] = 1
+
+
+def test_frame_state_shares_one_timeline_copy():
+    simulation = _busy(2)
+    state = FrameState(simulation.effects, simulation.frame, spawned=simulation.spawned)
+    assert len(state.timelines) == 1
+    assert all(effect.timeline is state.timelines[0] for effect in state if hasattr(effect, 'timeline'))
+    assert state.particle_count() == simulation.particle_count()
+    state.interpolate(0.5)
+    assert state.timelines[0].alpha == 0.5
+    assert simulation.timeline.alpha == 1.0
+
+
+def test_pipelined_run_matches_sequential(surface):
+    schedule = _schedule(90, seed=3, cast_every=8)
+    simulation, pixels, _ = _run_sequential(3, schedule, surface)
+    probe, probe_pixels, _, stats = _run_pipelined(3, schedule, surface)
+    assert snapshot_simulation(probe) == snapshot_simulation(simulation)
+    assert probe_pixels == pixels
+    assert stats['frames'] == len(schedule) + 1
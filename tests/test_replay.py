@@ -0,0 +1,93 @@
+import zlib
+
+import numpy as np
+import pytest
+
+from replay import Replay, ReplayPlayer, ReplayRecorder, record_random
+from simulation import DETAIL_LEVELS, Simulation
+from snapshot import snapshot_simulation
+
+LENGTH = 400
+INTERVAL = 60
+
+
+@pytest.fixture(scope='module')
+def replay():
+    return record_random(seed=4, steps=LENGTH, cast_every=9, keyframe_interval=INTERVAL)
+
+
+def _linear_states(replay, frames):
+    player = ReplayPlayer(replay)
+    states = {}
+    for frame in sorted(frames):
+        player.advance(frame - player.frame)
+        states[frame] = snapshot_simulation(player.simulation)
+    return states
+
+
+def test_linear_playback_reproduces_keyframes(replay):
+    assert replay.keyframe_steps == list(range(0, LENGTH + 1, INTERVAL))
+    player = ReplayPlayer(replay)
+    for step, data in replay.keyframes[1:]:
+        player.advance(step - player.frame)
+        assert snapshot_simulation(player.simulation) == zlib.decompress(data)
+    remaining = LENGTH - player.frame
+    assert player.advance(LENGTH) == remaining
+    assert player.done
+
+
+def test_seek_matches_linear_playback(replay):
+    # 关键帧上、关键帧之间、结尾，以及往回跳和越界
+    frames = [0, 1, INTERVAL - 1, INTERVAL, INTERVAL + 1, 250, 333, LENGTH - 1, LENGTH]
+    expected = _linear_states(replay, frames)
+    player = ReplayPlayer(replay)
+    for frame in frames + frames[::-1] + [137, 20, 301]:
+        if frame not in expected:
+            expected.update(_linear_states(replay, [frame]))
+        assert player.seek(frame) == frame
+        assert snapshot_simulation(player.simulation) == expected[frame]
+    assert player.seek(LENGTH + 50) == LENGTH
+    assert player.seek(-5) == 0
+
+
+def test_save_and_load_roundtrip(replay, tmp_path):
+    path = str(tmp_path / 'match.replay')
+    replay.save(path)
+    loaded = Replay.load(path)
+    assert (loaded.seed, loaded.length, loaded.keyframe_interval) == (replay.seed, replay.length, INTERVAL)
+    assert np.array_equal(loaded.events, replay.events)
+    assert loaded.keyframes == replay.keyframes
+    assert loaded.size() == len(open(path, 'rb').read())
+
+    player = ReplayPlayer(loaded)
+    player.seek(200)
+    assert snapshot_simulation(player.simulation) == _linear_states(replay, [200])[200]
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / 'bad.replay'
+    path.write_bytes(b'NOPE' + bytes(64))
+    with pytest.raises(ValueError):
+        Replay.load(str(path))
+
+
+def test_detail_changes_are_replayed():
+    simulation = Simulation(21)
+    recorder = ReplayRecorder(simulation, keyframe_interval=25)
+    for step in range(100):
+        if step % 10 == 0:
+            recorder.cast('heal' if step % 20 else 'flame', (step // 10) % 2)
+        if step == 37:
+            simulation.set_detail(DETAIL_LEVELS[2])
+            recorder.detail_changed(2)
+        simulation.step()
+        recorder.after_step()
+    replay = recorder.replay()
+
+    player = ReplayPlayer(replay)
+    player.seek(60)
+    assert player.simulation.detail == DETAIL_LEVELS[2]
+    player.seek(30)
+    assert player.simulation.detail == DETAIL_LEVELS[0]
+    player.seek(replay.length)
+    assert snapshot_simulation(player.simulation) == snapshot_simulation(simulation)
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from simulation import LOGIC_ONLY, SIM_TYPES, Simulation, cast, random_match
+from snapshot import snapshot_simulation
+
+
+def test_same_seed_same_match():
+    assert snapshot_simulation(random_match(12, 300)) == snapshot_simulation(random_match(12, 300))
+    assert snapshot_simulation(random_match(12, 300)) != snapshot_simulation(random_match(13, 300))
+
+
+@pytest.mark.parametrize('kind', sorted(SIM_TYPES))
+def test_effects_finish_and_release_their_tweens(kind):
+    simulation = Simulation(0)
+    for caster in (0, 1):
+        cast(simulation, kind, caster)
+    assert simulation.spawned == 2
+    for _ in range(600):
+        if not simulation.effects:
+            break
+        simulation.step()
+    assert simulation.effects == []
+    assert len(simulation.timeline) == 0
+
+
+def test_logic_only_spawns_no_particles():
+    simulation = random_match(4, 300, detail=LOGIC_ONLY)
+    assert simulation.particle_count() == 0
+    assert simulation.spawned == 15
+
+
+def test_simulation_does_not_import_pygame():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = 'import sys, simulation, snapshot, replay; simulation.random_match(0, 60); print("pygame" in sys.modules)'
+    output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == 'False'
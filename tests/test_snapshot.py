@@ -0,0 +1,82 @@
+import pytest
+
+from simulation import DETAIL_LEVELS, LOGIC_ONLY, SIM_TYPES, Simulation, cast
+from snapshot import restore_simulation, snapshot_simulation
+
+
+def _busy(seed, detail=None):
+    """双方轮流释放所有技能，使场上同时有多种特效、粒子和补间"""
+    simulation = Simulation(seed)
+    if detail is not None:
+        simulation.set_detail(detail)
+    for i, kind in enumerate(list(SIM_TYPES) * 2):
+        cast(simulation, kind, i % 2)
+        simulation.run(5)
+    return simulation
+
+
+@pytest.mark.parametrize('seed', [0, 7, 123456789])
+def test_restore_then_resimulate_matches_original(seed):
+    simulation = _busy(seed)
+    assert simulation.effects and simulation.particle_count()
+    data = snapshot_simulation(simulation)
+
+    probe = Simulation(seed + 1)
+    restore_simulation(probe, data)
+    assert snapshot_simulation(probe) == data
+
+    for steps in (1, 8, 30):
+        simulation.run(steps)
+        probe.run(steps)
+        assert probe.frame == simulation.frame
+        assert probe.spawned == simulation.spawned
+        assert snapshot_simulation(probe) == snapshot_simulation(simulation)
+
+
+def test_casts_after_restore_match():
+    """恢复后新创建的特效从同一个种子序列派生随机源"""
+    simulation = _busy(3)
+    probe = Simulation(0)
+    restore_simulation(probe, snapshot_simulation(simulation))
+    for target in (simulation, probe):
+        cast(target, 'ultimate', 0)
+        cast(target, 'flame', 1)
+        target.run(40)
+    assert snapshot_simulation(probe) == snapshot_simulation(simulation)
+
+
+def test_rollback_repeats_the_same_future():
+    simulation = _busy(11)
+    data = snapshot_simulation(simulation)
+    simulation.run(20)
+    expected = snapshot_simulation(simulation)
+
+    for _ in range(2):
+        restore_simulation(simulation, data)
+        simulation.run(20)
+        assert snapshot_simulation(simulation) == expected
+
+
+def test_restored_effects_are_independent():
+    simulation = _busy(5)
+    data = snapshot_simulation(simulation)
+    probe = Simulation(5)
+    restore_simulation(probe, data)
+    assert all(a is not b for a, b in zip(probe.effects, simulation.effects))
+    assert probe.timeline is not simulation.timeline
+    # 同一局的特效恢复后仍共享一条时间轴
+    assert all(effect.timeline is probe.timeline for effect in probe.effects if hasattr(effect, 'timeline'))
+    probe.run(10)
+    assert snapshot_simulation(simulation) == data
+
+
+@pytest.mark.parametrize('detail', DETAIL_LEVELS[1:] + [LOGIC_ONLY])
+def test_detail_level_survives_restore(detail):
+    simulation = _busy(9, detail)
+    probe = Simulation(9)
+    restore_simulation(probe, snapshot_simulation(simulation))
+    assert vars(probe.detail) == vars(detail)
+    assert all(effect.detail is probe.detail for effect in probe.effects)
+    simulation.run(15)
+    probe.run(15)
+    assert snapshot_simulation(probe) == snapshot_simulation(simulation)
@@ -0,0 +1,112 @@
+import pytest
+
+from tween import Timeline
+
+
+def test_linear_tween_follows_keyframes():
+    timeline = Timeline()
+    handle = timeline.add([0, 10], [(0, 0), (100, 50)])
+    assert timeline.point(handle) == (0, 0)
+    for _ in range(5):
+        timeline.step()
+    assert timeline.point(handle) == pytest.approx((50, 25))
+    assert not timeline.done(handle)
+    for _ in range(5):
+        timeline.step()
+    assert timeline.point(handle) == pytest.approx((100, 50))
+    assert timeline.done(handle)
+
+
+def test_segments_and_local_time():
+    timeline = Timeline()
+    handle = timeline.add([0, 3, 8], [0, 1, 2], ease='step')
+    for _ in range(4):
+        timeline.step()
+    assert timeline.segment(handle) == 1
+    assert timeline.local(handle) == 1
+    assert timeline.value(handle) == 1
+
+
+def test_released_slot_is_reused_with_fresh_state():
+    timeline = Timeline(capacity=2)
+    first = timeline.add([0, 10], [0, 10])
+    second = timeline.add([0, 4], [0, 4])
+    for _ in range(3):
+        timeline.step()
+    timeline.release(first)
+    assert len(timeline) == 1
+
+    reused = timeline.add([0, 2], [100, 200])
+    assert reused == first
+    assert len(timeline) == 2
+    assert timeline.capacity == 2
+    assert timeline.value(reused) == 100
+    timeline.step()
+    assert timeline.value(reused) == pytest.approx(150)
+    assert timeline.value(second) == pytest.approx(4)
+    timeline.step()
+    assert timeline.done(reused)
+
+
+def test_release_and_reuse_within_one_step():
+    """同一帧内释放后又复用的槽位只保留最后一次添加"""
+    timeline = Timeline()
+    handle = timeline.add([0, 10], [0, 10])
+    timeline.release(handle)
+    again = timeline.add([0, 10], [50, 60])
+    assert again == handle
+    timeline.step()
+    assert timeline.value(again) == pytest.approx(51)
+    assert timeline.alive[again]
+
+
+def test_capacity_grows_and_keeps_tweens():
+    timeline = Timeline(capacity=1)
+    handles = [timeline.add([0, 10], [i, i + 10]) for i in range(5)]
+    timeline.step()
+    assert timeline.capacity >= 5
+    assert [timeline.value(handle) for handle in handles] == pytest.approx([i + 1 for i in range(5)])
+
+
+def test_state_roundtrip_continues_identically():
+    timeline = Timeline()
+    a = timeline.add([0, 5, 20], [(0, 0), (10, 5), (30, 40)], ease=['out_quad', 'in_out_sine'])
+    b = timeline.add([0, 12], [0, 6.283], wave=(1.0, 0.5))
+    c = timeline.add([0, 3], [0, 1])
+    for _ in range(4):
+        timeline.step()
+    timeline.release(c)
+
+    restored = Timeline.from_state(timeline.get_state())
+    for _ in range(10):
+        timeline.step()
+        restored.step()
+        for handle in (a, b):
+            assert restored.point(handle) == timeline.point(handle)
+            assert restored.segment(handle) == timeline.segment(handle)
+    assert restored.add([0, 1], [0, 1]) == c
+
+
+def test_interpolated_blends_previous_and_current():
+    timeline = Timeline()
+    handle = timeline.add([0, 10], [(0, 0), (10, 20)])
+    assert timeline.interpolated(handle) == (0, 0)
+    timeline.step()
+    timeline.step()
+    timeline.alpha = 0.5
+    assert timeline.interpolated(handle) == pytest.approx((1.5, 3))
+    timeline.alpha = 1.0
+    assert timeline.interpolated(handle) == timeline.point(handle)
+
+    frozen = timeline.frozen()
+    frozen.alpha = 0.25
+    assert frozen.interpolated(handle) == pytest.approx((1.25, 2.5))
+    assert timeline.alpha == 1.0
+
+
+def test_invalid_keyframes_and_ease():
+    timeline = Timeline()
+    with pytest.raises(ValueError):
+        timeline.add([0], [0])
+    with pytest.raises(ValueError):
+        timeline.add([0, 1], [0, 1], ease='bounce')
@@ -0,0 +1,331 @@
+"""补间与时间轴：特效的位置、半径、脉动和阶段切换集中存放在一个结构化数组里
+
+每个补间由 2 到 MAX_KEYS 个关键帧 (时间, 值) 组成，值为二维（标量补间只用第一个分量），
+相邻关键帧之间按各自的缓动曲线插值；可选的正弦输出 center + amplitude * sin(插值结果) 用于脉动。
+Timeline.step() 每帧把所有补间推进一帧并一次性向量化求值，特效只按句柄读取结果，
+屏幕上的投射物再多，每帧也不会多出逐个特效的插值运算。
+
+时间以模拟步为单位。当前所在的分段序号和段内经过的帧数可以直接当作阶段和阶段计时器（见 UltimateSim）。
+
+时间轴同时保留上一步的求值结果：渲染帧落在两个模拟步之间时，绘制代码用 interpolated() 取
+上一步与当前值之间按 alpha（游戏循环的插值系数）插值的位置，投射物的运动不随渲染帧率抖动。
+模拟代码只读 value()/point()，alpha 不影响模拟结果。
+"""
+import math
+
+import numpy as np
+
+# 每个补间最多的关键帧数
+MAX_KEYS = 4
+
+# 缓动曲线，序号即存储在数组中的值；step 在段内保持起点值，到段尾才跳到终点值
+EASINGS = ('linear', 'in_quad', 'out_quad', 'in_out_quad', 'out_cubic', 'in_out_sine', 'step')
+
+_EASE_FUNCS = {
+    1: lambda u: u * u,
+    2: lambda u: u * (2 - u),
+    3: lambda u: np.where(u < 0.5, 2 * u * u, 1 - (2 - 2 * u) ** 2 / 2),
+    4: lambda u: 1 - (1 - u) ** 3,
+    5: lambda u: (1 - np.cos(np.pi * u)) / 2,
+    6: lambda u: (u >= 1).astype(u.dtype),
+}
+
+
+_EASE_IDS = {name: index for index, name in enumerate(EASINGS)}
+
+_PADDING = [np.inf] * MAX_KEYS, [(0.0, 0.0)] * MAX_KEYS, [0] * MAX_KEYS
+
+
+def _ease_id(name):
+    try:
+        return _EASE_IDS[name]
+    except KeyError:
+        raise ValueError('未知的缓动曲线: %s' % name) from None
+
+
+class Timeline:
+    """补间的结构化数组（SoA）存储；句柄为槽位下标，释放的槽位后进先出复用
+
+    关键帧之外还缓存每个补间当前所在分段的起止时间、速率和起点值，
+    每帧只有跨过关键帧的补间才需要重新定位分段，其余补间只做连续数组上的乘加。
+    Simulation 持有一局共享的时间轴，在每步开头统一推进；单独创建的特效使用自己的时间轴。
+    """
+
+    def __init__(self, capacity=64):
+        # 用过的槽位数；free 为其中已释放、可复用的槽位
+        self.top = 0
+        self.free = []
+        self._pending = []
+        # 距离最近一次跨过关键帧还有几帧，以及是否有补间用到缓动曲线或正弦输出；都由 _locate() 刷新
+        self._countdown = np.inf
+        self._eased = False
+        self._waves = False
+        # 绘制时的插值系数，由渲染端在绘制前设置；1 即当前值
+        self.alpha = 1.0
+        self._allocate(capacity)
+
+    def _arrays(self):
+        return (self.alive, self.elapsed, self.keys, self.key_time, self.key_value, self.key_ease, self.sine,
+                self.wave, self.segment_index, self.segment_start, self.segment_end, self.segment_rate,
+                self.segment_value, self.segment_delta, self.segment_ease, self.end_time, self.output,
+                self.previous, self.segment_time, self.finished)
+
+    def _allocate(self, capacity):
+        """分配（或扩容）底层数组，保留已有补间"""
+        old = self._arrays() if hasattr(self, 'elapsed') else None
+        self.capacity = capacity
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.elapsed = np.zeros(capacity)
+        # 关键帧：未用到的时间为 inf；第 i 段（关键帧 i 到 i + 1）使用 key_ease[i]
+        self.keys = np.full(capacity, 2, dtype=np.int8)
+        self.key_time = np.full((capacity, MAX_KEYS), np.inf)
+        self.key_value = np.zeros((capacity, MAX_KEYS, 2))
+        self.key_ease = np.zeros((capacity, MAX_KEYS), dtype=np.int8)
+        self.sine = np.zeros(capacity, dtype=bool)
+        self.wave = np.zeros((capacity, 2))
+        # 当前分段的缓存；segment_end 为下一个关键帧的时间，最后一段为 inf
+        self.segment_index = np.zeros(capacity, dtype=np.int64)
+        self.segment_start = np.zeros(capacity)
+        self.segment_end = np.full(capacity, np.inf)
+        self.segment_rate = np.zeros(capacity)
+        self.segment_value = np.zeros((capacity, 2))
+        self.segment_delta = np.zeros((capacity, 2))
+        self.segment_ease = np.zeros(capacity, dtype=np.int8)
+        self.end_time = np.zeros(capacity)
+        # 求值结果，以及上一步的求值结果（供绘制插值）
+        self.output = np.zeros((capacity, 2))
+        self.previous = np.zeros((capacity, 2))
+        self.segment_time = np.zeros(capacity)
+        self.finished = np.zeros(capacity, dtype=bool)
+        if old is not None:
+            n = self.top
+            for new_array, old_array in zip(self._arrays(), old):
+                new_array[:n] = old_array[:n]
+
+    def __len__(self):
+        return self.top - len(self.free)
+
+    def add(self, times, values, ease='linear', elapsed=0, wave=None):
+        """添加一个补间并立即求值，返回句柄
+
+        times 为递增的关键帧时间，values 为对应的值（标量或 (x, y)）；ease 为缓动名，
+        或每段一个缓动名的序列。elapsed 为已经过的帧数：在特效 update() 中创建、
+        本帧就要推进一次的补间传 1。wave 为 (center, amplitude) 时输出 center + amplitude * sin(值)。
+        """
+        n = len(times)
+        if not 2 <= n <= MAX_KEYS:
+            raise ValueError('补间需要 2 到 %d 个关键帧' % MAX_KEYS)
+        if self.free:
+            handle = self.free.pop()
+        else:
+            if self.top == self.capacity:
+                self._allocate(self.capacity * 2)
+            handle = self.top
+            self.top += 1
+
+        pad = MAX_KEYS - n
+        times = [float(key) for key in times] + _PADDING[0][:pad]
+        values = [(float(value[0]), float(value[1])) if isinstance(value, (tuple, list, np.ndarray))
+                  else (float(value), 0.0) for value in values] + _PADDING[1][:pad]
+        eases = [_ease_id(ease)] * MAX_KEYS if isinstance(ease, str) else \
+            [_ease_id(name) for name in ease] + _PADDING[2][:pad + 1]
+        # 关键帧先记入待写入列表，下次 step() 开头一次性写进数组；
+        # 这里只用标量运算求出当前值供本帧读取，公式与 _locate / _evaluate 相同
+        self._pending.append((handle, elapsed, n, times, values, eases, wave is not None, wave or (0, 0)))
+        t = float(elapsed)
+        segment = 0 if n == 2 else min(sum(1 for key in times[1:n - 1] if key <= t), n - 2)
+        start, end = times[segment], times[segment + 1]
+        rate = 1 / (end - start) if end > start else 0.0
+        (x0, y0), (x1, y1) = values[segment], values[segment + 1]
+        u = min(max((t - start) * rate, 0.0), 1.0)
+        if eases[segment]:
+            u = float(_EASE_FUNCS[eases[segment]](np.float64(u)))
+        x, y = x0 + (x1 - x0) * u, y0 + (y1 - y0) * u
+        if wave is not None:
+            x, y = wave[0] + wave[1] * math.sin(x), wave[0] + wave[1] * math.sin(y)
+        # 新补间没有上一步，插值时停在当前值
+        for output in (self.output, self.previous):
+            output[handle, 0] = x
+            output[handle, 1] = y
+        self.segment_index[handle] = segment
+        self.segment_time[handle] = t - start
+        self.finished[handle] = t >= times[n - 1]
+        return handle
+
+    def _flush(self):
+        """把 add() 积攒的新补间批量写入数组并定位分段"""
+        if not self._pending:
+            return
+        # 同一槽位在一帧内释放后又被复用时只保留最后一次添加
+        latest = {entry[0]: entry for entry in self._pending}
+        self._pending = []
+        handles, elapsed, keys, times, values, eases, sine, wave = zip(*latest.values())
+        index = np.array(handles)
+        free = set(self.free)
+        self.alive[index] = [handle not in free for handle in handles]
+        self.elapsed[index] = elapsed
+        self.keys[index] = keys
+        self.key_time[index] = times
+        self.key_value[index] = values
+        self.key_ease[index] = eases
+        self.sine[index] = sine
+        self.wave[index] = wave
+        self._locate(index)
+
+    def release(self, *handles):
+        """释放补间，槽位留给之后的 add() 复用（释放后不要再读取该句柄）"""
+        for handle in handles:
+            self.alive[handle] = False
+            self.free.append(handle)
+
+    def step(self):
+        """所有补间推进一帧并统一求值
+
+        直接处理前 top 个槽位：已释放的槽位不多，一起计算比先挑出存活槽位更省。
+        """
+        self._flush()
+        n = self.top
+        if n:
+            self.elapsed[:n] += 1
+            self._countdown -= 1
+            if self._countdown <= 0:
+                self._locate(np.flatnonzero(self.elapsed[:n] >= self.segment_end[:n]))
+            self.previous[:n] = self.output[:n]
+            self._evaluate(n)
+
+    def _locate(self, index):
+        """按 elapsed 重新定位 index 中补间所在的分段，刷新分段缓存"""
+        t = self.elapsed[index]
+        times = self.key_time[index]
+        rows = np.arange(len(index))
+        last = self.keys[index].astype(np.int64) - 1
+
+        # 已越过的中间关键帧数即所在分段；超过最后一个关键帧时停在最后一段
+        segment = np.minimum((times[:, 1:-1] <= t[:, None]).sum(axis=1), last - 1)
+        start = times[rows, segment]
+        end = times[rows, segment + 1]
+        span = end - start
+        rate = np.zeros(len(index))
+        np.divide(1, span, out=rate, where=span > 0)
+        value = self.key_value[index, segment]
+
+        self.segment_index[index] = segment
+        self.segment_start[index] = start
+        self.segment_end[index] = np.where(segment < last - 1, end, np.inf)
+        self.segment_rate[index] = rate
+        self.segment_value[index] = value
+        self.segment_delta[index] = self.key_value[index, segment + 1] - value
+        self.segment_ease[index] = self.key_ease[index, segment]
+        self.end_time[index] = times[rows, last]
+
+        n = self.top
+        self._countdown = (self.segment_end[:n] - self.elapsed[:n]).min()
+        self._eased = bool(self.segment_ease[:n].any())
+        self._waves = bool(self.sine[:n].any())
+
+    def _evaluate(self, n):
+        """求值前 n 个槽位，结果直接写进输出数组"""
+        t = self.elapsed[:n]
+        local = self.segment_time[:n]
+        np.subtract(t, self.segment_start[:n], out=local)
+        u = local * self.segment_rate[:n]
+        np.minimum(u, 1, out=u)
+        np.maximum(u, 0, out=u)
+
+        if self._eased:
+            ease = self.segment_ease[:n]
+            for ease_id, func in _EASE_FUNCS.items():
+                mask = ease == ease_id
+                if mask.any():
+                    u[mask] = func(u[mask])
+
+        value = self.output[:n]
+        np.multiply(self.segment_delta[:n], u[:, None], out=value)
+        value += self.segment_value[:n]
+        if self._waves:
+            sine = self.sine[:n]
+            wave = self.wave[:n][sine]
+            value[sine] = wave[:, :1] + wave[:, 1:] * np.sin(value[sine])
+
+        np.greater_equal(t, self.end_time[:n], out=self.finished[:n])
+
+    def value(self, handle):
+        """标量补间的当前值"""
+        return self.output.item(handle, 0)
+
+    def point(self, handle):
+        """二维补间的当前值 (x, y)"""
+        output = self.output
+        return output.item(handle, 0), output.item(handle, 1)
+
+    def interpolated(self, handle):
+        """绘制用的二维值：上一步的值与当前值之间按 alpha 插值；只供绘制代码使用"""
+        alpha = self.alpha
+        x1, y1 = self.output.item(handle, 0), self.output.item(handle, 1)
+        if alpha >= 1:
+            return x1, y1
+        x0, y0 = self.previous.item(handle, 0), self.previous.item(handle, 1)
+        return x0 + (x1 - x0) * alpha, y0 + (y1 - y0) * alpha
+
+    def segment(self, handle):
+        """当前所在分段（关键帧 i 到 i + 1 为第 i 段）"""
+        return self.segment_index.item(handle)
+
+    def local(self, handle):
+        """进入当前分段后经过的帧数"""
+        return self.segment_time.item(handle)
+
+    def done(self, handle):
+        """是否已到达最后一个关键帧"""
+        return self.finished.item(handle)
+
+    def frozen(self):
+        """当前求值结果的只读副本，供渲染线程读取 value/point/interpolated/segment/local/done；
+        不能再 step() 或 add()，alpha 可由渲染线程设置"""
+        copy = Timeline.__new__(Timeline)
+        copy.top = n = self.top
+        copy.capacity = n
+        copy.alpha = 1.0
+        for field in ('output', 'previous', 'segment_index', 'segment_time', 'finished'):
+            array = getattr(self, field)[:n].copy()
+            array.flags.writeable = False
+            setattr(copy, field, array)
+        return copy
+
+    def get_state(self):
+        """可 marshal 编码的状态，只保存存活的补间；分段缓存和求值结果恢复时重新计算"""
+        self._flush()
+        alive = np.flatnonzero(self.alive[:self.top])
+        return (self.capacity, self.top, list(self.free), alive.astype(np.int32).tobytes(),
+                self.elapsed[alive].tobytes(), self.keys[alive].tobytes(), self.key_time[alive].tobytes(),
+                self.key_value[alive].tobytes(), self.key_ease[alive].tobytes(),
+                self.sine[alive].tobytes(), self.wave[alive].tobytes())
+
+    @classmethod
+    def from_state(cls, state):
+        capacity, top, free, alive, elapsed, keys, key_time, key_value, key_ease, sine, wave = state
+        timeline = cls(capacity)
+        timeline.top = top
+        timeline.free = list(free)
+        alive = np.frombuffer(alive, dtype=np.int32).astype(np.int64)
+        timeline.alive[alive] = True
+        timeline.elapsed[alive] = np.frombuffer(elapsed)
+        timeline.keys[alive] = np.frombuffer(keys, dtype=np.int8)
+        timeline.key_time[alive] = np.frombuffer(key_time).reshape(-1, MAX_KEYS)
+        timeline.key_value[alive] = np.frombuffer(key_value).reshape(-1, MAX_KEYS, 2)
+        timeline.key_ease[alive] = np.frombuffer(key_ease, dtype=np.int8).reshape(-1, MAX_KEYS)
+        timeline.sine[alive] = np.frombuffer(sine, dtype=bool)
+        timeline.wave[alive] = np.frombuffer(wave).reshape(-1, 2)
+        if alive.size:
+            timeline._locate(alive)
+            timeline._evaluate(top)
+            # 上一步的值不在快照中，恢复后的第一帧不插值
+            timeline.previous[:top] = timeline.output[:top]
+        return timeline
+
+
+def own_timeline(timeline):
+    """特效构造时取得时间轴：(时间轴, 是否由特效自己推进)"""
+    if timeline is not None:
+        return timeline, False
+    return Timeline(8), True